@@ -0,0 +1,415 @@
+"""
+The benchmark cases, grouped by the part of Nyra they exercise. Names are
+group/case[param]; sizes in names are before --quick scaling.
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+from benchmarks.suite import benchmark
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _python(*args):
+    return lambda: subprocess.run([sys.executable, *args], cwd=REPO, stdin=subprocess.DEVNULL,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+# --- startup ---------------------------------------------------------------
+
+@benchmark("startup/python", repeat=10, threshold=0.25)
+def startup_python(fx):
+    """The bare interpreter, the floor under the other startup numbers."""
+    return _python("-c", "pass")
+
+@benchmark("startup/imports", repeat=10, threshold=0.25)
+def startup_imports(fx):
+    return _python("-c", "import main")
+
+@benchmark("startup/batch", repeat=10, threshold=0.25)
+def startup_batch(fx):
+    """Interpreter, imports and one builtin through `nyra -c`."""
+    return _python("main.py", "-c", "pwd")
+
+@benchmark("startup/client", repeat=10, threshold=0.25)
+def startup_client(fx):
+    """The same command through utils/client.py and a warm server."""
+    return _python("utils/client.py", "--socket", fx.nyra_server(), "-c", "pwd")
+
+@benchmark("startup/banner", number=50)
+def startup_banner(fx):
+    from utils.nyra import render_banner
+
+    return lambda: render_banner(100, True, True)
+
+# --- dispatch --------------------------------------------------------------
+
+@benchmark("dispatch/builtin", number=200)
+def dispatch_builtin(fx):
+    from utils.dispatcher import run_command_line
+
+    return lambda: run_command_line("pwd")
+
+@benchmark("dispatch/quoted", number=200)
+def dispatch_quoted(fx):
+    """A line that needs shlex."""
+    from utils.dispatcher import run_command_line
+
+    return lambda: run_command_line("echo 'quoted words' \"and more\"")
+
+@benchmark("dispatch/command-map", number=1000)
+def dispatch_command_map(fx):
+    """Platform lookups done for every external command."""
+    from commands.command_map import PLATFORM_COMMANDS, get_platform_command
+
+    names = list(PLATFORM_COMMANDS) + ["not-mapped"]
+
+    def run():
+        for name in names:
+            get_platform_command(name)
+
+    return run
+
+@benchmark("dispatch/builtin-pipeline", number=20)
+def dispatch_builtin_pipeline(fx):
+    from utils.dispatcher import run_command_line
+
+    return lambda: run_command_line("echo alpha beta | grep beta")
+
+@benchmark("dispatch/stats-record", number=10000)
+def dispatch_stats_record(fx):
+    """What the always-on latency recorder adds to every command."""
+    from utils.stats import LatencyRecorder
+
+    recorder = LatencyRecorder()
+    return lambda: recorder.record("ls", 0.0042)
+
+# --- completion ------------------------------------------------------------
+
+@benchmark("completer/cold", repeat=10, params=[100, 1000, 10000, 100000])
+def completer_cold(fx, entries):
+    """First Tab in a directory: scandir and sort."""
+    from utils.completion import CompletionIndex
+    from utils.dispatcher import BUILTIN_COMMANDS
+
+    directory = fx.flat_dir(fx.size(entries))
+    state = {}
+
+    def reset():
+        state["index"] = CompletionIndex(BUILTIN_COMMANDS)
+
+    return (lambda: state["index"].paths(os.path.join(directory, "file0001"))), reset
+
+@benchmark("completer/warm", number=200, params=[100, 1000, 10000, 100000])
+def completer_warm(fx, entries):
+    """Every later Tab: one stat and a binary search."""
+    from utils.completion import CompletionIndex
+    from utils.dispatcher import BUILTIN_COMMANDS
+
+    directory = fx.flat_dir(fx.size(entries))
+    index = CompletionIndex(BUILTIN_COMMANDS)
+    return lambda: index.paths(os.path.join(directory, "file0001"))
+
+@benchmark("completer/commands", number=200)
+def completer_commands(fx):
+    from utils.completion import CompletionIndex
+    from utils.dispatcher import BUILTIN_COMMANDS
+
+    index = CompletionIndex(BUILTIN_COMMANDS)
+    return lambda: index.complete("", 0, "py")
+
+# --- files -----------------------------------------------------------------
+
+@benchmark("cat/to-file", repeat=10, params=[64])
+def cat_to_file(fx, megabytes):
+    """`cat big > copy`. (Into /dev/null, sendfile would skip the copy entirely.)"""
+    from commands.file_ops import handle_cat
+
+    path = fx.large_file(fx.size(megabytes))
+    copy = fx.path("cat-copy.txt")
+
+    def run():
+        saved = os.dup(1)
+        try:
+            with open(copy, "wb") as out:
+                os.dup2(out.fileno(), 1)
+                handle_cat([path])
+        finally:
+            os.dup2(saved, 1)
+            os.close(saved)
+
+    return run
+
+@benchmark("cat/numbered", repeat=5, params=[64])
+def cat_numbered(fx, megabytes):
+    from commands.file_ops import handle_cat
+
+    path = fx.large_file(fx.size(megabytes))
+    return lambda: handle_cat(["-n", path])
+
+@benchmark("cat/tail-lines", number=20, params=[64])
+def cat_tail_lines(fx, megabytes):
+    from commands.file_ops import handle_cat
+
+    path = fx.large_file(fx.size(megabytes))
+    return lambda: handle_cat(["--lines=-100:", path])
+
+@benchmark("tail/last-lines", number=20, params=[64])
+def tail_last_lines(fx, megabytes):
+    """`tail -n 100`: a backwards read of the last blocks, whatever the file size."""
+    from commands.tail_ops import handle_tail
+
+    path = fx.large_file(fx.size(megabytes))
+    return lambda: handle_tail(["-n", "100", path])
+
+@benchmark("ls/plain", params=[10000])
+def ls_plain(fx, entries):
+    from commands.file_ops import handle_ls
+
+    directory = fx.flat_dir(fx.size(entries))
+    return lambda: handle_ls([directory])
+
+@benchmark("ls/long", params=[10000])
+def ls_long(fx, entries):
+    from commands.file_ops import handle_ls
+
+    directory = fx.flat_dir(fx.size(entries))
+    return lambda: handle_ls(["-l", directory])
+
+@benchmark("ls/long-cold", params=[10000])
+def ls_long_cold(fx, entries):
+    """-l with the listing cache dropped before every run."""
+    from commands import file_ops
+
+    directory = fx.flat_dir(fx.size(entries))
+    return (lambda: file_ops.handle_ls(["-l", directory])), file_ops._LS_CACHE.clear
+
+@benchmark("find/name", repeat=10, params=[5000])
+def find_name(fx, files):
+    from commands.search_ops import handle_find
+
+    tree = fx.source_tree(fx.size(files))
+    return lambda: handle_find([tree, "-name", "*7.py"])
+
+@benchmark("grep/recursive", repeat=10, params=[5000])
+def grep_recursive(fx, files):
+    from commands.search_ops import handle_grep
+
+    tree = fx.source_tree(fx.size(files))
+    return lambda: handle_grep(["-rn", "lambda socket", tree])
+
+@benchmark("grep/gitignore-count", repeat=10, params=[5000])
+def grep_gitignore_count(fx, files):
+    from commands.search_ops import handle_grep
+
+    tree = fx.source_tree(fx.size(files))
+    return lambda: handle_grep(["-rc", "yield", tree])
+
+# --- processes -------------------------------------------------------------
+
+@benchmark("ps/default", repeat=10, params=[0, 100, 400])
+def ps_default(fx, extra):
+    from commands.process_ops import handle_ps
+
+    fx.idle_processes(fx.size(extra) if extra else 0)
+    return lambda: handle_ps([])
+
+@benchmark("monitor/sample", repeat=10, params=[0, 100, 400])
+def monitor_sample(fx, extra):
+    """One tick of the monitor's sampler thread: process table, top N, memory."""
+    import heapq
+    from operator import itemgetter
+
+    import psutil
+    from commands.process_ops import ProcessTracker
+
+    fx.idle_processes(fx.size(extra) if extra else 0)
+    tracker = ProcessTracker()
+    tracker.sample()
+
+    def run():
+        heapq.nlargest(10, tracker.sample(), key=itemgetter("cpu"))
+        psutil.virtual_memory()
+        psutil.cpu_percent(interval=None)
+
+    return run
+
+@benchmark("monitor/render", number=20)
+def monitor_render(fx):
+    import psutil
+    from rich.console import Console
+    from commands.sys_monitor import MonitorSampler, _render_monitor
+
+    sampler = MonitorSampler()
+    sampler.memory = psutil.virtual_memory()
+    sampler.top = sampler._tracker.sample()[:10]
+    for i in range(120):
+        sampler.cpu_history.append(i % 100)
+        sampler.mem_history.append(50.0)
+    console = Console(file=open(os.devnull, "w"), width=120, force_terminal=True)
+    return lambda: console.print(_render_monitor(sampler))
+
+@benchmark("monitor/record", number=1000)
+def monitor_record(fx):
+    """One `monitor --record` sample: the raw record plus both rollups."""
+    import time
+    from utils.timeseries import SeriesWriter
+
+    path = fx.path("monitor-record.nyts")
+    writer = SeriesWriter(path)
+    top = [(1, 50.0, 2.0, "python"), (2, 10.0, 1.0, "bash"), (3, 1.0, 0.5, "sshd")]
+    return lambda: writer.append(time.time(), 12.5, 40.0, top)
+
+@benchmark("monitor/replay", repeat=10, params=["month", "hour"])
+def monitor_replay(fx, window):
+    """Summarizing a window of a month-long recording (one sample every 10s)."""
+    import time
+    from commands.sys_monitor import handle_monitor
+    from utils.timeseries import SeriesWriter
+
+    path = fx.path("monitor-replay.nyts")
+    if not os.path.exists(path):
+        writer = SeriesWriter(path)
+        start = time.time() - 30 * 86400
+        top = [(1, 50.0, 2.0, "python"), (2, 10.0, 1.0, "bash"), (3, 1.0, 0.5, "sshd")]
+        for i in range(0, 30 * 86400, 10):
+            writer.append(start + i, i % 100, 40.0 + i % 7, top)
+        writer.close()
+    args = ["--replay", path, "--from", "-30d" if window == "month" else "-2h", "--to", "-1h"]
+    return lambda: handle_monitor(args)
+
+# --- archives --------------------------------------------------------------
+
+@benchmark("archive/zip", repeat=5, params=[2000])
+def archive_zip(fx, files):
+    from commands.archive_ops import handle_zip
+
+    tree = fx.source_tree(fx.size(files))
+    archive = fx.path("bench-out.zip")
+
+    def reset():
+        if os.path.exists(archive):
+            os.unlink(archive)
+
+    return (lambda: handle_zip(["-q", "-r", archive, tree])), reset
+
+@benchmark("archive/unzip", repeat=5, params=[2000])
+def archive_unzip(fx, files):
+    from commands.archive_ops import handle_unzip
+
+    archive = fx.zip_archive(fx.size(files))
+    dest = fx.path("bench-unzip")
+
+    def reset():
+        shutil.rmtree(dest, ignore_errors=True)
+
+    return (lambda: handle_unzip(["-q", "-d", dest, archive])), reset
+
+# --- copies ----------------------------------------------------------------
+
+@benchmark("cp/tree", repeat=5, params=[2000])
+def cp_tree(fx, files):
+    from commands.copy_ops import handle_cp
+
+    tree = fx.source_tree(fx.size(files))
+    dest = fx.path("bench-cp-tree")
+
+    def reset():
+        shutil.rmtree(dest, ignore_errors=True)
+
+    return (lambda: handle_cp(["-r", tree, dest])), reset
+
+@benchmark("cp/large", repeat=10, params=[64])
+def cp_large(fx, megabytes):
+    from commands.copy_ops import handle_cp
+
+    path = fx.large_file(fx.size(megabytes))
+    return lambda: handle_cp([path, fx.path("cp-copy.txt")])
+
+# --- disk usage ------------------------------------------------------------
+
+@benchmark("du/cold", repeat=10, params=[20000])
+def du_cold(fx, files):
+    from commands.disk_ops import handle_du
+
+    tree = fx.source_tree(fx.size(files), per_dir=20)
+    return lambda: handle_du(["-s", tree])
+
+@benchmark("du/indexed", repeat=10, params=[20000])
+def du_indexed(fx, files):
+    """Re-runs over an unchanged tree (the warmup run fills the index), no listing is read."""
+    from commands import disk_ops
+
+    tree = fx.source_tree(fx.size(files), per_dir=20)
+    disk_ops.DU_INDEX = fx.path("du-index")
+    return lambda: disk_ops.handle_du(["-s", "--index", tree])
+
+# --- external commands -----------------------------------------------------
+
+@benchmark("spawn/external", repeat=50, threshold=0.25)
+def spawn_external(fx):
+    """`true` through the dispatcher: hash lookup and posix_spawn."""
+    from utils.dispatcher import run_command_line
+
+    return lambda: run_command_line("true")
+
+@benchmark("spawn/subprocess", repeat=50, threshold=0.25)
+def spawn_subprocess(fx):
+    """subprocess.run, the reference the external path is measured against."""
+    return lambda: subprocess.run(["true"])
+
+@benchmark("spawn/pipeline", repeat=30, threshold=0.25)
+def spawn_pipeline(fx):
+    from utils.dispatcher import run_command_line
+
+    return lambda: run_command_line("true | true")
+
+@benchmark("parallel/spawn", repeat=10, threshold=0.25, params=[100])
+def parallel_spawn(fx, tasks):
+    """`true` fanned out over inputs on 8 workers, output grouped per task."""
+    from commands.parallel_ops import handle_parallel
+
+    inputs = [str(i) for i in range(fx.size(tasks))]
+    return lambda: handle_parallel(["-q", "-j", "8", "true", ":::", *inputs])
+
+# --- network ---------------------------------------------------------------
+
+@benchmark("curl/keep-alive", number=50)
+def curl_keep_alive(fx):
+    """Sequential requests over a pooled connection to a local server."""
+    from commands.http_ops import handle_curl
+
+    url = fx.http_server() + "/" + os.path.basename(fx.large_file(1))
+    return lambda: handle_curl(["-s", "-I", url])
+
+@benchmark("curl/parallel", repeat=10, params=[100])
+def curl_parallel(fx, count):
+    from commands.http_ops import handle_curl
+
+    tree = fx.source_tree(fx.size(count))
+    base = fx.http_server()
+    url_file = fx.path(f"urls-{count}.txt")
+    with open(url_file, "w") as f:
+        for directory, _, names in os.walk(tree):
+            for name in names:
+                f.write(f"{base}/{os.path.relpath(os.path.join(directory, name), fx.root)}\n")
+    return lambda: handle_curl(["-s", "-j", "8", "--url-file", url_file])
+
+# --- history ---------------------------------------------------------------
+
+@benchmark("history/record", number=100)
+def history_record(fx):
+    from utils.history import HistoryStore
+
+    store = HistoryStore(fx.path("history-record.db"))
+    return lambda: store.record("ls -la", "/tmp", 0, None, 0.001)
+
+@benchmark("history/search", number=20, params=[100000])
+def history_search(fx, rows):
+    from utils.history import HistoryStore
+
+    store = HistoryStore(fx.path(f"history-{rows}.db"))
+    if store.is_empty():
+        words = ["git status", "ls -la", "grep -rn TODO src", "cd ..", "curl -s localhost:8000"]
+        store.import_commands(f"{words[i % len(words)]} {i}" for i in range(fx.size(rows)))
+    return lambda: store.search(["grep", "TODO"], 25)
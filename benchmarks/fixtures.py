@@ -0,0 +1,172 @@
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Fixed seed, so every run generates byte-identical fixtures
+_SEED = 1729
+
+_WORDS = ("alpha beta gamma delta import return lambda class yield async await "
+          "value index buffer socket thread process error request").split()
+
+class Fixtures:
+    """
+    Generated inputs shared by the benchmark cases: file trees, a large text
+    file, a zip archive, a local HTTP server, a Nyra server and idle
+    processes. Everything is created on first use under one temporary
+    directory and torn down by close(). `scale` shrinks the sizes (0.1 for --quick runs).
+    """
+
+    def __init__(self, scale=1.0):
+        self.scale = scale
+        self.root = tempfile.mkdtemp(prefix="nyra-bench-")
+        self._cache = {}
+        self._processes = []
+        self._server = None
+        self._nyra = None
+
+    def size(self, n):
+        """n scaled for this run, at least 1."""
+        return max(1, int(n * self.scale))
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def _cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def flat_dir(self, entries):
+        """A directory of `entries` empty files (and one subdirectory per 50)."""
+        def build():
+            directory = self.path(f"flat-{entries}")
+            os.makedirs(directory)
+            for i in range(entries):
+                name = os.path.join(directory, f"file{i:06d}.txt" if i % 50 else f"dir{i:06d}")
+                if i % 50:
+                    open(name, "w").close()
+                else:
+                    os.mkdir(name)
+            return directory
+
+        return self._cached(("flat", entries), build)
+
+    def source_tree(self, files, per_dir=50):
+        """
+        A tree of `files` small text files, `per_dir` to a directory, each a
+        few KiB of word soup. A .gitignore excludes the *.log files.
+        """
+        def build():
+            rng = random.Random(_SEED)
+            top = self.path(f"tree-{files}")
+            os.makedirs(top)
+            with open(os.path.join(top, ".gitignore"), "w") as f:
+                f.write("*.log\n")
+            for i in range(files):
+                directory = os.path.join(top, f"pkg{i // per_dir:04d}")
+                os.makedirs(directory, exist_ok=True)
+                suffix = ".log" if i % 10 == 9 else ".py"
+                lines = (" ".join(rng.choices(_WORDS, k=8)) for _ in range(rng.randint(20, 120)))
+                with open(os.path.join(directory, f"mod{i:05d}{suffix}"), "w") as f:
+                    f.write("\n".join(lines) + "\n")
+            return top
+
+        return self._cached(("tree", files, per_dir), build)
+
+    def large_file(self, megabytes):
+        """A text file of about `megabytes` MiB, built from a repeated block."""
+        def build():
+            rng = random.Random(_SEED)
+            block = "".join(f"{i:08d} " + " ".join(rng.choices(_WORDS, k=10)) + "\n" for i in range(4096))
+            block = block.encode()
+            path = self.path(f"large-{megabytes}M.txt")
+            with open(path, "wb") as f:
+                for _ in range(max(1, megabytes * 1024 * 1024 // len(block))):
+                    f.write(block)
+            return path
+
+        return self._cached(("large", megabytes), build)
+
+    def zip_archive(self, files):
+        """source_tree(files) zipped with the stdlib, as input for unzip."""
+        def build():
+            import zipfile
+
+            tree = self.source_tree(files)
+            archive = self.path(f"tree-{files}.zip")
+            with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+                for directory, _, names in os.walk(tree):
+                    for name in sorted(names):
+                        full = os.path.join(directory, name)
+                        zf.write(full, os.path.relpath(full, self.root))
+            return archive
+
+        return self._cached(("zip", files), build)
+
+    def http_server(self):
+        """
+        Base URL of a keep-alive HTTP/1.1 server on 127.0.0.1 serving the
+        fixture directory, running on a background thread.
+        """
+        if self._server is None:
+            import functools
+            from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+            class Handler(SimpleHTTPRequestHandler):
+                protocol_version = "HTTP/1.1"
+                # Small responses would otherwise wait on delayed ACKs
+                disable_nagle_algorithm = True
+
+                def log_message(self, format, *args):
+                    pass
+
+            handler = functools.partial(Handler, directory=self.root)
+            self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def nyra_server(self):
+        """Socket path of a `main.py --server` started for this run."""
+        path = self.path("nyra.sock")
+        if self._nyra is None:
+            repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            self._nyra = subprocess.Popen([sys.executable, "main.py", "--server", "--socket", path],
+                                          cwd=repo, stdin=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            deadline = time.monotonic() + 10
+            while not os.path.exists(path):
+                if time.monotonic() > deadline:
+                    raise RuntimeError("nyra server did not start")
+                time.sleep(0.01)
+        return path
+
+    def idle_processes(self, count):
+        """Keeps at least `count` extra sleeping processes alive until close()."""
+        sleep = shutil.which("sleep")
+        argv = [sleep, "600"] if sleep else [sys.executable, "-c", "import time; time.sleep(600)"]
+        while len(self._processes) < count:
+            self._processes.append(subprocess.Popen(argv, stdin=subprocess.DEVNULL,
+                                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+
+    def release_processes(self):
+        for proc in self._processes:
+            proc.kill()
+        for proc in self._processes:
+            proc.wait()
+        self._processes = []
+
+    def close(self):
+        self.release_processes()
+        if self._nyra is not None:
+            self._nyra.terminate()
+            self._nyra.wait()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,123 @@
+"""
+Runs Nyra's benchmark suite and writes a JSON report.
+
+    python -m benchmarks.run                              # everything
+    python -m benchmarks.run -k completer -k ls           # names containing either
+    python -m benchmarks.run --save-baseline base.json    # keep this run as the baseline
+    python -m benchmarks.run --baseline base.json         # exit 1 on regressions
+
+Run from the repository root. Everything runs offline, against fixtures
+generated in a temporary directory and a server on 127.0.0.1.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+from benchmarks import cases  # noqa: F401  (registers the cases)
+from benchmarks.fixtures import Fixtures
+from benchmarks.suite import BENCHMARKS, REPORT_VERSION, compare, format_seconds, machine_info, measure
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Nyra benchmark suite.")
+    parser.add_argument("-k", dest="patterns", action="append", default=[], metavar="TEXT",
+                        help="only run benchmarks whose name contains TEXT (repeatable)")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    parser.add_argument("--quick", action="store_true", help="10x smaller fixtures and fewer samples")
+    parser.add_argument("--repeat", type=int, help="samples per benchmark (overrides each case's default)")
+    parser.add_argument("-o", "--output", default="benchmark-report.json", help="report file (default %(default)s)")
+    parser.add_argument("--baseline", help="compare against this report, exit 1 on regressions")
+    parser.add_argument("--save-baseline", metavar="FILE", help="also write the report to FILE")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative slowdown of the median counted as a regression (default %(default)s)")
+    parser.add_argument("--min-delta", type=float, default=50e-6,
+                        help="ignore median changes smaller than this many seconds (default %(default)s)")
+    return parser.parse_args(argv)
+
+def selected(patterns):
+    return [case for case in BENCHMARKS if not patterns or any(p in case.name for p in patterns)]
+
+def run_suite(selection, options):
+    fixtures = Fixtures(scale=0.1 if options.quick else 1.0)
+    repeat = options.repeat or (3 if options.quick else None)
+    results = {}
+    try:
+        for case in selection:
+            print(f"{case.name:<40}", end=" ", file=sys.stderr, flush=True)
+            try:
+                result = measure(case, fixtures, repeat)
+            except Exception as e:
+                # One broken case (say, no `true` on this system) doesn't end the run
+                print(f"error: {e}", file=sys.stderr)
+                continue
+            if case.threshold is not None:
+                result["threshold"] = case.threshold
+            results[case.name] = result
+            print(f"{format_seconds(result['median']):>10}  (min {format_seconds(result['min'])}, "
+                  f"stdev {format_seconds(result['stdev'])})", file=sys.stderr)
+    finally:
+        fixtures.close()
+    return {
+        "version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": machine_info(),
+        "scale": fixtures.scale,
+        "benchmarks": results,
+    }
+
+def report_comparison(report, baseline, options, selection):
+    """Prints the comparison table and returns the number of regressions."""
+    if baseline.get("scale") != report["scale"]:
+        print("warning: baseline was recorded at a different --quick scale", file=sys.stderr)
+    if baseline.get("machine") != report["machine"]:
+        print("warning: baseline was recorded on a different machine or Python", file=sys.stderr)
+    rows = compare(report, baseline, options.threshold, options.min_delta, {case.name for case in selection})
+    print(f"{'benchmark':<40} {'baseline':>10} {'current':>10} {'change':>8}  verdict")
+    regressions = 0
+    for name, before, after, verdict in rows:
+        change = f"{(after / before - 1) * 100:+.1f}%" if before and after else "-"
+        print(f"{name:<40} {format_seconds(before):>10} {format_seconds(after):>10} {change:>8}  {verdict}")
+        regressions += verdict == "REGRESSION"
+    return regressions
+
+def main(argv=None):
+    options = parse_args(sys.argv[1:] if argv is None else argv)
+    selection = selected(options.patterns)
+    if options.list:
+        for case in selection:
+            print(case.name)
+        return 0
+    if not selection:
+        print("benchmarks: nothing matches", file=sys.stderr)
+        return 2
+
+    baseline = None
+    if options.baseline:
+        try:
+            with open(options.baseline) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"benchmarks: {options.baseline}: {e}", file=sys.stderr)
+            return 2
+
+    report = run_suite(selection, options)
+    for path in filter(None, (options.output, options.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    print(f"report: {options.output}", file=sys.stderr)
+
+    if baseline is not None:
+        regressions = report_comparison(report, baseline, options, selection)
+        if regressions:
+            print(f"{regressions} regression(s) over {options.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
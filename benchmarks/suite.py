@@ -0,0 +1,139 @@
+import contextlib
+import os
+import statistics
+import sys
+import time
+
+# Format of the JSON reports, bumped when their layout changes
+REPORT_VERSION = 1
+
+class Benchmark:
+    """
+    One registered case. `setup(fixtures[, param])` prepares what it needs and
+    returns the callable to time, or (callable, reset) when every sample has
+    to start from the same state (reset runs untimed before each sample).
+    """
+
+    def __init__(self, name, setup, group, repeat, number, threshold, param=None):
+        self.name = name
+        self.setup = setup
+        self.group = group
+        self.repeat = repeat
+        self.number = number
+        self.threshold = threshold
+        self.param = param
+
+# Every case, in registration order
+BENCHMARKS = []
+
+def benchmark(name, repeat=20, number=1, threshold=None, params=None):
+    """
+    Registers a case. Each of the `repeat` samples times `number` calls, and
+    the per-call time is reported. With `params`, one case per value is
+    registered as name[value] and the value is passed to the setup function.
+    `threshold` overrides the regression threshold for noisy cases.
+    """
+    group = name.split("/", 1)[0]
+
+    def register(setup):
+        for param in params if params is not None else [None]:
+            full_name = name if param is None else f"{name}[{param}]"
+            BENCHMARKS.append(Benchmark(full_name, setup, group, repeat, number, threshold, param))
+        return setup
+
+    return register
+
+@contextlib.contextmanager
+def quiet():
+    """Points fds 1 and 2 at /dev/null, so builtins and child processes print nowhere."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in saved + [devnull]:
+            os.close(fd)
+
+def measure(case, fixtures, repeat=None):
+    """Runs one case and returns its result dict (times in seconds per call)."""
+    prepared = case.setup(fixtures) if case.param is None else case.setup(fixtures, case.param)
+    func, reset = prepared if isinstance(prepared, tuple) else (prepared, None)
+    number = case.number
+    samples = []
+    with quiet():
+        # One untimed call, so imports and first-use caches aren't in the numbers
+        if reset is not None:
+            reset()
+        func()
+        for _ in range(repeat or case.repeat):
+            if reset is not None:
+                reset()
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - start) / number)
+    return {
+        "group": case.group,
+        "samples": len(samples),
+        "number": number,
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "max": max(samples),
+    }
+
+def machine_info():
+    import platform
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def compare(report, baseline, threshold, min_delta, selected=None):
+    """
+    (name, baseline median, new median, verdict) for every benchmark in
+    either report (baseline entries only among the `selected` names, when
+    given). A benchmark regressed when its median grew by more than its
+    threshold and by more than `min_delta` seconds (timer noise).
+    """
+    rows = []
+    old, new = baseline["benchmarks"], report["benchmarks"]
+    dropped = [name for name in old if name not in new and (selected is None or name in selected)]
+    for name in list(new) + dropped:
+        if name not in old:
+            rows.append((name, None, new[name]["median"], "new"))
+            continue
+        if name not in new:
+            rows.append((name, old[name]["median"], None, "missing"))
+            continue
+        before, after = old[name]["median"], new[name]["median"]
+        limit = new[name].get("threshold") or threshold
+        if after > before * (1 + limit) and after - before > min_delta:
+            verdict = "REGRESSION"
+        elif before > after * (1 + limit) and before - after > min_delta:
+            verdict = "faster"
+        else:
+            verdict = "ok"
+        rows.append((name, before, after, verdict))
+    return rows
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.3f}s"
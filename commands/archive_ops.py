@@ -1,25 +1,361 @@
-import subprocess
+import os
+import sys
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.jobs import process_pool_context
+
+# Files above this size are compressed by the parent in streaming mode, so a
+# worker never has to hold a huge file (or its compressed copy) in memory.
+_STREAM_THRESHOLD = 32 * 1024 * 1024
+# Small files are grouped so each worker task carries about this much data
+_BATCH_BYTES = 4 * 1024 * 1024
+_BATCH_FILES = 256
+# Archives smaller than this are handled in-process, a pool costs more than it saves
+_PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+def _human(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+class _Progress:
+    """Single-line progress on stderr, only drawn when stderr is a terminal."""
+
+    def __init__(self, verb, total_files, total_bytes):
+        self.verb = verb
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.files = 0
+        self.bytes = 0
+        self.enabled = sys.stderr.isatty()
+        self._last_draw = 0.0
+
+    def advance(self, files, size):
+        self.files += files
+        self.bytes += size
+        now = time.monotonic()
+        if self.enabled and (now - self._last_draw > 0.1 or self.files == self.total_files):
+            self._last_draw = now
+            percent = self.bytes / self.total_bytes * 100 if self.total_bytes else 100.0
+            sys.stderr.write(f"\r  {self.verb}: {self.files}/{self.total_files} files, {_human(self.bytes)} ({percent:.0f}%)")
+            sys.stderr.flush()
+
+    def done(self):
+        if self.enabled:
+            sys.stderr.write("\r\033[K")
+            sys.stderr.flush()
+
+def _compress_batch(paths, level):
+    """
+    Worker: returns (crc, size, compress_type, data) for each file. Data is a
+    raw deflate stream, or the file itself when deflate doesn't make it smaller.
+    """
+    results = []
+    for path in paths:
+        with open(path, "rb") as f:
+            raw = f.read()
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        data = compressor.compress(raw) + compressor.flush()
+        if len(data) >= len(raw):
+            results.append((zlib.crc32(raw), len(raw), zipfile.ZIP_STORED, raw))
+        else:
+            results.append((zlib.crc32(raw), len(raw), zipfile.ZIP_DEFLATED, data))
+    return results
+
+# _write_precompressed relies on ZipFile internals (start_dir, _writecheck,
+# _didModify) that zipfile has no public equivalent for. They are checked
+# on these Python versions (tests/test_archive.py), elsewhere every entry
+# goes through ZipFile.write and is compressed by the parent.
+_PRECOMPRESSED_VERSIONS = ((3, 8), (3, 13))
+
+def _can_write_precompressed(zf):
+    first, last = _PRECOMPRESSED_VERSIONS
+    return (first <= sys.version_info[:2] <= last
+            and all(hasattr(zf, name) for name in ("start_dir", "_writecheck", "_didModify")))
+
+def _write_precompressed(zf, zinfo, data):
+    """
+    Appends an entry whose data was already compressed by a worker. This is
+    what ZipFile.open(..., "w") does, minus the compression step. Only
+    called where _can_write_precompressed(zf) holds.
+    """
+    zf.fp.seek(zf.start_dir)
+    zinfo.header_offset = zf.fp.tell()
+    zf._writecheck(zinfo)
+    zf._didModify = True
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    zf.fp.write(zinfo.FileHeader(zip64))
+    zf.fp.write(data)
+    zf.start_dir = zf.fp.tell()
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo
+
+def _archive_name(path):
+    # Like zip: relative paths as given, no leading slash or drive
+    name = os.path.normpath(os.path.splitdrive(path)[1]).replace(os.sep, "/")
+    return name.lstrip("/")
+
+def _collect(paths, recursive):
+    """Returns (files, dirs) to archive as lists of (path, arcname, size)."""
+    files, dirs = [], []
+    for path in paths:
+        if os.path.isdir(path):
+            dirs.append((path, _archive_name(path), 0))
+            if not recursive:
+                print(f"zip: {path} is a directory (use -r to include its contents)")
+                continue
+            for root, subdirs, names in os.walk(path):
+                subdirs.sort()
+                for d in subdirs:
+                    full = os.path.join(root, d)
+                    dirs.append((full, _archive_name(full), 0))
+                for name in sorted(names):
+                    full = os.path.join(root, name)
+                    try:
+                        files.append((full, _archive_name(full), os.path.getsize(full)))
+                    except OSError as e:
+                        print(f"zip: skipping {full}: {e.strerror}")
+        elif os.path.exists(path):
+            files.append((path, _archive_name(path), os.path.getsize(path)))
+        else:
+            print(f"zip: {path}: No such file or directory")
+    return files, dirs
+
+def _batches(files):
+    """Groups small files into worker tasks of roughly _BATCH_BYTES each."""
+    batch, batch_bytes = [], 0
+    for entry in files:
+        batch.append(entry)
+        batch_bytes += entry[2]
+        if batch_bytes >= _BATCH_BYTES or len(batch) >= _BATCH_FILES:
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+def _parse_jobs(value):
+    jobs = int(value)
+    if jobs < 1:
+        raise ValueError(value)
+    return jobs
+
 def handle_zip(args):
-    if not args or len(args) < 2:
-        print("Usage: zip <archive_name> <file1> <file2> ...")
-        return
+    """
+    Compresses files into a .zip archive natively with zipfile, no external zip
+    needed. Entries are deflated in parallel across a process pool, then
+    written into the archive in order.
+    Options: -r recurse into directories, -0..-9 compression level, -j N workers, -q quiet.
+    """
+    recursive, quiet, level, jobs = False, False, 6, os.cpu_count() or 1
+    rest = []
+    try:
+        args = list(args)
+        while args:
+            arg = args.pop(0)
+            if arg == "-r":
+                recursive = True
+            elif arg == "-q":
+                quiet = True
+            elif arg == "-j":
+                jobs = _parse_jobs(args.pop(0))
+            elif len(arg) == 2 and arg[0] == "-" and arg[1].isdigit():
+                level = int(arg[1])
+            else:
+                rest.append(arg)
+    except (ValueError, IndexError):
+        rest = []
+    if len(rest) < 2:
+        print("Usage: zip [-r] [-0..-9] [-j JOBS] [-q] <archive_name> <file1> <file2> ...")
+        return 1
+
+    archive, paths = rest[0], rest[1:]
+    if not archive.endswith(".zip") and not os.path.exists(archive):
+        archive += ".zip"
+    started = time.monotonic()
+    files, dirs = _collect(paths, recursive)
+    archive_path = os.path.abspath(archive)
+    files = [f for f in files if os.path.abspath(f[0]) != archive_path]
 
+    small = [f for f in files if f[2] <= _STREAM_THRESHOLD]
+    large = [f for f in files if f[2] > _STREAM_THRESHOLD]
+    total_bytes = sum(f[2] for f in files)
+    progress = _Progress("zip", len(files), total_bytes)
+    if quiet:
+        progress.enabled = False
+
+    executor = None
     try:
-        # The 'zip' command is external, so we'll use subprocess
-        subprocess.run(["zip"] + args, check=True)
-    except FileNotFoundError:
-        print("Error: 'zip' not found. Is it installed on your system?")
-    except subprocess.CalledProcessError as e:
+        with zipfile.ZipFile(archive, "a" if os.path.exists(archive) else "w", zipfile.ZIP_DEFLATED,
+                             compresslevel=level) as zf:
+            if not _can_write_precompressed(zf):
+                small, large = [], small + large
+            if jobs > 1 and sum(f[2] for f in small) >= _PARALLEL_MIN_BYTES:
+                executor = ProcessPoolExecutor(max_workers=jobs, mp_context=process_pool_context())
+            # zipfile can't replace entries in place, so names already in the
+            # archive are kept as they are instead of being duplicated
+            existing = set(zf.NameToInfo)
+            skipped = [f for f in files if f[1] in existing]
+            for path, arcname, _ in skipped:
+                print(f"zip: {arcname} already in {archive}, skipped")
+            if skipped:
+                small = [f for f in small if f[1] not in existing]
+                large = [f for f in large if f[1] not in existing]
+            for path, arcname, _ in dirs:
+                if arcname + "/" not in existing:
+                    zf.write(path, arcname)
+
+            batches = _batches(small)
+            pending = deque()
+            window = jobs * 4 if executor else 1
+
+            def submit_next():
+                batch = next(batches, None)
+                if batch is None:
+                    return False
+                paths_only = [os.path.abspath(p) for p, _, _ in batch]
+                if executor:
+                    pending.append((batch, executor.submit(_compress_batch, paths_only, level)))
+                else:
+                    pending.append((batch, _compress_batch(paths_only, level)))
+                return True
+
+            # Keep a bounded window of batches in flight, consumed in order so
+            # the archive layout is deterministic and memory stays bounded
+            while len(pending) < window and submit_next():
+                pass
+            while pending:
+                batch, result = pending.popleft()
+                results = result.result() if executor else result
+                submit_next()
+                for (path, arcname, _), (crc, size, compress_type, data) in zip(batch, results):
+                    zinfo = zipfile.ZipInfo.from_file(path, arcname, strict_timestamps=False)
+                    zinfo.compress_type = compress_type
+                    zinfo.CRC = crc
+                    zinfo.file_size = size
+                    zinfo.compress_size = len(data)
+                    _write_precompressed(zf, zinfo, data)
+                progress.advance(len(batch), sum(f[2] for f in batch))
+
+            for path, arcname, size in large:
+                zf.write(path, arcname)
+                progress.advance(1, size)
+    except (OSError, zipfile.BadZipFile) as e:
+        progress.done()
         print(f"Error zipping files: {e}")
+        return 1
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    progress.done()
+
+    if not quiet:
+        elapsed = time.monotonic() - started
+        print(f"Created {archive}: {progress.files} files, {_human(progress.bytes)} -> "
+              f"{_human(os.path.getsize(archive))} in {elapsed:.2f}s")
+
+def _extract_members(archive, names, dest):
+    """Worker: extracts the named members, returning (files, bytes) written."""
+    count = size = 0
+    with zipfile.ZipFile(archive) as zf:
+        for name in names:
+            info = zf.getinfo(name)
+            target = zf.extract(info, dest)
+            # zipfile drops Unix permissions, restore them like unzip does (without
+            # setuid, setgid and sticky, an archive shouldn't be able to grant those)
+            mode = (info.external_attr >> 16) & 0o777
+            if mode and os.name == "posix":
+                os.chmod(target, mode)
+            count += 1
+            size += info.file_size
+    return count, size
+
+def _partition(infos, parts):
+    """Splits members into `parts` groups of similar total size (largest first)."""
+    groups = [[0, []] for _ in range(parts)]
+    for info in sorted(infos, key=lambda i: i.file_size, reverse=True):
+        group = min(groups, key=lambda g: g[0])
+        group[0] += info.file_size
+        group[1].append(info.filename)
+    return [names for _, names in groups if names]
 
 def handle_unzip(args):
-    if not args:
-        print("Usage: unzip <archive_name>")
-        return
+    """
+    Extracts files from a .zip archive natively with zipfile. Large archives
+    are split across a process pool, each worker streaming its share of the
+    entries to disk.
+    Options: -d DIR destination, -j N workers, -l list contents, -q quiet.
+    """
+    dest, jobs, list_only, quiet = ".", os.cpu_count() or 1, False, False
+    rest = []
+    try:
+        args = list(args)
+        while args:
+            arg = args.pop(0)
+            if arg == "-d":
+                dest = args.pop(0)
+            elif arg == "-j":
+                jobs = _parse_jobs(args.pop(0))
+            elif arg == "-l":
+                list_only = True
+            elif arg == "-q":
+                quiet = True
+            else:
+                rest.append(arg)
+    except (ValueError, IndexError):
+        rest = []
+    if len(rest) != 1:
+        print("Usage: unzip [-d DIR] [-j JOBS] [-l] [-q] <archive_name>")
+        return 1
 
+    archive = rest[0]
+    started = time.monotonic()
     try:
-        subprocess.run(["unzip"] + args, check=True)
-    except FileNotFoundError:
-        print("Error: 'unzip' not found. Is it installed on your system?")
-    except subprocess.CalledProcessError as e:
-        print(f"Error unzipping file: {e}")
\ No newline at end of file
+        with zipfile.ZipFile(archive) as zf:
+            infos = zf.infolist()
+            if list_only:
+                print(f"{'Length':>10}  {'Date':<10} {'Time':<5}  Name")
+                for info in infos:
+                    y, mo, d, h, mi, _ = info.date_time
+                    print(f"{info.file_size:>10}  {y:04}-{mo:02}-{d:02} {h:02}:{mi:02}  {info.filename}")
+                print(f"{sum(i.file_size for i in infos):>10}  {'':16}  {len(infos)} files")
+                return
+            # Directories are created up front so workers never race on them
+            for info in infos:
+                if info.is_dir():
+                    zf.extract(info, dest)
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"Error unzipping file: {e}")
+        return 1
+
+    members = [i for i in infos if not i.is_dir()]
+    total_bytes = sum(i.file_size for i in members)
+    progress = _Progress("unzip", len(members), total_bytes)
+    if quiet:
+        progress.enabled = False
+
+    try:
+        if jobs > 1 and len(members) > 1 and total_bytes >= _PARALLEL_MIN_BYTES:
+            # More chunks than workers so progress moves and stragglers balance out
+            chunks = _partition(members, min(len(members), jobs * 4))
+            archive_path, dest_path = os.path.abspath(archive), os.path.abspath(dest)
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=process_pool_context()) as executor:
+                futures = [executor.submit(_extract_members, archive_path, names, dest_path)
+                           for names in chunks]
+                for future in futures:
+                    progress.advance(*future.result())
+        else:
+            progress.advance(*_extract_members(archive, [i.filename for i in members], dest))
+    except (OSError, zipfile.BadZipFile) as e:
+        progress.done()
+        print(f"Error unzipping file: {e}")
+        return 1
+    progress.done()
+
+    if not quiet:
+        elapsed = time.monotonic() - started
+        print(f"Extracted {len(members)} files ({_human(total_bytes)}) from {archive} in {elapsed:.2f}s")
@@ -18,6 +18,26 @@ PLATFORM_COMMANDS = {
         "linux": ["rm", "-r"],
         "darwin": ["rm", "-r"],
     },
+    "cp": {
+        "win32": ["cmd", "/c", "copy"],
+        "linux": ["cp"],
+        "darwin": ["cp"],
+    },
+    "copy": {
+        "win32": ["cmd", "/c", "copy"],
+        "linux": ["cp"],
+        "darwin": ["cp"],
+    },
+    "mv": {
+        "win32": ["cmd", "/c", "move"],
+        "linux": ["mv"],
+        "darwin": ["mv"],
+    },
+    "move": {
+        "win32": ["cmd", "/c", "move"],
+        "linux": ["mv"],
+        "darwin": ["mv"],
+    },
     "cat": {
         "win32": ["cmd", "/c", "type"],
         "linux": ["cat"],
@@ -0,0 +1,484 @@
+import errno
+import os
+import stat
+import sys
+import threading
+import time
+
+from commands.file_ops import _human_size
+
+# Bytes handed to the kernel per copy_file_range/sendfile call, small enough
+# for --progress to move and Ctrl+C to land between calls
+_COPY_CHUNK = 8 * 1024 * 1024
+_BUFFER_SIZE = 1024 * 1024
+# Small files are copied in batches, so a tree of tiny files isn't one pool task per file
+_CP_BATCH = 64
+_CP_BATCH_BYTES = 64 * 1024 * 1024
+# Copying is I/O-bound, threads overlap the waits on the disk
+_CP_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Errors that mean "this kernel path can't copy these two files", not "the copy failed"
+_FALLBACK_ERRNOS = frozenset(getattr(errno, name) for name in ("EXDEV", "EINVAL", "ENOSYS", "EOPNOTSUPP", "ENOTSUP", "EBADF")
+                             if hasattr(errno, name))
+
+def _copy_file_range(src_fd, dst_fd, count):
+    return os.copy_file_range(src_fd, dst_fd, count)
+
+def _sendfile(src_fd, dst_fd, count):
+    return os.sendfile(dst_fd, src_fd, None, count)
+
+# Zero-copy paths, tried in order. copy_file_range lets the filesystem clone
+# or copy server-side; sendfile to a regular file still keeps the data in the kernel.
+_KERNEL_COPIES = tuple(
+    func for func, available in ((_copy_file_range, hasattr(os, "copy_file_range")),
+                                 (_sendfile, hasattr(os, "sendfile") and sys.platform.startswith("linux")))
+    if available)
+
+class _Progress:
+    """
+    Throughput line for --progress: files, bytes and rate on stderr, redrawn
+    at most ten times a second from whichever thread is copying.
+    """
+
+    def __init__(self, verb, enabled, total_bytes=None):
+        self.verb = verb
+        self.enabled = enabled
+        self.live = enabled and sys.stderr.isatty()
+        self.total_bytes = total_bytes
+        self.files = self.bytes = 0
+        self.started = time.perf_counter()
+        self._last_draw = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, size, files=0):
+        with self._lock:
+            self.bytes += size
+            self.files += files
+            if not self.live:
+                return
+            now = time.perf_counter()
+            if now - self._last_draw < 0.1:
+                return
+            self._last_draw = now
+            line = self._line(now)
+        sys.stderr.write(f"\r\033[K{line}")
+        sys.stderr.flush()
+
+    def _line(self, now):
+        elapsed = max(now - self.started, 1e-9)
+        line = f"{self.verb}: {self.files} files, {_human_size(self.bytes)}B"
+        if self.total_bytes:
+            line += f" of {_human_size(self.total_bytes)}B ({self.bytes / self.total_bytes:.0%})"
+        return line + f" at {_human_size(self.bytes / elapsed)}B/s"
+
+    def done(self):
+        if not self.enabled:
+            return
+        if self.live:
+            sys.stderr.write("\r\033[K")
+        now = time.perf_counter()
+        print(f"{self._line(now)} in {now - self.started:.2f}s", file=sys.stderr)
+
+def _copy_data(src_fd, dst_fd, size, progress):
+    """
+    Copies src_fd to dst_fd from their current positions. The kernel paths
+    are tried first, and each one picks up where the last stopped, so a
+    filesystem that refuses one part way through costs nothing. Whatever
+    they leave (and files that claim to be empty, like /proc) is read through
+    a buffer to EOF.
+    """
+    copied = 0
+    for kernel_copy in _KERNEL_COPIES if size else ():
+        try:
+            while copied < size:
+                n = kernel_copy(src_fd, dst_fd, min(_COPY_CHUNK, size - copied))
+                if not n:
+                    break
+                copied += n
+                if progress is not None:
+                    progress.add(n)
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+            continue
+        if copied >= size:
+            break
+    while True:
+        chunk = os.read(src_fd, _BUFFER_SIZE)
+        if not chunk:
+            return
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(dst_fd, view):]
+        if progress is not None:
+            progress.add(len(chunk))
+
+def _copy_metadata(path, st, fd=None):
+    """Permission bits and access/modification times of `st`, as -p and mv keep them."""
+    target = path if fd is None or os.utime not in os.supports_fd else fd
+    os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+    if fd is not None and hasattr(os, "fchmod"):
+        os.fchmod(fd, stat.S_IMODE(st.st_mode))
+    else:
+        os.chmod(path, stat.S_IMODE(st.st_mode))
+
+def _copy_file(src, dst, st, preserve, progress):
+    """Copies one regular file or symlink (as a symlink) to dst, replacing a file there."""
+    if stat.S_ISLNK(st.st_mode):
+        target = os.readlink(src)
+        try:
+            os.symlink(target, dst)
+        except FileExistsError:
+            os.unlink(dst)
+            os.symlink(target, dst)
+        if preserve and os.utime in os.supports_follow_symlinks:
+            os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns), follow_symlinks=False)
+        if progress is not None:
+            progress.add(0, 1)
+        return
+    if not stat.S_ISREG(st.st_mode):
+        raise OSError(errno.EINVAL, "not a regular file")
+    src_fd = os.open(src, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0),
+                         stat.S_IMODE(st.st_mode) & 0o777)
+        try:
+            _copy_data(src_fd, dst_fd, st.st_size, progress)
+            if preserve:
+                _copy_metadata(dst, st, dst_fd)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    if progress is not None:
+        progress.add(0, 1)
+
+class _TreeCopier:
+    """
+    Copies files and directory trees on a thread pool. Every directory is
+    scanned by its own task, which creates its copy and hands the files on
+    in batches, so big trees keep every worker busy. Directory permissions
+    and times are applied last, once nothing more is written into them.
+    """
+
+    def __init__(self, executor, verb, preserve, no_clobber, progress):
+        self.executor = executor
+        self.verb = verb
+        self.preserve = preserve
+        self.no_clobber = no_clobber
+        self.progress = progress
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.idle = threading.Event()
+        self.idle.set()
+        self.errors = []
+        # (dst, source stat) of every directory created, parents first
+        self.dirs = []
+
+    def _submit(self, func, *args):
+        with self.lock:
+            self.pending += 1
+            self.idle.clear()
+        self.executor.submit(self._task, func, args)
+
+    def _task(self, func, args):
+        try:
+            func(*args)
+        except Exception as e:
+            self._error(args[0], e)
+        finally:
+            with self.lock:
+                self.pending -= 1
+                if not self.pending:
+                    self.idle.set()
+
+    def _error(self, path, e):
+        with self.lock:
+            self.errors.append(f"{self.verb}: cannot copy '{path}': {getattr(e, 'strerror', None) or e}")
+
+    def copy_file(self, src, dst, st):
+        self._submit(self._copy_batch, [(src, dst, st)])
+
+    def copy_tree(self, src, dst, st):
+        self._submit(self._copy_dir, src, dst, st)
+
+    def wait(self):
+        self.idle.wait()
+
+    def _copy_batch(self, batch):
+        for src, dst, st in batch:
+            try:
+                if self.no_clobber and os.path.lexists(dst):
+                    continue
+                _copy_file(src, dst, st, self.preserve, self.progress)
+            except Exception as e:
+                self._error(src, e)
+
+    def _copy_dir(self, src, dst, st):
+        # Writable for us until finish() sets the real mode
+        try:
+            os.mkdir(dst, stat.S_IMODE(st.st_mode) | stat.S_IRWXU)
+        except FileExistsError:
+            if not os.path.isdir(dst):
+                raise
+        with self.lock:
+            self.dirs.append((dst, st))
+        batch, batch_bytes = [], 0
+        with os.scandir(src) as it:
+            for entry in it:
+                try:
+                    entry_st = entry.stat(follow_symlinks=False)
+                except OSError as e:
+                    self._error(entry.path, e)
+                    continue
+                target = os.path.join(dst, entry.name)
+                if stat.S_ISDIR(entry_st.st_mode):
+                    self._submit(self._copy_dir, entry.path, target, entry_st)
+                    continue
+                if not (stat.S_ISREG(entry_st.st_mode) or stat.S_ISLNK(entry_st.st_mode)):
+                    self._error(entry.path, "not a regular file, skipped")
+                    continue
+                batch.append((entry.path, target, entry_st))
+                batch_bytes += entry_st.st_size
+                if len(batch) >= _CP_BATCH or batch_bytes >= _CP_BATCH_BYTES:
+                    self._submit(self._copy_batch, batch)
+                    batch, batch_bytes = [], 0
+        if batch:
+            self._copy_batch(batch)
+
+    def finish(self):
+        """Applies directory metadata, deepest first so setting a parent's mtime sticks."""
+        for dst, st in reversed(self.dirs):
+            try:
+                if self.preserve:
+                    _copy_metadata(dst, st)
+                elif stat.S_IMODE(st.st_mode) & stat.S_IRWXU != stat.S_IRWXU:
+                    # Take back the owner bits added to make the copy writable
+                    current = stat.S_IMODE(os.stat(dst).st_mode)
+                    os.chmod(dst, current & (stat.S_IMODE(st.st_mode) | ~stat.S_IRWXU))
+            except OSError as e:
+                self._error(dst, e)
+
+def _parse_options(verb, args, flags):
+    """Splits args into (set of single-letter flags, progress, operands)."""
+    options, progress, operands = set(), False, []
+    only_operands = False
+    for arg in args:
+        if only_operands or arg == "-" or not arg.startswith("-"):
+            operands.append(arg)
+        elif arg == "--":
+            only_operands = True
+        elif arg == "--progress":
+            progress = True
+        elif set(arg[1:]) <= set(flags):
+            options.update(arg[1:])
+        else:
+            raise ValueError(f"{verb}: invalid option '{arg}'")
+    return options, progress, operands
+
+def _targets(verb, operands):
+    """
+    Pairs every source with its destination path: inside DEST when DEST is a
+    directory (required for several sources), DEST itself otherwise.
+    """
+    *sources, dest = operands
+    if os.path.isdir(dest):
+        return [(src, os.path.join(dest, os.path.basename(src.rstrip(os.sep) or src))) for src in sources]
+    if len(sources) > 1:
+        raise ValueError(f"{verb}: target '{dest}' is not a directory")
+    return [(sources[0], dest)]
+
+def _inside(path, directory):
+    """True if `path` is `directory` or somewhere below it."""
+    path, directory = os.path.realpath(path), os.path.realpath(directory)
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+def _same_file(src_st, dst):
+    try:
+        dst_st = os.stat(dst)
+    except OSError:
+        return False
+    return (src_st.st_dev, src_st.st_ino) == (dst_st.st_dev, dst_st.st_ino)
+
+def _run_copies(verb, jobs, preserve, no_clobber, progress):
+    """
+    Copies (src, dst, stat) jobs, in process for a lone file and on a thread
+    pool otherwise. Returns the list of error messages.
+    """
+    if len(jobs) == 1 and not stat.S_ISDIR(jobs[0][2].st_mode):
+        src, dst, st = jobs[0]
+        if no_clobber and os.path.lexists(dst):
+            return []
+        try:
+            _copy_file(src, dst, st, preserve, progress)
+        except OSError as e:
+            return [f"{verb}: cannot copy '{src}': {e.strerror or e}"]
+        return []
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=_CP_WORKERS) as executor:
+        copier = _TreeCopier(executor, verb, preserve, no_clobber, progress)
+        for src, dst, st in jobs:
+            if stat.S_ISDIR(st.st_mode):
+                copier.copy_tree(src, dst, st)
+            else:
+                copier.copy_file(src, dst, st)
+        try:
+            copier.wait()
+        except KeyboardInterrupt:
+            # Stop here instead of letting the queued tasks finish the job
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    copier.finish()
+    return copier.errors
+
+def handle_cp(args):
+    """
+    Copies files, and directory trees with -r/-R, on a thread pool. Data is
+    moved by the kernel (copy_file_range, then sendfile) where it can be,
+    with a buffered copy as the fallback. -p keeps modes and times (-a is
+    -rp), -n never overwrites and --progress reports files, bytes and rate.
+    """
+    usage = "Usage: cp [-r] [-p] [-n] [--progress] <source> ... <destination>"
+    try:
+        options, show_progress, operands = _parse_options("cp", args, "rRpanfv")
+    except ValueError as e:
+        print(e)
+        print(usage)
+        return 1
+    if len(operands) < 2:
+        print(usage)
+        return 1
+    recursive = bool(options & set("rRa"))
+    preserve = bool(options & set("pa"))
+    try:
+        targets = _targets("cp", operands)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    status = 0
+    jobs = []
+    for src, dst in targets:
+        try:
+            # Operands are followed, like GNU cp; symlinks inside trees are copied as links
+            st = os.stat(src)
+        except FileNotFoundError:
+            print(f"cp: No such file or directory: {src}")
+            status = 1
+            continue
+        except OSError as e:
+            print(f"cp: cannot stat '{src}': {e.strerror}")
+            status = 1
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            if not recursive:
+                print(f"cp: -r not specified; omitting directory '{src}'")
+                status = 1
+                continue
+            if _inside(dst, src):
+                print(f"cp: cannot copy directory '{src}' into itself, '{dst}'")
+                status = 1
+                continue
+        elif os.path.isdir(dst):
+            print(f"cp: cannot overwrite directory '{dst}' with non-directory")
+            status = 1
+            continue
+        if _same_file(st, dst):
+            print(f"cp: '{src}' and '{dst}' are the same file")
+            status = 1
+            continue
+        jobs.append((src, dst, st))
+    if not jobs:
+        return status
+
+    total = None if any(stat.S_ISDIR(st.st_mode) for _, _, st in jobs) else sum(st.st_size for _, _, st in jobs)
+    progress = _Progress("cp", show_progress, total)
+    try:
+        errors = _run_copies("cp", jobs, preserve, "n" in options, progress)
+    finally:
+        progress.done()
+    for error in errors:
+        print(error)
+    return 1 if errors else (status or None)
+
+def _remove_source(path, st):
+    if stat.S_ISDIR(st.st_mode):
+        import shutil
+
+        shutil.rmtree(path)
+    else:
+        os.unlink(path)
+
+def handle_mv(args):
+    """
+    Moves or renames files and directories. Within one filesystem this is a
+    single rename. Across filesystems the source is copied like `cp -a` (in
+    parallel, zero-copy where possible) and removed once the copy is
+    complete. -n never overwrites, --progress reports cross-device copies.
+    """
+    usage = "Usage: mv [-n] [--progress] <source> ... <destination>"
+    try:
+        options, show_progress, operands = _parse_options("mv", args, "nfv")
+    except ValueError as e:
+        print(e)
+        print(usage)
+        return 1
+    if len(operands) < 2:
+        print(usage)
+        return 1
+    try:
+        targets = _targets("mv", operands)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    status = 0
+    progress = None
+    for src, dst in targets:
+        try:
+            st = os.lstat(src)
+        except FileNotFoundError:
+            print(f"mv: No such file or directory: {src}")
+            status = 1
+            continue
+        except OSError as e:
+            print(f"mv: cannot stat '{src}': {e.strerror}")
+            status = 1
+            continue
+        if "n" in options and os.path.lexists(dst):
+            continue
+        if stat.S_ISDIR(st.st_mode) and _inside(dst, src):
+            print(f"mv: cannot move '{src}' to a subdirectory of itself, '{dst}'")
+            status = 1
+            continue
+        if not stat.S_ISDIR(st.st_mode) and os.path.isdir(dst) and not os.path.islink(dst):
+            print(f"mv: cannot overwrite directory '{dst}' with non-directory")
+            status = 1
+            continue
+        try:
+            os.replace(src, dst)
+            continue
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                print(f"mv: cannot move '{src}' to '{dst}': {e.strerror}")
+                status = 1
+                continue
+        # Different filesystems: copy everything, then drop the source
+        if progress is None:
+            progress = _Progress("mv", show_progress)
+        errors = _run_copies("mv", [(src, dst, st)], True, False, progress)
+        for error in errors:
+            print(error)
+        if errors:
+            print(f"mv: '{src}' was not removed")
+            status = 1
+            continue
+        try:
+            _remove_source(src, st)
+        except OSError as e:
+            print(f"mv: cannot remove '{src}': {e.strerror}")
+            status = 1
+    if progress is not None:
+        progress.done()
+    return status or None
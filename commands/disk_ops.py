@@ -0,0 +1,347 @@
+import marshal
+import os
+import stat
+import sys
+import threading
+import time
+
+from commands.file_ops import _human_size
+
+# Per-directory scan results kept between `du --index` runs, one entry per
+# absolute directory path:
+#   (mtime_ns, inode, own_disk, own_apparent, files, subdir names, hardlinks)
+# where "own" covers the files directly inside, and hardlinks holds
+# (inode, disk, apparent) for multi-link files, which are deduplicated per run.
+# A directory whose mtime and inode are unchanged has the same entries, so
+# its listing isn't read again. Its subdirectories are still checked, each
+# against its own mtime, so only directories that changed are rescanned.
+DU_INDEX = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "nyra",
+    "du-index",
+)
+_INDEX_VERSION = 1
+# Directory scanning is syscall-bound, threads overlap the waits
+_DU_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+_INDEX_LOCK = threading.Lock()
+
+def _usage(st):
+    """(disk, apparent) bytes of a stat result. Windows has no st_blocks."""
+    blocks = getattr(st, "st_blocks", None)
+    return (st.st_size if blocks is None else blocks * 512), st.st_size
+
+def load_index(path=None):
+    try:
+        with open(path or DU_INDEX, "rb") as f:
+            data = marshal.load(f)
+        if data.get("version") == _INDEX_VERSION:
+            return data["dirs"]
+    except (OSError, EOFError, ValueError, TypeError, KeyError, AttributeError):
+        pass
+    return {}
+
+def save_index(index, path=None):
+    """Writes the index atomically, so a concurrent `du` reads the old or the new one."""
+    path = path or DU_INDEX
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(temporary, "wb") as f:
+            marshal.dump({"version": _INDEX_VERSION, "dirs": index}, f)
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+
+class _DiskScanner:
+    """
+    Sizes directory trees on a thread pool, one task per directory. Each
+    task lstat()s its directory, reuses the index entry when the mtime still
+    matches and scans the listing otherwise, then hands the subdirectories
+    on to the pool. Results are gathered per directory (`nodes`) and summed
+    up the tree once the walk is done.
+    """
+
+    def __init__(self, executor, index, one_filesystem):
+        self.executor = executor
+        self.index = index
+        self.one_filesystem = one_filesystem
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.idle = threading.Event()
+        self.idle.set()
+        self.errors = []
+        # path -> (parent, depth, own_disk, own_apparent, files, hardlinks, st_dev)
+        self.nodes = {}
+        # path -> index entry, for every directory read completely this run
+        self.fresh = {}
+        self.scanned = self.reused = 0
+
+    def _submit(self, *args):
+        with self.lock:
+            self.pending += 1
+            self.idle.clear()
+        self.executor.submit(self._task, *args)
+
+    def _task(self, path, parent, depth, dev, st):
+        try:
+            self._scan_dir(path, parent, depth, dev, st)
+        except FileNotFoundError:
+            # Removed since its parent was listed (or indexed)
+            pass
+        except OSError as e:
+            self._error(path, e)
+        finally:
+            with self.lock:
+                self.pending -= 1
+                if not self.pending:
+                    self.idle.set()
+
+    def _error(self, path, e):
+        with self.lock:
+            self.errors.append(f"du: cannot read directory '{path}': {e.strerror or e}")
+
+    def scan(self, root, st):
+        self._submit(root, None, 0, st.st_dev if self.one_filesystem else None, st)
+
+    def wait(self):
+        self.idle.wait()
+
+    def _scan_dir(self, path, parent, depth, dev, st):
+        if st is None:
+            st = os.lstat(path)
+            if not stat.S_ISDIR(st.st_mode):
+                return
+        if dev is not None and st.st_dev != dev:
+            return
+        entry = self.index.get(path)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_ino:
+            _, _, own_disk, own_apparent, files, subdirs, links = entry
+            reused = True
+        else:
+            own_disk = own_apparent = files = 0
+            subdirs, links = [], []
+            reused = False
+            try:
+                with os.scandir(path) as it:
+                    for item in it:
+                        try:
+                            if item.is_dir(follow_symlinks=False):
+                                subdirs.append(item.name)
+                                continue
+                            item_st = item.stat(follow_symlinks=False)
+                        except FileNotFoundError:
+                            continue
+                        files += 1
+                        disk, apparent = _usage(item_st)
+                        if item_st.st_nlink > 1:
+                            links.append((item_st.st_ino, disk, apparent))
+                        else:
+                            own_disk += disk
+                            own_apparent += apparent
+                entry = (st.st_mtime_ns, st.st_ino, own_disk, own_apparent, files, tuple(subdirs), tuple(links))
+            except OSError as e:
+                # Counted without its contents, and left out of the index to be retried
+                self._error(path, e)
+                entry = None
+        disk, apparent = _usage(st)
+        with self.lock:
+            self.nodes[path] = (parent, depth, own_disk + disk, own_apparent + apparent, files, links, st.st_dev)
+            if entry is not None:
+                self.fresh[path] = entry
+            if reused:
+                self.reused += 1
+            else:
+                self.scanned += 1
+        for name in subdirs:
+            self._submit(os.path.join(path, name), path, depth + 1, dev, None)
+
+    def totals(self):
+        """
+        path -> [disk, apparent, files] for the whole subtree. Hardlinked
+        files count once, for the first directory in path order.
+        """
+        seen = set()
+        totals = {}
+        for path in sorted(self.nodes):
+            _, _, disk, apparent, files, links, dev = self.nodes[path]
+            for inode, link_disk, link_apparent in links:
+                if (dev, inode) not in seen:
+                    seen.add((dev, inode))
+                    disk += link_disk
+                    apparent += link_apparent
+            totals[path] = [disk, apparent, files]
+        for path in sorted(self.nodes, key=lambda p: self.nodes[p][1], reverse=True):
+            parent = self.nodes[path][0]
+            if parent is not None:
+                parent_total, total = totals[parent], totals[path]
+                parent_total[0] += total[0]
+                parent_total[1] += total[1]
+                parent_total[2] += total[2]
+        return totals
+
+def _inside(path, directory):
+    """True if `path` is below `directory` (both absolute and normalized)."""
+    return path.startswith(directory.rstrip(os.sep) + os.sep)
+
+def _merge_index(index, roots, fresh):
+    """Replaces the entries below every scanned root with this run's, dropping removed directories."""
+    for root in roots:
+        for path in [p for p in index if p == root or _inside(p, root)]:
+            del index[path]
+    index.update(fresh)
+
+def _post_order_key(path):
+    # Children sort before their parent, like du prints them
+    return tuple(path.split(os.sep)) + ("\U0010ffff",)
+
+def _parse_du_args(args):
+    opts = {"human": False, "apparent": False, "max_depth": None, "top": None, "total": False,
+            "index": False, "one_filesystem": False, "verbose": False}
+    paths = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg.startswith("--max-depth") or arg.startswith("--top"):
+            name, sep, value = arg[2:].partition("=")
+            value = int(value if sep else args.pop(0))
+            if value < 0:
+                raise ValueError(arg)
+            opts[name.replace("-", "_")] = value
+        elif arg == "-d":
+            opts["max_depth"] = int(args.pop(0))
+        elif arg == "--apparent-size":
+            opts["apparent"] = True
+        elif arg == "--index":
+            opts["index"] = True
+        elif arg.startswith("-") and len(arg) > 1 and set(arg[1:]) <= set("shbcxv"):
+            for flag in arg[1:]:
+                if flag == "s":
+                    opts["max_depth"] = 0
+                elif flag == "h":
+                    opts["human"] = True
+                elif flag == "b":
+                    opts["apparent"] = True
+                elif flag == "c":
+                    opts["total"] = True
+                elif flag == "x":
+                    opts["one_filesystem"] = True
+                else:
+                    opts["verbose"] = True
+        elif arg.startswith("-") and len(arg) > 1:
+            raise ValueError(arg)
+        else:
+            paths.append(arg)
+    return opts, paths or ["."]
+
+def handle_du(args):
+    """
+    Shows disk usage per directory, walking the trees on a thread pool.
+    Hardlinked files are counted once. Sizes are in KiB of disk usage, -h
+    makes them human readable and -b/--apparent-size counts bytes of file
+    size instead. -s or --max-depth N limits the directories shown,
+    --top N lists the N largest, -c adds a grand total and -x stays on one
+    filesystem. --index keeps per-directory results on disk, so a later
+    --index run only rescans directories whose mtime changed (files that
+    grew in place inside an unchanged directory aren't seen until then).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    try:
+        opts, paths = _parse_du_args(args)
+    except (ValueError, IndexError):
+        print("Usage: du [-s] [-h] [-b] [-c] [-x] [-v] [--max-depth N] [--top N] [--index] [path ...]")
+        return 1
+
+    started = time.perf_counter()
+    status = 0
+    roots = []
+    singles = []
+    with _INDEX_LOCK:
+        index = load_index() if opts["index"] else {}
+    with ThreadPoolExecutor(max_workers=_DU_WORKERS) as executor:
+        scanner = _DiskScanner(executor, index, opts["one_filesystem"])
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                print(f"du: cannot access '{path}': {e.strerror}")
+                status = 1
+                continue
+            if not stat.S_ISDIR(st.st_mode):
+                singles.append((path, st))
+                continue
+            root = os.path.abspath(path)
+            if any(root == other or _inside(root, other) or _inside(other, root) for _, other in roots):
+                # Already counted as part of another operand
+                continue
+            roots.append((path, root))
+            scanner.scan(root, st)
+        try:
+            scanner.wait()
+        except KeyboardInterrupt:
+            # Stop here instead of letting the queued tasks finish the walk
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    for error in sorted(scanner.errors):
+        print(error)
+    if scanner.errors:
+        status = 1
+    totals = scanner.totals()
+    column = 1 if opts["apparent"] else 0
+
+    def format_size(size):
+        if opts["human"]:
+            return _human_size(size)
+        if opts["apparent"]:
+            return str(size)
+        return str(-(-size // 1024))
+
+    def display(path):
+        """The path as the user typed its root."""
+        for typed, root in roots:
+            if path == root:
+                return typed
+            if _inside(path, root):
+                return os.path.join(typed, path[len(root):].lstrip(os.sep))
+        return path
+
+    rows = []
+    for path, st in singles:
+        rows.append((_usage(st)[column], path))
+    grand_total = sum(size for size, _ in rows)
+    max_depth = opts["max_depth"]
+    for _, root in roots:
+        grand_total += totals.get(root, [0, 0])[column]
+    shown = [path for path in totals if max_depth is None or scanner.nodes[path][1] <= max_depth]
+    if opts["top"] is not None:
+        shown.sort(key=lambda p: totals[p][column], reverse=True)
+        shown = shown[:opts["top"]]
+    else:
+        shown.sort(key=_post_order_key)
+    rows.extend((totals[path][column], display(path)) for path in shown)
+
+    out = sys.stdout
+    for size, path in rows:
+        out.write(f"{format_size(size)}\t{path}\n")
+    if opts["total"]:
+        out.write(f"{format_size(grand_total)}\ttotal\n")
+    out.flush()
+
+    if opts["index"] and roots:
+        with _INDEX_LOCK:
+            # Reloaded, so entries another du saved meanwhile for other trees survive
+            index = load_index()
+            _merge_index(index, [root for _, root in roots], scanner.fresh)
+            try:
+                save_index(index)
+            except OSError as e:
+                print(f"du: cannot save the index: {e.strerror or e}")
+    if opts["verbose"]:
+        print(f"du: {scanner.scanned} directories scanned, {scanner.reused} from the index, "
+              f"in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    return status or None
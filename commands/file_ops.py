@@ -1,23 +1,240 @@
+import functools
+import mmap
 import os
-import subprocess
+import shutil
+import stat
 import sys
+import threading
+import time
+
+try:
+    import grp
+    import pwd
+except ImportError:  # Windows has no user/group database modules
+    grp = pwd = None
+
+# Per-directory listing cache used by `ls`: abspath -> ((ino, mtime_ns), names).
+# `names` holds (name, is_dir, is_link) and is reused for as long as the
+# directory is the same one with the same mtime, which saves the readdir and
+# the file type checks. Stat results are deliberately not cached: writing to
+# a file doesn't touch its directory, so `ls -l` would show stale sizes and
+# times. A repeated `ls -l` still costs one lstat per entry.
+_LS_CACHE = {}
+_LS_CACHE_LIMIT = 4096
+_LS_FLAGS = set("laRStrh1")
+
+def _scan_directory(path, need_stat):
+    """
+    Returns the entries of a directory as (name, is_dir, is_link, stat) tuples.
+    Names come from the listing cache when the directory inode and mtime
+    still match, stat results (with `need_stat`) are always fresh.
+    """
+    dir_stat = os.stat(path)
+    key = os.path.abspath(path)
+    version = (dir_stat.st_ino, dir_stat.st_mtime_ns)
+    cached = _LS_CACHE.get(key)
+    if cached is not None and cached[0] == version:
+        if not need_stat:
+            return [(name, is_dir, is_link, None) for name, is_dir, is_link in cached[1]]
+        entries = []
+        for name, is_dir, is_link in cached[1]:
+            try:
+                entries.append((name, is_dir, is_link, os.lstat(os.path.join(path, name))))
+            except OSError:
+                continue
+        return entries
+
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                entry_stat = entry.stat(follow_symlinks=False) if need_stat else None
+            except OSError:
+                # The entry vanished between readdir and stat
+                continue
+            entries.append((entry.name, is_dir, entry.is_symlink(), entry_stat))
+
+    # Don't cache directories modified within the mtime granularity window,
+    # a second change in the same tick would go unnoticed.
+    if time.time() - dir_stat.st_mtime > 1:
+        if key not in _LS_CACHE and len(_LS_CACHE) >= _LS_CACHE_LIMIT:
+            del _LS_CACHE[next(iter(_LS_CACHE))]
+        _LS_CACHE[key] = (version, [entry[:3] for entry in entries])
+    return entries
+
+@functools.lru_cache(maxsize=None)
+def _owner_name(uid):
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except (KeyError, AttributeError):
+        return str(uid)
+
+@functools.lru_cache(maxsize=None)
+def _group_name(gid):
+    try:
+        return grp.getgrgid(gid).gr_name
+    except (KeyError, AttributeError):
+        return str(gid)
+
+def _human_size(size):
+    """Formats a byte count the way `ls -h` does (1K, 2.5M, ...)."""
+    for unit in ("", "K", "M", "G", "T", "P"):
+        if size < 1024 or unit == "P":
+            if unit and size < 10:
+                return f"{size:.1f}{unit}"
+            return f"{size:.0f}{unit}"
+        size /= 1024
+
+def _format_mtime(mtime, now):
+    # Like ls, show the year instead of the time for files older than ~6 months
+    old = now - mtime > 15778476 or mtime > now + 3600
+    return _format_minute(int(mtime) // 60, old)
+
+@functools.lru_cache(maxsize=4096)
+def _format_minute(minute, old):
+    # Trees tend to share timestamps, so formatting is memoized per minute
+    if old:
+        return time.strftime("%b %e  %Y", time.localtime(minute * 60))
+    return time.strftime("%b %e %H:%M", time.localtime(minute * 60))
+
+def _long_lines(path, entries, human):
+    """Builds the `ls -l` lines for a group of entries."""
+    now = time.time()
+    rows = []
+    for name, _, is_link, st in entries:
+        size = _human_size(st.st_size) if human else str(st.st_size)
+        if is_link:
+            try:
+                name = f"{name} -> {os.readlink(os.path.join(path, name))}"
+            except OSError:
+                pass
+        rows.append((stat.filemode(st.st_mode), str(st.st_nlink), _owner_name(st.st_uid),
+                     _group_name(st.st_gid), size, _format_mtime(st.st_mtime, now), name))
+    if not rows:
+        return []
+    widths = [max(len(row[i]) for row in rows) for i in range(1, 5)]
+    return [
+        f"{mode} {nlink:>{widths[0]}} {owner:<{widths[1]}} {group:<{widths[2]}} {size:>{widths[3]}} {mtime} {name}"
+        for mode, nlink, owner, group, size, mtime, name in rows
+    ]
+
+def _column_lines(names):
+    """Lays names out in vertical columns sized to the terminal, like `ls -C`."""
+    if not names:
+        return []
+    width = shutil.get_terminal_size().columns
+    col_width = max(len(name) for name in names) + 2
+    cols = max(1, width // col_width)
+    rows = -(-len(names) // cols)
+    return [
+        "".join(names[i].ljust(col_width) for i in range(row, len(names), rows)).rstrip()
+        for row in range(rows)
+    ]
+
+def _sort_entries(entries, flags):
+    if "S" in flags:
+        entries.sort(key=lambda e: (-e[3].st_size, e[0]))
+    elif "t" in flags:
+        entries.sort(key=lambda e: (-e[3].st_mtime_ns, e[0]))
+    else:
+        entries.sort(key=lambda e: e[0])
+    if "r" in flags:
+        entries.reverse()
+
+def _format_entries(path, entries, flags, out):
+    """Writes one group of entries (a directory's contents or the file operands)."""
+    if "l" in flags:
+        if path is not None:
+            total = sum(getattr(e[3], "st_blocks", 0) for e in entries) // 2
+            out.write(f"total {_human_size(total * 1024) if 'h' in flags else total}\n")
+        lines = _long_lines(path or "", entries, "h" in flags)
+    elif "1" in flags or not out.isatty():
+        lines = [e[0] for e in entries]
+    else:
+        lines = _column_lines([e[0] for e in entries])
+    if lines:
+        out.write("\n".join(lines) + "\n")
+
+def _list_directory(path, flags, out, header):
+    """Lists one directory, then recurses into subdirectories for -R."""
+    need_stat = bool(flags & {"l", "S", "t"})
+    try:
+        entries = _scan_directory(path, need_stat)
+    except OSError as e:
+        print(f"ls: cannot open directory '{path}': {e.strerror}")
+        return 1
+
+    if "a" in flags:
+        entries = list(entries)
+        for special in (".", ".."):
+            entries.append((special, True, False, os.stat(os.path.join(path, special)) if need_stat else None))
+    else:
+        entries = [e for e in entries if not e[0].startswith(".")]
+    _sort_entries(entries, flags)
+
+    if header:
+        out.write(f"{path}:\n")
+    _format_entries(path, entries, flags, out)
+    # Flush per directory so recursive listings stream instead of buffering
+    out.flush()
+
+    status = 0
+    if "R" in flags:
+        for name, is_dir, _, _ in entries:
+            if is_dir and name not in (".", ".."):
+                out.write("\n")
+                status |= _list_directory(os.path.join(path, name), flags, out, True) or 0
+    return status
 
 def handle_ls(args):
     """
     Lists the contents of a directory.
-    Uses 'dir' on Windows and 'ls' on other systems.
+    Listings are produced in-process from os.scandir, no external ls/dir is run.
+    Supports -l, -a, -R, -S, -t, -h, -r and -1.
     """
-    if sys.platform == "win32":
-        command = ["cmd", "/c", "dir"] + args
-    else:  # Linux or macOS
-        command = ["ls"] + args
-        
-    try:
-        subprocess.run(command, check=True)
-    except FileNotFoundError:
-        print(f"Error: Command '{command[0]}' not found on this system.")
-    except subprocess.CalledProcessError as e:
-        print(f"Error: Command failed with exit code {e.returncode}")
+    flags = set()
+    paths = []
+    for arg in args:
+        if arg.startswith("-") and len(arg) > 1:
+            unknown = set(arg[1:]) - _LS_FLAGS
+            if unknown:
+                print(f"ls: invalid option -- '{sorted(unknown)[0]}'")
+                print("Usage: ls [-laRStrh1] [path ...]")
+                return 1
+            flags.update(arg[1:])
+        else:
+            paths.append(arg)
+    if not paths:
+        paths = ["."]
+
+    out = sys.stdout
+    status = 0
+    files = []
+    dirs = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            print(f"ls: cannot access '{path}': {e.strerror}")
+            status = 1
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            dirs.append(path)
+        else:
+            files.append((path, False, os.path.islink(path), os.lstat(path)))
+
+    if files:
+        _sort_entries(files, flags)
+        _format_entries(None, files, flags, out)
+
+    show_headers = len(paths) > 1 or "R" in flags
+    for i, path in enumerate(sorted(dirs)):
+        if files or i:
+            out.write("\n")
+        status |= _list_directory(path, flags, out, show_headers) or 0
+    out.flush()
+    return status or None
 
 def handle_mkdir(args):
     """
@@ -34,39 +251,228 @@ def handle_mkdir(args):
     except Exception as e:
         print(f"mkdir: An error occurred: {e}")
 
-def handle_rm(args):
+# Files unlinked per task, so one huge flat directory is still spread over the pool
+_RM_BATCH = 256
+# Removal is syscall-bound, threads overlap the waits
+_RM_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except PermissionError:
+        if sys.platform != "win32":
+            raise
+        # Windows refuses to delete read-only files
+        os.chmod(path, stat.S_IWRITE)
+        os.unlink(path)
+
+class _TreeRemover:
     """
-    Removes a file or directory.
-    Uses 'del' on Windows for files and 'rm -r' on others for directories.
+    Deletes directory trees on a thread pool. Every directory is scanned by
+    its own task, its files are unlinked in batches on the pool, and a
+    directory is removed as soon as its last file batch and subdirectory
+    are done, so the tree empties bottom-up without a second walk.
     """
-    if not args:
-        print("Usage: rm <file/directory>")
-        return
-        
-    item_to_remove = args[0]
-    
-    if os.path.isfile(item_to_remove):
+
+    def __init__(self, executor, dry_run):
+        self.executor = executor
+        self.dry_run = dry_run
+        self.lock = threading.Lock()
+        # directory -> [unfinished children (subdirectories and file batches), parent]
+        self.pending = {}
+        self.files = self.dirs = self.bytes = 0
+        self.errors = []
+        self.finished = {}
+        # The first exception that isn't a per-path OSError, raised by wait()
+        self.failure = None
+
+    def remove(self, root):
+        """Starts removing `root`, wait() for the result."""
+        self.finished[root] = threading.Event()
+        self._submit(self._scan, root, None)
+
+    def wait(self, root):
+        self.finished[root].wait()
+        if self.failure is not None:
+            raise self.failure
+
+    def _submit(self, task, *args):
+        self.executor.submit(self._run, task, *args)
+
+    def _run(self, task, *args):
         try:
-            os.remove(item_to_remove)
-        except PermissionError:
-            print(f"rm: permission denied: {item_to_remove}")
-        except Exception as e:
-            print(f"rm: An error occurred: {e}")
-    elif os.path.isdir(item_to_remove):
-        if sys.platform == "win32":
-            # Using 'rmdir /s /q' for quiet recursive removal on Windows
-            command = ["rmdir", "/s", "/q", item_to_remove]
+            task(*args)
+        except BaseException as e:
+            # The directory counts can't reach zero any more, so every
+            # waiter is woken up to get the exception instead
+            with self.lock:
+                if self.failure is None:
+                    self.failure = e
+            for event in list(self.finished.values()):
+                event.set()
+
+    def _error(self, path, e):
+        with self.lock:
+            self.errors.append(f"rm: cannot remove '{path}': {e.strerror or e}")
+
+    def _scan(self, path, parent):
+        subdirs, files = [], []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        else:
+                            files.append((entry.path, entry.stat(follow_symlinks=False).st_size))
+                    except OSError:
+                        files.append((entry.path, 0))
+        except OSError as e:
+            self._error(path, e)
+        batches = [files[i:i + _RM_BATCH] for i in range(0, len(files), _RM_BATCH)]
+        if not subdirs and not batches:
+            self._finish(path, parent)
+            return
+        with self.lock:
+            self.pending[path] = [len(subdirs) + len(batches), parent]
+        # The first batch runs here, the rest go to the pool
+        for batch in batches[1:]:
+            self._submit(self._unlink_batch, batch, path)
+        for subdir in subdirs:
+            self._submit(self._scan, subdir, path)
+        if batches:
+            self._unlink_batch(batches[0], path)
+
+    def _unlink_batch(self, batch, directory):
+        removed = size = 0
+        for path, entry_size in batch:
+            try:
+                if not self.dry_run:
+                    _unlink(path)
+                removed += 1
+                size += entry_size
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self._error(path, e)
+        with self.lock:
+            self.files += removed
+            self.bytes += size
+        self._child_done(directory)
+
+    def _child_done(self, directory):
+        with self.lock:
+            entry = self.pending[directory]
+            entry[0] -= 1
+            if entry[0]:
+                return
+            del self.pending[directory]
+        self._finish(directory, entry[1])
+
+    def _finish(self, directory, parent):
+        """Removes an emptied directory and reports it to its parent."""
+        try:
+            if not self.dry_run:
+                os.rmdir(directory)
+            with self.lock:
+                self.dirs += 1
+        except OSError as e:
+            self._error(directory, e)
+        if parent is None:
+            self.finished[directory].set()
+        else:
+            self._child_done(parent)
+
+def handle_rm(args):
+    """
+    Removes files and directories. Directories are deleted recursively in
+    process, on a thread pool (-r/-R are accepted and implied).
+    -f ignores missing operands, --dry-run/-n only counts what would go and
+    -v prints a summary even for plain files.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    force = dry_run = verbose = False
+    targets = []
+    for arg in args:
+        if arg == "--dry-run":
+            dry_run = True
+        elif arg.startswith("-") and len(arg) > 1 and arg != "--" and set(arg[1:]) <= set("rRfnv"):
+            force = force or "f" in arg
+            dry_run = dry_run or "n" in arg
+            verbose = verbose or "v" in arg
         else:
-            # Using 'rm -r' for recursive removal on Linux/macOS
-            command = ["rm", "-r", item_to_remove]
+            targets.append(arg)
+    targets = [t for t in targets if t != "--"]
+    if not targets:
+        if force:
+            return
+        print("Usage: rm [-r] [-f] [-n|--dry-run] [-v] <file/directory> ...")
+        return 1
+
+    started = time.perf_counter()
+    status = 0
+    trees = []
+    single_files = single_bytes = 0
+    with ThreadPoolExecutor(max_workers=_RM_WORKERS) as executor:
+        remover = _TreeRemover(executor, dry_run)
+        for target in targets:
+            try:
+                st = os.lstat(target)
+            except FileNotFoundError:
+                if not force:
+                    print(f"rm: No such file or directory: {target}")
+                    status = 1
+                continue
+            except OSError as e:
+                print(f"rm: cannot remove '{target}': {e.strerror}")
+                status = 1
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                root = os.path.normpath(target)
+                # Checked on the operand as typed, normpath turns "dir/." into "dir"
+                last = os.path.basename(target.rstrip("/" + (os.altsep or "")))
+                real = os.path.realpath(target)
+                if os.path.dirname(real) == real:
+                    print(f"rm: it is dangerous to operate recursively on '{target}'")
+                    status = 1
+                    continue
+                if root in remover.finished or last in (os.curdir, os.pardir):
+                    print(f"rm: refusing to remove '{target}'")
+                    status = 1
+                    continue
+                remover.remove(root)
+                trees.append(root)
+                continue
+            try:
+                if not dry_run:
+                    _unlink(target)
+                single_files += 1
+                single_bytes += st.st_size
+            except OSError as e:
+                print(f"rm: cannot remove '{target}': {e.strerror}")
+                status = 1
         try:
-            subprocess.run(command, check=True)
-        except Exception as e:
-            print(f"rm: An error occurred: {e}")
-    else:
-        print(f"rm: No such file or directory: {item_to_remove}")
+            for root in trees:
+                remover.wait(root)
+        except BaseException:
+            # Stop here (^C or a failed task) instead of letting the queued tasks finish the job
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    for error in remover.errors:
+        print(error)
+    if remover.errors:
+        status = 1
+    if trees or verbose or dry_run:
+        files = remover.files + single_files
+        size = _human_size(remover.bytes + single_bytes)
+        verb = "would remove" if dry_run else "removed"
+        print(f"rm: {verb} {files} files, {remover.dirs} directories ({size}B) "
+              f"in {time.perf_counter() - started:.2f}s")
+    return status or None
 
-def handle_pwd():
+def handle_pwd(args=None):
     """
     Prints the current working directory.
     """
@@ -89,21 +495,210 @@ def handle_cd(args):
     except Exception as e:
         print(f"cd: An error occurred: {e}")
 
+_CAT_CHUNK = 1 << 20
+
+def _parse_range(spec):
+    """
+    Parses a START:END slice for --bytes/--lines. A bare N means the first N,
+    a bare -N the last N, like head and tail.
+    """
+    start, sep, end = spec.partition(":")
+    if not sep:
+        value = int(start)
+        return (value, None) if value < 0 else (0, value)
+    return (int(start) if start else 0, int(end) if end else None)
+
+def _line_offset(mm, size, index):
+    """Returns the byte offset where line `index` starts (negative counts from EOF)."""
+    if index >= 0:
+        pos = 0
+        for _ in range(index):
+            pos = mm.find(b"\n", pos) + 1
+            if pos == 0:
+                return size
+        return pos
+    # A trailing newline terminates the last line rather than starting a new one
+    pos = size - 1 if mm[size - 1] == 0x0A else size
+    for _ in range(-index):
+        pos = mm.rfind(b"\n", 0, pos)
+        if pos < 0:
+            return 0
+    return pos + 1
+
+def _span(data, size, opts):
+    """Resolves the --bytes/--lines options over `data` (bytes or mmap) to a (start, end, first_line) span."""
+    if opts["bytes"] is not None:
+        start, end, _ = slice(*opts["bytes"]).indices(size)
+        return start, max(start, end), None
+    if opts["lines"] is None or size == 0:
+        return 0, size, 1
+    first, last = opts["lines"]
+    start = _line_offset(data, size, first)
+    end = size if last is None else _line_offset(data, size, last)
+    first_line = first + 1 if first >= 0 else None
+    return start, max(start, end), first_line
+
+def _byte_span(f, size, opts):
+    """_span for a regular file, locating line boundaries with mmap find/rfind instead of reading the lines."""
+    if opts["lines"] is None or size == 0:
+        return _span(b"", size, opts)
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _span(mm, size, opts)
+
+def _cat_stream(f, opts, out, number_state):
+    """
+    Copies a stream until EOF: stdin, FIFOs and procfs/sysfs files, whose
+    size says nothing about their contents. A --bytes/--lines slice needs
+    the whole stream in memory.
+    """
+    if opts["bytes"] is None and opts["lines"] is None:
+        chunks = iter(lambda: f.read1(_CAT_CHUNK), b"")
+    else:
+        data = f.read()
+        start, end, first_line = _span(data, len(data), opts)
+        if opts["lines"] is not None:
+            number_state[:] = [first_line or data.count(b"\n", 0, start) + 1, True]
+        chunks = [data[start:end]]
+    if opts["number"]:
+        _write_numbered(chunks, out, number_state)
+    else:
+        for chunk in chunks:
+            out.write(chunk)
+    out.flush()
+
+def _read_chunks(f, start, end):
+    f.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = f.read(min(_CAT_CHUNK, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+def _write_numbered(chunks, out, state):
+    """Writes chunks prefixed with line numbers. `state` is [next_line, at_line_start]."""
+    for chunk in chunks:
+        parts = chunk.split(b"\n")
+        pieces = []
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            if last and not part:
+                break
+            if state[1]:
+                pieces.append(b"%6d\t" % state[0])
+                state[0] += 1
+            pieces.append(part)
+            if not last:
+                pieces.append(b"\n")
+            state[1] = not last
+        out.write(b"".join(pieces))
+
+def _copy_span(f, start, end, out, out_fd):
+    """Copies [start, end) of f to stdout, using sendfile when the kernel allows it."""
+    if out_fd is not None:
+        try:
+            while start < end:
+                sent = os.sendfile(out_fd, f.fileno(), start, end - start)
+                if sent == 0:
+                    break
+                start += sent
+            return
+        except OSError:
+            # e.g. EINVAL for O_APPEND targets, fall back to a buffered copy
+            pass
+    f.seek(start)
+    buf = bytearray(min(_CAT_CHUNK, max(end - start, 1)))
+    view = memoryview(buf)
+    while start < end:
+        n = f.readinto(view[:min(len(buf), end - start)])
+        if not n:
+            break
+        out.write(view[:n])
+        start += n
+    out.flush()
+
+def _sendfile_target(out):
+    """Returns stdout's fd when it is a file, pipe or socket sendfile can write to."""
+    if not hasattr(os, "sendfile") or not sys.platform.startswith("linux"):
+        return None
+    try:
+        fd = out.fileno()
+        mode = os.fstat(fd).st_mode
+    except (AttributeError, OSError, ValueError):
+        return None
+    if stat.S_ISREG(mode) or stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode):
+        return fd
+    return None
+
 def handle_cat(args):
-    """Displays the content of a file."""
-    if not args:
-        print("Usage: cat <file>")
-        return
-        
-    file_path = args[0]
-    
+    """
+    Concatenates files to stdout as raw bytes, so binary data is passed through.
+    Files are streamed in fixed-size chunks (or with sendfile when stdout is a
+    file or pipe), memory use does not depend on file size.
+    Options: -n numbers lines, --bytes=START:END and --lines=START:END select a
+    slice of each file. Negative values count from the end, like Python slices.
+    """
+    opts = {"number": False, "bytes": None, "lines": None}
+    files = []
+    args = list(args)
     try:
-        with open(file_path, 'r') as f:
-            print(f.read())
-    except FileNotFoundError:
-        print(f"cat: No such file or directory: {file_path}")
-    except Exception as e:
-        print(f"cat: An error occurred: {e}")
+        while args:
+            arg = args.pop(0)
+            if arg == "-n":
+                opts["number"] = True
+            elif arg.startswith(("--bytes", "--lines")):
+                name, sep, spec = arg[2:].partition("=")
+                opts[name] = _parse_range(spec if sep else args.pop(0))
+            else:
+                files.append(arg)
+    except (ValueError, IndexError):
+        print("Usage: cat [-n] [--bytes=START:END | --lines=START:END] [file ...]")
+        return 1
+    if not files:
+        files = ["-"]
+
+    out = sys.stdout
+    out.flush()
+    buffer = out.buffer
+    out_fd = None if opts["number"] else _sendfile_target(out)
+    number_state = [1, True]
+    status = 0
+
+    for file_path in files:
+        try:
+            if file_path == "-":
+                _cat_stream(sys.stdin.buffer, opts, buffer, number_state)
+                continue
+
+            with open(file_path, "rb") as f:
+                st = os.fstat(f.fileno())
+                size = st.st_size
+                if not stat.S_ISREG(st.st_mode) or size == 0:
+                    _cat_stream(f, opts, buffer, number_state)
+                    continue
+                start, end, first_line = _byte_span(f, size, opts)
+                if opts["number"]:
+                    if opts["lines"] is not None:
+                        if first_line is None:
+                            first_line = sum(c.count(b"\n") for c in _read_chunks(f, 0, start)) + 1
+                        number_state = [first_line, True]
+                    _write_numbered(_read_chunks(f, start, end), buffer, number_state)
+                    buffer.flush()
+                else:
+                    _copy_span(f, start, end, buffer, out_fd)
+        except FileNotFoundError:
+            print(f"cat: No such file or directory: {file_path}")
+            status = 1
+        except IsADirectoryError:
+            print(f"cat: {file_path}: Is a directory")
+            status = 1
+        except BrokenPipeError:
+            return 1
+        except Exception as e:
+            print(f"cat: An error occurred: {e}")
+            status = 1
+    return status or None
 
 def handle_touch(args):
     if not args:
@@ -0,0 +1,362 @@
+import http.client
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+_CHUNK = 64 * 1024
+# Bodies bound for stdout during parallel fetches are spooled, in memory up to
+# this size and on disk beyond it, then written out in argument order
+_SPOOL_MAX_MEMORY = 1024 * 1024
+_MAX_REDIRECTS = 10
+_USER_AGENT = "nyra-curl/1.0"
+
+class _TimedConnectMixin:
+    """Splits connection setup into DNS, TCP connect and TLS handshake timings."""
+
+    def connect(self):
+        started = time.perf_counter()
+        infos = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        error = None
+        for family, type_, proto, _, address in infos:
+            sock = socket.socket(family, type_, proto)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(address)
+                break
+            except OSError as e:
+                sock.close()
+                error = e
+        else:
+            raise error or OSError(f"could not resolve {self.host}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connected = time.perf_counter()
+        if isinstance(self, http.client.HTTPSConnection):
+            sock = self._context.wrap_socket(sock, server_hostname=self.host)
+        self.sock = sock
+        self.timing = {"dns": resolved - started, "connect": connected - resolved}
+        if isinstance(self, http.client.HTTPSConnection):
+            self.timing["tls"] = time.perf_counter() - connected
+
+class _TimedHTTPConnection(_TimedConnectMixin, http.client.HTTPConnection):
+    pass
+
+class _TimedHTTPSConnection(_TimedConnectMixin, http.client.HTTPSConnection):
+    pass
+
+class ConnectionPool:
+    """
+    Keep-alive connections per (scheme, host, port). Connections are returned
+    after a fully read response and reused by later requests, including later
+    curl commands in the same Nyra session.
+    """
+
+    def __init__(self, max_idle_per_host=32, timeout=30.0):
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self.opened = 0
+
+    def acquire(self, scheme, host, port):
+        """Returns (connection, reused)."""
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+            self.opened += 1
+        if scheme == "https":
+            return _TimedHTTPSConnection(host, port, timeout=self.timeout,
+                                         context=ssl.create_default_context()), False
+        return _TimedHTTPConnection(host, port, timeout=self.timeout), False
+
+    def release(self, scheme, host, port, conn):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host, port), [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+_POOL = ConnectionPool()
+
+class _Request:
+    def __init__(self, url, output):
+        self.url = url
+        self.output = output
+        self.status = None
+        self.bytes = 0
+        self.timing = {}
+        self.reused = False
+        self.error = None
+        self.spool = None
+
+def _send(url, options):
+    """
+    Sends one request, retrying once on a fresh connection when a pooled one
+    turns out to be closed. Returns (conn, response, key, timing, reused).
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme or "http"
+    if scheme not in ("http", "https"):
+        raise ValueError(f"unsupported protocol '{scheme}'")
+    port = parts.port or (443 if scheme == "https" else 80)
+    key = (scheme, parts.hostname, port)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    headers = {"Host": parts.netloc, "User-Agent": _USER_AGENT, "Accept": "*/*"}
+    headers.update(options["headers"])
+
+    for attempt in (0, 1):
+        conn, reused = _POOL.acquire(*key)
+        started = time.perf_counter()
+        try:
+            if conn.sock is None:
+                conn.connect()
+                timing = dict(conn.timing)
+            else:
+                timing = {"dns": 0.0, "connect": 0.0}
+            conn.request(options["method"], path, body=options["data"], headers=headers)
+            response = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if reused and attempt == 0:
+                continue
+            raise
+        except Exception:
+            conn.close()
+            raise
+        timing["ttfb"] = time.perf_counter() - started
+        timing["started"] = started
+        return conn, response, key, timing, reused
+
+def _fetch(request, options):
+    """Runs one request (following redirects with -L) and streams its body."""
+    url = request.url
+    # Set while a response is being read, a connection left mid-body is closed
+    conn = None
+    try:
+        for _ in range(_MAX_REDIRECTS + 1):
+            conn, response, key, timing, reused = _send(url, options)
+            location = response.getheader("Location")
+            if options["follow"] and location and 300 <= response.status < 400:
+                response.read()
+                _release(conn, response, key)
+                conn = None
+                url = urljoin(url, location)
+                continue
+            break
+        request.status = response.status
+        request.reused = reused
+        request.timing = timing
+        if options["fail"] and response.status >= 400:
+            # Like curl -f, error pages are not written anywhere
+            response.read()
+            _release(conn, response, key)
+            conn = None
+            return
+
+        out, close_out = _open_output(request, options)
+        try:
+            if options["include"] or options["method"] == "HEAD":
+                head = [f"HTTP/{response.version / 10:.1f} {response.status} {response.reason}"]
+                head.extend(f"{k}: {v}" for k, v in response.getheaders())
+                out.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+            while True:
+                chunk = response.read1(_CHUNK)
+                if not chunk:
+                    break
+                out.write(chunk)
+                request.bytes += len(chunk)
+        finally:
+            if close_out:
+                out.close()
+            elif out is not request.spool:
+                out.flush()
+        _release(conn, response, key)
+        conn = None
+        timing["total"] = time.perf_counter() - timing["started"]
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        request.error = str(e) or e.__class__.__name__
+    finally:
+        if conn is not None:
+            # Neither back to the pool nor left open with part of a body unread
+            conn.close()
+
+def _release(conn, response, key):
+    # Closing the response only drops its file object, the socket stays open
+    response.close()
+    if response.will_close:
+        conn.close()
+    else:
+        _POOL.release(*key, conn)
+
+def _open_output(request, options):
+    """Returns (stream, should_close) for a request's body."""
+    if request.output is not None:
+        return open(request.output, "wb"), True
+    if options["spool"]:
+        request.spool = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+        return request.spool, False
+    return sys.stdout.buffer, False
+
+def _remote_name(url, output_dir):
+    name = os.path.basename(urlsplit(url).path) or "index.html"
+    return os.path.join(output_dir, name) if output_dir else name
+
+def _format_timing(request):
+    t = request.timing
+    parts = [f"{name} {t[name] * 1000:.1f}ms" for name in ("dns", "connect", "tls", "ttfb", "total") if name in t]
+    reuse = " (reused)" if request.reused else ""
+    return f"  {request.status} {request.url}: {', '.join(parts)}, {request.bytes} bytes{reuse}"
+
+# Options understood natively. Anything else is passed to the system curl.
+_FLAGS = {"-s", "--silent", "-L", "--location", "-I", "--head", "-i", "--include", "-O",
+          "--remote-name", "-f", "--fail", "--timing"}
+_VALUE_OPTIONS = {"-o", "--output", "--output-dir", "-X", "--request", "-H", "--header",
+                  "-d", "--data", "-j", "--jobs", "--url-file", "-m", "--max-time"}
+
+def _read_url_file(path):
+    """One URL per line, blank lines and # comments skipped. '-' reads stdin."""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+def _parse_curl_args(args):
+    options = {"method": None, "headers": {}, "data": None, "follow": False, "include": False,
+               "silent": False, "remote_name": False, "fail": False, "timing": False,
+               "output": None, "output_dir": None, "jobs": 8, "timeout": 30.0, "spool": False}
+    urls = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg in _VALUE_OPTIONS:
+            value = args.pop(0)
+            if arg in ("-o", "--output"):
+                options["output"] = value
+            elif arg == "--output-dir":
+                options["output_dir"] = value
+            elif arg in ("-X", "--request"):
+                options["method"] = value.upper()
+            elif arg in ("-H", "--header"):
+                name, _, header_value = value.partition(":")
+                options["headers"][name.strip()] = header_value.strip()
+            elif arg in ("-d", "--data"):
+                options["data"] = value.encode()
+            elif arg in ("-j", "--jobs"):
+                options["jobs"] = max(1, int(value))
+            elif arg in ("-m", "--max-time"):
+                options["timeout"] = float(value)
+            elif arg == "--url-file":
+                urls.extend(_read_url_file(value))
+        elif arg in _FLAGS:
+            key = {"-s": "silent", "--silent": "silent", "-L": "follow", "--location": "follow",
+                   "-I": "head", "--head": "head", "-i": "include", "--include": "include",
+                   "-O": "remote_name", "--remote-name": "remote_name", "-f": "fail", "--fail": "fail",
+                   "--timing": "timing"}[arg]
+            if key == "head":
+                options["method"] = "HEAD"
+            else:
+                options[key] = True
+        elif arg.startswith("-"):
+            return None, None
+        else:
+            urls.append(arg)
+    urls = [url if "://" in url else "http://" + url for url in urls]
+    if options["method"] is None:
+        options["method"] = "POST" if options["data"] is not None else "GET"
+    if options["data"] is not None:
+        options["headers"].setdefault("Content-Type", "application/x-www-form-urlencoded")
+    return options, urls
+
+def _run_system_curl(args):
+    try:
+        sys.stdout.flush()
+        subprocess.run(["curl"] + args, stdout=sys.stdout, check=True)
+    except FileNotFoundError:
+        print("Error: 'curl' not found. Is it installed on your system?")
+        return 1
+    except subprocess.CalledProcessError as e:
+        print(f"Error: Request failed with exit code {e.returncode}")
+        return e.returncode
+
+def handle_curl(args):
+    """
+    Makes web requests with a built-in HTTP client. Connections are kept alive
+    and pooled per host, several URLs (arguments or --url-file FILE) are
+    fetched in parallel (-j N), and bodies are streamed in fixed-size chunks.
+    --timing reports DNS, connect, TLS, TTFB and total time per request.
+    Other options: -o FILE, -O, --output-dir DIR, -X, -H, -d, -I, -i, -L, -f, -s, -m.
+    Unrecognized options are passed to the system curl.
+    """
+    if not args:
+        print("Usage: curl [options] <URL> [URL ...]")
+        return 1
+    try:
+        options, urls = _parse_curl_args(args)
+    except (ValueError, IndexError, OSError) as e:
+        print(f"curl: {e}" if str(e) else "curl: option needs a value")
+        return 1
+    if options is None:
+        return _run_system_curl(args)
+    if not urls:
+        print("curl: no URL specified")
+        return 1
+
+    _POOL.timeout = options["timeout"]
+    requests = []
+    for i, url in enumerate(urls):
+        if options["output"] and i == 0:
+            output = options["output"]
+        elif options["remote_name"]:
+            output = _remote_name(url, options["output_dir"])
+        else:
+            output = None
+        requests.append(_Request(url, output))
+    to_stdout = [r for r in requests if r.output is None]
+    options["spool"] = len(requests) > 1 and len(to_stdout) > 0
+
+    opened_before = _POOL.opened
+    started = time.perf_counter()
+    sys.stdout.flush()
+    if len(requests) == 1:
+        _fetch(requests[0], options)
+    else:
+        with ThreadPoolExecutor(max_workers=min(options["jobs"], len(requests))) as executor:
+            for _ in executor.map(lambda request: _fetch(request, options), requests):
+                pass
+    elapsed = time.perf_counter() - started
+
+    status = 0
+    for request in requests:
+        if request.spool is not None:
+            request.spool.seek(0)
+            shutil.copyfileobj(request.spool, sys.stdout.buffer, _CHUNK)
+            request.spool.close()
+        if request.error:
+            print(f"curl: ({request.url}) {request.error}", file=sys.stderr)
+            status = 7
+        elif options["fail"] and request.status >= 400:
+            print(f"curl: ({request.url}) The requested URL returned error: {request.status}", file=sys.stderr)
+            status = 22
+        elif options["timing"]:
+            print(_format_timing(request), file=sys.stderr)
+    sys.stdout.buffer.flush()
+
+    if len(requests) > 1 and not options["silent"]:
+        total_bytes = sum(r.bytes for r in requests)
+        print(f"curl: {len(requests)} requests, {total_bytes} bytes in {elapsed:.2f}s "
+              f"({len(requests) / elapsed:.0f} req/s, {_POOL.opened - opened_before} new connections)",
+              file=sys.stderr)
+    return status or None
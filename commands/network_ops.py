@@ -1,40 +1,268 @@
+import asyncio
+import ipaddress
+import math
+import os
+import socket
+import struct
 import subprocess
 import sys
+import time
+
+_PING_USAGE = ("Usage: ping [-c COUNT] [-t TIMEOUT] <host>\n"
+               "       ping [-p PORT | --icmp] [-c COUNT] [-t TIMEOUT] [-j JOBS] [--up] <host|CIDR> ...")
+
+# Options that only make sense for a sweep, they switch a single host to one too
+_SWEEP_FLAGS = frozenset(("-p", "--icmp", "-j", "--up"))
+
+def _parse_sweep_args(args):
+    options = {"port": 80, "icmp": False, "count": 3, "timeout": 1.0, "jobs": 256, "up_only": False}
+    targets = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "-p":
+            options["port"] = int(args.pop(0))
+        elif arg == "--icmp":
+            options["icmp"] = True
+        elif arg == "-c":
+            options["count"] = max(1, int(args.pop(0)))
+        elif arg == "-t":
+            options["timeout"] = float(args.pop(0))
+        elif arg == "-j":
+            options["jobs"] = max(1, int(args.pop(0)))
+        elif arg == "--up":
+            options["up_only"] = True
+        elif arg.startswith("-"):
+            raise ValueError(arg)
+        else:
+            targets.append(arg)
+    if not targets:
+        raise ValueError("no hosts")
+    return options, targets
+
+def _expand_targets(targets):
+    """
+    Expands CIDR ranges (10.0.0.0/24) into host addresses, keeping names
+    as-is. Returns (number of hosts, iterator over them): the addresses are
+    generated as the sweep consumes them, a /8 is never held in memory.
+    Raises ValueError for a malformed range.
+    """
+    total = 0
+    parts = []
+    for target in targets:
+        if "/" in target:
+            network = ipaddress.ip_network(target, strict=False)
+            # /32 and /31 networks have no separate network/broadcast addresses
+            if network.num_addresses > 2:
+                parts.append(network.hosts())
+                total += network.num_addresses - 2
+            else:
+                parts.append(iter(network))
+                total += network.num_addresses
+        else:
+            parts.append([target])
+            total += 1
+    return total, (str(host) for part in parts for host in part)
+
+def _icmp_checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+def _icmp_echo(seq):
+    payload = b"nyra-ping" * 4
+    header = struct.pack("!BBHHH", 8, 0, 0, 0, seq)
+    return struct.pack("!BBHHH", 8, 0, _icmp_checksum(header + payload), 0, seq) + payload
+
+async def _probe_tcp(address, port, timeout):
+    """One TCP connect. A refused connection still proves the host is up."""
+    started = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+    except ConnectionRefusedError:
+        return time.perf_counter() - started
+    except (asyncio.TimeoutError, OSError):
+        return None
+    rtt = time.perf_counter() - started
+    writer.close()
+    return rtt
+
+async def _probe_icmp(address, seq, timeout):
+    """One echo request over an unprivileged (SOCK_DGRAM) ICMP socket."""
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+    sock.setblocking(False)
+    try:
+        started = time.perf_counter()
+        await loop.sock_sendto(sock, _icmp_echo(seq), (address, 0))
+        deadline = started + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            reply = await asyncio.wait_for(loop.sock_recv(sock, 1024), remaining)
+            # Echo reply (type 0) for our sequence number
+            if len(reply) >= 8 and reply[0] == 0 and struct.unpack("!H", reply[6:8])[0] == seq:
+                return time.perf_counter() - started
+    except (asyncio.TimeoutError, OSError):
+        return None
+    finally:
+        sock.close()
+
+async def _probe_host(host, options):
+    """Resolves and probes one host `count` times. Returns (host, address, rtts)."""
+    loop = asyncio.get_running_loop()
+    family = socket.AF_INET if options["icmp"] else socket.AF_UNSPEC
+    try:
+        infos = await asyncio.wait_for(
+            loop.getaddrinfo(host, None, family=family, type=socket.SOCK_STREAM), options["timeout"])
+        address = infos[0][4][0]
+    except (asyncio.TimeoutError, OSError):
+        return host, None, []
+    rtts = []
+    for seq in range(options["count"]):
+        if options["icmp"]:
+            rtt = await _probe_icmp(address, (os.getpid() + seq) & 0xFFFF, options["timeout"])
+        else:
+            rtt = await _probe_tcp(address, options["port"], options["timeout"])
+        rtts.append(rtt)
+    return host, address, rtts
+
+async def _sweep(total, hosts, options):
+    """
+    Probes `hosts` on a fixed set of `jobs` worker coroutines, which bounds
+    how many sockets are open at once. Hosts are fed to them through a
+    bounded queue, so memory doesn't grow with the size of the range. With
+    --up only the hosts that answered are kept.
+    """
+    queue = asyncio.Queue(maxsize=options["jobs"] * 2)
+    results = []
+    done = 0
+    show_progress = sys.stderr.isatty() and total > 1
+
+    async def worker():
+        nonlocal done
+        while True:
+            host = await queue.get()
+            if host is None:
+                return
+            result = await _probe_host(host, options)
+            if not options["up_only"] or any(rtt is not None for rtt in result[2]):
+                results.append(result)
+            done += 1
+            if show_progress:
+                sys.stderr.write(f"\r  probed {done}/{total} hosts")
+                sys.stderr.flush()
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(options["jobs"], total))]
+    try:
+        for host in hosts:
+            await queue.put(host)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+    if show_progress:
+        sys.stderr.write("\r\033[K")
+    return done, results
+
+def _sort_key(result):
+    try:
+        return (0, ipaddress.ip_address(result[1] or result[0]))
+    except ValueError:
+        return (1, result[0])
+
+def _ping_sweep(args):
+    """
+    Probes many hosts concurrently with asyncio and prints a summary table.
+    TCP connect probes (-p PORT, default 80) need no privileges; --icmp sends
+    echo requests on an unprivileged ICMP socket where the host allows it.
+    """
+    try:
+        options, targets = _parse_sweep_args(args)
+        total, hosts = _expand_targets(targets)
+    except (ValueError, IndexError):
+        print(_PING_USAGE)
+        return 1
+
+    if options["icmp"]:
+        try:
+            socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP).close()
+        except OSError:
+            print("ping: unprivileged ICMP is not allowed on this host "
+                  "(see net.ipv4.ping_group_range), use -p PORT for TCP probes")
+            return 1
+
+    started = time.perf_counter()
+    probed, results = asyncio.run(_sweep(total, hosts, options))
+    results.sort(key=_sort_key)
+    elapsed = time.perf_counter() - started
+
+    probe = "icmp" if options["icmp"] else f"tcp/{options['port']}"
+    print(f"{'HOST':<30} {'STATE':<6} {'RECV':>6} {'MIN ms':>8} {'AVG ms':>8} {'MAX ms':>8}")
+    up = 0
+    for host, address, rtts in results:
+        times = [rtt * 1000 for rtt in rtts if rtt is not None]
+        if times:
+            up += 1
+        elif options["up_only"]:
+            continue
+        label = host if address in (None, host) else f"{host} ({address})"
+        if times:
+            print(f"{label:<30} {'up':<6} {len(times):>3}/{len(rtts):<2} "
+                  f"{min(times):>8.2f} {sum(times) / len(times):>8.2f} {max(times):>8.2f}")
+        else:
+            state = "down" if address else "noaddr"
+            print(f"{label:<30} {state:<6} {0:>3}/{len(rtts) or options['count']:<2} {'-':>8} {'-':>8} {'-':>8}")
+    print(f"\n{probed} hosts probed ({probe}), {up} up, {probed - up} down in {elapsed:.2f}s")
+    return None if up else 1
 
 def handle_ping(args):
-    """Pings a host to check network connectivity."""
+    """
+    Pings a host with the system ping (-c COUNT, -t TIMEOUT per reply).
+    Several hosts, a CIDR range or a sweep option (-p, --icmp, -j, --up)
+    probe the hosts concurrently instead (see _ping_sweep).
+    """
     if not args:
-        print("Usage: ping <host>")
+        print(_PING_USAGE)
         return
-        
-    host = args[0]
+
+    try:
+        options, targets = _parse_sweep_args(args)
+    except (ValueError, IndexError):
+        print(_PING_USAGE)
+        return 1
+    if len(targets) > 1 or "/" in targets[0] or _SWEEP_FLAGS.intersection(args):
+        return _ping_sweep(args)
+
+    host = targets[0]
+    count = str(options["count"] if "-c" in args else 4)
     
     # Use platform-specific options for a more reliable ping
     if sys.platform == "win32":
-        command = ["ping", "-n", "4", host] # -n for Windows
+        command = ["ping", "-n", count, host] # -n for Windows
+        if "-t" in args:
+            command[1:1] = ["-w", str(int(options["timeout"] * 1000))]
     else:
-        command = ["ping", "-c", "4", host] # -c for Linux/macOS
+        command = ["ping", "-c", count, host] # -c for Linux/macOS
+        if "-t" in args:
+            # Milliseconds on macOS, whole seconds with Linux iputils
+            wait = options["timeout"] * 1000 if sys.platform == "darwin" else math.ceil(options["timeout"])
+            command[1:1] = ["-W", str(max(1, int(wait)))]
         
     try:
-        subprocess.run(command, check=True)
+        sys.stdout.flush()
+        subprocess.run(command, stdout=sys.stdout, check=True)
     except subprocess.CalledProcessError:
         print(f"Error: Could not reach host {host}.")
     except Exception as e:
         print(f"An error occurred: {e}")
 
-def handle_curl(args):
-    """Makes a web request using curl."""
-    if not args:
-        print("Usage: curl <URL>")
-        return
-        
-    try:
-        subprocess.run(["curl"] + args, check=True)
-    except FileNotFoundError:
-        print("Error: 'curl' not found. Is it installed on your system?")
-    except subprocess.CalledProcessError as e:
-        print(f"Error: Request failed with exit code {e.returncode}")
-
 def handle_ip_address(args):
     """
     Handles both ifconfig and ipconfig based on the OS.
@@ -48,7 +276,8 @@ def handle_ip_address(args):
         command = ["ifconfig"] + args
     
     try:
-        subprocess.run(command, check=True)
+        sys.stdout.flush()
+        subprocess.run(command, stdout=sys.stdout, check=True)
     except FileNotFoundError:
         print("Network command not found on this system.")
     except subprocess.CalledProcessError as e:
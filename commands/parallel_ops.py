@@ -0,0 +1,414 @@
+import itertools
+import os
+import re
+import shlex
+import signal
+import sys
+import threading
+import time
+
+from utils.jobs import current_environ, interrupt_thread, job_context
+from utils.pipeline import install_stream_proxies
+
+_USAGE = ("Usage: parallel [-j N] [-k | -u] [--tag] [--timeout SECONDS] [--retries N] [--halt] [-q] "
+          "[--dry-run] <command template> [::: inputs ... | :::: file ... | -a file]")
+
+# {} {.} {/} {//} {/.} for the whole input, {1} {2.} ... for one source, {#} for the task number
+_PLACEHOLDER = re.compile(r"\{(\d*)(\.|/\.|//|/)?\}|\{#\}")
+# A task still running this long after SIGTERM from --timeout gets SIGKILL
+_KILL_GRACE = 2.0
+# How often the scheduler looks at deadlines and for Ctrl+C in a job or server thread
+_POLL = 0.1
+# Failed tasks listed in the summary, the rest are counted
+_SUMMARY_FAILURES = 20
+
+def _transform(value, kind):
+    if kind == ".":
+        return os.path.splitext(value)[0]
+    if kind == "/":
+        return os.path.basename(value)
+    if kind == "//":
+        return os.path.dirname(value)
+    if kind == "/.":
+        return os.path.splitext(os.path.basename(value))[0]
+    return value
+
+def _expand(template, values, number):
+    """
+    The command line for one task. Inputs are shell-quoted as they are
+    substituted, so names with spaces or quotes stay one argument. A
+    template without placeholders gets the inputs appended.
+    """
+    def replace(match):
+        if match.group(0) == "{#}":
+            return str(number)
+        index, kind = match.group(1), match.group(2)
+        if index:
+            position = int(index) - 1
+            chosen = values[position:position + 1]
+        else:
+            chosen = values
+        return " ".join(shlex.quote(_transform(value, kind)) for value in chosen)
+
+    command, substitutions = _PLACEHOLDER.subn(replace, template)
+    if not substitutions:
+        command = " ".join([command] + [shlex.quote(value) for value in values])
+    return command
+
+def _read_lines(path):
+    """Non-empty lines of a file, or of stdin for "-"."""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    return [line for line in lines if line.strip()]
+
+def _parse_parallel_args(args):
+    opts = {"jobs": os.cpu_count() or 1, "order": "group", "tag": False, "timeout": None, "retries": 0,
+            "halt": False, "quiet": False, "dry_run": False}
+    template = []
+    sources = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg in (":::", "::::"):
+            values = []
+            while args and args[0] not in (":::", "::::"):
+                values.append(args.pop(0))
+            if arg == "::::":
+                values = [line for path in values for line in _read_lines(path)]
+            sources.append(values)
+        elif template:
+            # Everything after the command's first word belongs to the command
+            template.append(arg)
+        elif arg in ("-j", "--jobs"):
+            opts["jobs"] = int(args.pop(0))
+        elif arg.startswith("-j") and arg[2:].isdigit():
+            opts["jobs"] = int(arg[2:])
+        elif arg in ("-a", "--arg-file"):
+            sources.append(_read_lines(args.pop(0)))
+        elif arg in ("-k", "--keep-order"):
+            opts["order"] = "keep"
+        elif arg in ("-u", "--ungroup"):
+            opts["order"] = "ungroup"
+        elif arg == "--group":
+            opts["order"] = "group"
+        elif arg == "--tag":
+            opts["tag"] = True
+        elif arg == "--timeout":
+            opts["timeout"] = float(args.pop(0))
+        elif arg == "--retries":
+            opts["retries"] = int(args.pop(0))
+        elif arg == "--halt":
+            opts["halt"] = True
+        elif arg == "-q":
+            opts["quiet"] = True
+        elif arg == "--dry-run":
+            opts["dry_run"] = True
+        elif arg.startswith("-"):
+            raise ValueError(arg)
+        else:
+            template.append(arg)
+    if not template or opts["jobs"] < 0 or opts["retries"] < 0:
+        raise ValueError("no command")
+    return opts, " ".join(template), sources
+
+class _Task:
+    """
+    One substituted command line. While it runs it is the job of its worker
+    thread, so the processes it starts get a session of their own and can
+    be signalled as a group on a timeout or Ctrl+C.
+    """
+
+    def __init__(self, number, values, command):
+        self.number = number
+        self.values = values
+        self.command = command
+        self.status = None
+        self.attempts = 0
+        self.duration = 0.0
+        self.timed_out = False
+        self.deadline = None
+        self.kill_at = None
+        self.stdout = self.stderr = None
+        self.pids = []
+        self.thread = None
+        self.running = False
+        self.lock = threading.Lock()
+
+    def add_process(self, pid):
+        self.pids.append(pid)
+
+    def start(self, timeout):
+        with self.lock:
+            self.thread = threading.current_thread()
+            self.pids = []
+            self.timed_out = False
+            self.kill_at = None
+            self.deadline = time.monotonic() + timeout if timeout is not None else None
+            self.running = True
+
+    def interrupt(self, sig=signal.SIGINT):
+        """Signals the task's processes and raises KeyboardInterrupt in its thread."""
+        with self.lock:
+            if not self.running:
+                return
+            for pid in self.pids:
+                try:
+                    os.killpg(pid, sig)
+                except (ProcessLookupError, PermissionError):
+                    continue
+            if sig != getattr(signal, "SIGKILL", None):
+                interrupt_thread(self.thread)
+
+    def finish(self):
+        """Marks the attempt done and drops an interrupt that arrived too late to matter."""
+        with self.lock:
+            self.running = False
+            interrupt_thread(self.thread, None)
+
+class _Scheduler:
+    """
+    Runs tasks on a pool of -j threads through the normal dispatcher, so
+    builtins run in the pool and external commands as concurrent processes.
+    Each task's stdout and stderr go to temporary files, copied out whole
+    when it finishes (in completion order, or input order with -k), unless
+    -u lets them write straight through.
+    """
+
+    def __init__(self, opts, out, err, environ):
+        from utils.dispatcher import run_command_line
+
+        self.run_command_line = run_command_line
+        self.opts = opts
+        self.out = out
+        self.err = err
+        self.environ = environ
+        self.stopping = False
+        self.running = []
+        self.running_lock = threading.Lock()
+        self.devnull = open(os.devnull)
+
+    def _temporary(self):
+        import tempfile
+
+        return tempfile.TemporaryFile("w+", encoding="utf-8", errors="replace")
+
+    def run_task(self, task):
+        """Pool worker: runs the task, retrying failures, with its own streams."""
+        if self.stopping:
+            return task
+        stdout_proxy, stdin_proxy, stderr_proxy = install_stream_proxies()
+        if self.opts["order"] == "ungroup":
+            stdout, stderr = self.out, self.err
+        else:
+            task.stdout, task.stderr = stdout, stderr = self._temporary(), self._temporary()
+        stdout_proxy.set(stdout)
+        stderr_proxy.set(stderr)
+        stdin_proxy.set(self.devnull)
+        with self.running_lock:
+            self.running.append(task)
+        started = time.perf_counter()
+        try:
+            for _ in range(self.opts["retries"] + 1):
+                if self.stopping:
+                    break
+                if task.stdout is not None:
+                    # Only the last attempt's output is shown
+                    for stream in (task.stdout, task.stderr):
+                        stream.seek(0)
+                        stream.truncate()
+                task.attempts += 1
+                task.status = self._attempt(task)
+                if task.status == 0:
+                    break
+            if self.opts["halt"] and task.status not in (0, None):
+                # --halt: tasks that haven't started yet are skipped
+                self.stopping = True
+        finally:
+            task.duration = time.perf_counter() - started
+            with self.running_lock:
+                self.running.remove(task)
+            stdout_proxy.set(None)
+            stderr_proxy.set(None)
+            stdin_proxy.set(None)
+            for stream in (task.stdout, task.stderr):
+                if stream is not None:
+                    stream.flush()
+        return task
+
+    def _attempt(self, task):
+        task.start(self.opts["timeout"])
+        try:
+            try:
+                with job_context(task, self.environ):
+                    status = self.run_command_line(task.command)
+            except KeyboardInterrupt:
+                status = 124 if task.timed_out else 130
+            except ValueError as e:
+                print(f"parallel: {e}", file=sys.stderr)
+                status = 2
+            except SystemExit as e:
+                status = e.code if isinstance(e.code, int) else 0
+            except BrokenPipeError:
+                status = 141
+            finally:
+                task.finish()
+        except KeyboardInterrupt:
+            # Arrived between the command and finish()
+            status = 124 if task.timed_out else 130
+        if task.timed_out:
+            status = 124
+        return 0 if status is None else status
+
+    def check_deadlines(self):
+        """--timeout: SIGTERM to tasks past their deadline, SIGKILL if they outlive the grace period."""
+        now = time.monotonic()
+        with self.running_lock:
+            running = list(self.running)
+        for task in running:
+            if task.deadline is None or now < task.deadline:
+                continue
+            if not task.timed_out:
+                task.timed_out = True
+                task.kill_at = now + _KILL_GRACE
+                task.interrupt(signal.SIGTERM)
+            elif task.kill_at is not None and now >= task.kill_at and hasattr(signal, "SIGKILL"):
+                task.kill_at = None
+                task.interrupt(signal.SIGKILL)
+
+    def interrupt_all(self):
+        self.stopping = True
+        with self.running_lock:
+            running = list(self.running)
+        for task in running:
+            task.interrupt()
+
+    def emit(self, task):
+        """Copies a grouped task's output to Nyra's stdout and stderr."""
+        if task.stdout is None:
+            return
+        prefix = "\t".join(task.values) + "\t" if self.opts["tag"] else ""
+        for stream, target in ((task.stdout, self.out), (task.stderr, self.err)):
+            stream.seek(0)
+            buffer = getattr(target, "buffer", None)
+            if prefix or buffer is None:
+                for line in stream:
+                    target.write(prefix + line)
+            else:
+                # As bytes, so binary output from external commands survives
+                target.flush()
+                while True:
+                    chunk = stream.buffer.read(64 * 1024)
+                    if not chunk:
+                        break
+                    buffer.write(chunk)
+            target.flush()
+            stream.close()
+        task.stdout = task.stderr = None
+
+    def close(self):
+        self.devnull.close()
+
+def _summary(tasks, elapsed, err):
+    finished = [task for task in tasks if task.status is not None]
+    failed = [task for task in finished if task.status != 0]
+    busy = sum(task.duration for task in finished)
+    line = f"parallel: {len(finished)} tasks, {len(finished) - len(failed)} ok, {len(failed)} failed in {elapsed:.2f}s"
+    if finished:
+        line += (f" (task time {busy:.2f}s, {busy / max(elapsed, 1e-9):.1f}x; "
+                 f"mean {busy / len(finished):.2f}s, max {max(task.duration for task in finished):.2f}s)")
+    skipped = len(tasks) - len(finished)
+    if skipped:
+        line += f", {skipped} not run"
+    print(line, file=err)
+    for task in failed[:_SUMMARY_FAILURES]:
+        reason = "timed out" if task.status == 124 and task.timed_out else f"exit {task.status}"
+        attempts = f", {task.attempts} attempts" if task.attempts > 1 else ""
+        print(f"parallel: {reason} ({task.duration:.2f}s{attempts}): {task.command}", file=err)
+    if len(failed) > _SUMMARY_FAILURES:
+        print(f"parallel: ... and {len(failed) - _SUMMARY_FAILURES} more failures", file=err)
+
+def handle_parallel(args):
+    """
+    Runs a command template once per input on a pool of -j workers (default:
+    one per CPU, 0 = one per input). Inputs come after `:::` (several
+    `:::` groups are combined every way), from files after `::::` or -a,
+    or from stdin. {} is the input, {.} without extension, {/} its
+    basename, {//} its directory, {/.} both, {N} the Nth group's value and
+    {#} the task number. Output is grouped per task as tasks finish, -k
+    keeps input order, -u writes straight through and --tag prefixes lines
+    with the input. --timeout stops a task after SECONDS, --retries reruns
+    failures, --halt stops starting tasks after the first failure. A summary
+    of failures and durations goes to stderr (-q leaves it out). Returns
+    the number of failed tasks, at most 101.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    try:
+        opts, template, sources = _parse_parallel_args(args)
+        if not sources:
+            sources = [_read_lines("-")]
+    except (ValueError, IndexError):
+        print(_USAGE)
+        return 1
+    except OSError as e:
+        print(f"parallel: {e.filename}: {e.strerror}")
+        return 1
+
+    combinations = itertools.product(*sources)
+    tasks = [_Task(number, list(values), _expand(template, list(values), number))
+             for number, values in enumerate(combinations, 1)]
+    if not tasks:
+        return None
+    if opts["dry_run"]:
+        for task in tasks:
+            print(task.command)
+        return None
+
+    out_proxy, _, err_proxy = install_stream_proxies()
+    out, err = out_proxy.target(), err_proxy.target()
+    out.flush()
+    workers = opts["jobs"] or len(tasks)
+    scheduler = _Scheduler(opts, out, err, current_environ())
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=min(workers, len(tasks), 256), thread_name_prefix="parallel")
+    futures = {executor.submit(scheduler.run_task, task): task for task in tasks}
+    pending = set(futures)
+    next_in_order = 0
+    finished = set()
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=_POLL, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = futures[future]
+                finished.add(task.number)
+                if opts["order"] == "group":
+                    scheduler.emit(task)
+                if opts["halt"] and task.status not in (0, None) and not scheduler.stopping:
+                    scheduler.stopping = True
+                    for other in pending:
+                        if other.cancel():
+                            # Never runs, and has no output to wait for
+                            finished.add(futures[other].number)
+            if opts["order"] == "keep":
+                while next_in_order < len(tasks) and tasks[next_in_order].number in finished:
+                    scheduler.emit(tasks[next_in_order])
+                    next_in_order += 1
+            if opts["timeout"] is not None:
+                scheduler.check_deadlines()
+            pending = {future for future in pending if not future.cancelled()}
+    except KeyboardInterrupt:
+        # Stop here: queued tasks are dropped, running ones get Ctrl+C too
+        executor.shutdown(wait=False, cancel_futures=True)
+        scheduler.interrupt_all()
+        raise
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        scheduler.close()
+
+    if not opts["quiet"]:
+        _summary(tasks, time.perf_counter() - started, err)
+    failed = sum(1 for task in tasks if task.status not in (0, None))
+    return min(failed, 101) or None
@@ -1,27 +1,357 @@
+import heapq
+import os
+import re
+import signal
+import threading
+import time
+
 import psutil
 
-def handle_ps():
-    """Lists running processes."""
-    print(f"{'PID':<8} {'Name':<20} {'Status':<10} {'CPU %':<8}")
-    for proc in psutil.process_iter(['pid', 'name', 'status', 'cpu_percent']):
-        try:
-            pinfo = proc.info
-            print(f"{pinfo['pid']:<8} {pinfo['name']:<20} {pinfo['status']:<10} {pinfo['cpu_percent']:<8.2f}")
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
+# Optional per-process fields and how each one is read inside oneshot().
+# pid, name, cpu, rss and mem are always collected, they come from the same
+# /proc reads psutil does for cpu_times() and memory_info().
+_FIELD_READERS = {
+    "ppid": lambda p: p.ppid(),
+    "user": lambda p: p.username(),
+    "status": lambda p: p.status(),
+    "threads": lambda p: p.num_threads(),
+    "cmd": lambda p: " ".join(p.cmdline()),
+}
+
+# Without a previous sample newer than this, CPU% needs a fresh baseline
+_CPU_BASELINE_MAX_AGE = 10.0
+_CPU_BASELINE_WAIT = 0.2
+
+class ProcessTracker:
+    """
+    Keeps psutil.Process objects alive between samples, so per-process CPU
+    usage comes from real deltas between two samples. (A fresh Process always
+    reports 0% on its first cpu_percent() call.) Names are read on every
+    sample, and when the name changes or the CPU counter goes backwards the
+    creation time tells an exec() apart from a reused pid, which starts over.
+    Samples are serialized by a lock, server workers share one tracker.
+    """
+
+    def __init__(self):
+        # pid -> [Process, name, create time, cpu seconds at last sample, time of last sample]
+        self._procs = {}
+        self._mem_total = psutil.virtual_memory().total
+        self.rows = []
+        self.fields = frozenset()
+        self.sampled_at = None
+        self._lock = threading.Lock()
+
+    def process(self, pid):
+        """Returns the tracked Process for pid, or a new one if it is unknown or the pid was reused."""
+        with self._lock:
+            entry = self._procs.get(pid)
+        if entry is not None and entry[0].is_running():
+            return entry[0]
+        return psutil.Process(pid)
+
+    def sample(self, fields=()):
+        """
+        Walks the process list once and returns one dict per live process with
+        pid, name, cpu, rss, mem and any extra `fields`. Each process is read
+        inside oneshot(), and the pids that vanished since the last sample are
+        dropped.
+        """
+        with self._lock:
+            return self._sample(fields)
+
+    def _sample(self, fields):
+        readers = [(field, _FIELD_READERS[field]) for field in fields]
+        now = time.monotonic()
+        previous = self._procs
+        current = {}
+        rows = []
+        for pid in psutil.pids():
+            entry = previous.get(pid)
+            try:
+                if entry is None:
+                    proc = psutil.Process(pid)
+                    entry = [proc, None, proc.create_time(), None, now]
+                proc = entry[0]
+                with proc.oneshot():
+                    name = proc.name()
+                    times = proc.cpu_times()
+                    rss = proc.memory_info().rss
+                    row = {"pid": pid, "name": name, "rss": rss}
+                    for field, reader in readers:
+                        try:
+                            row[field] = reader(proc)
+                        except psutil.AccessDenied:
+                            row[field] = "?"
+                cpu_seconds = times.user + times.system
+                if entry[1] is not None and (name != entry[1] or cpu_seconds < entry[3]):
+                    # exec() keeps the creation time, a reused pid doesn't
+                    fresh = psutil.Process(pid)
+                    if fresh.create_time() != entry[2]:
+                        entry = [fresh, None, fresh.create_time(), None, now]
+                entry[1] = name
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            if entry[3] is None or now <= entry[4]:
+                cpu = 0.0
+            else:
+                cpu = max(0.0, (cpu_seconds - entry[3]) / (now - entry[4]) * 100)
+            entry[3] = cpu_seconds
+            entry[4] = now
+            row["cpu"] = cpu
+            row["mem"] = rss / self._mem_total * 100
+            current[pid] = entry
+            rows.append(row)
+        self._procs = current
+        self.rows = rows
+        self.fields = frozenset(fields)
+        self.sampled_at = now
+        return rows
+
+    def snapshot(self, fields=(), need_cpu=False):
+        """
+        Returns a fresh sample. When CPU% matters and there is no recent
+        baseline, a short priming sample is taken first, like `top` does.
+        """
+        if need_cpu and (self.sampled_at is None or time.monotonic() - self.sampled_at > _CPU_BASELINE_MAX_AGE):
+            self.sample()
+            time.sleep(_CPU_BASELINE_WAIT)
+        return self.sample(fields)
+
+# The index shared by ps, kill and pkill. It keeps Process objects and CPU
+# baselines between commands instead of walking process_iter from scratch.
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+def get_process_index():
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = ProcessTracker()
+        return _INDEX
+
+def _format_rss(rss):
+    for unit in ("K", "M", "G", "T"):
+        rss /= 1024
+        if rss < 1024 or unit == "T":
+            return f"{rss:.0f}{unit}" if rss >= 10 else f"{rss:.1f}{unit}"
+
+# Column name -> (header, alignment, formatter)
+_COLUMNS = {
+    "pid": ("PID", ">", str),
+    "ppid": ("PPID", ">", str),
+    "user": ("USER", "<", str),
+    "status": ("STATUS", "<", str),
+    "cpu": ("CPU%", ">", lambda v: f"{v:.1f}"),
+    "mem": ("MEM%", ">", lambda v: f"{v:.1f}"),
+    "rss": ("RSS", ">", _format_rss),
+    "threads": ("THR", ">", str),
+    "name": ("NAME", "<", str),
+    "cmd": ("COMMAND", "<", str),
+}
+_DEFAULT_COLUMNS = ["pid", "status", "cpu", "mem", "name"]
+# Numeric keys sort largest first, text keys alphabetically
+_DESCENDING_KEYS = {"cpu", "mem", "rss", "threads"}
+
+_PS_USAGE = ("Usage: ps [--name REGEX] [--user USER] [--state STATE] [--min-cpu PCT] [--min-mem PCT]\n"
+             "          [--sort KEY] [-r] [--top N] [-o COLUMN,...]")
+
+def _parse_ps_args(args):
+    options = {"name": None, "user": None, "state": None, "min_cpu": None, "min_mem": None,
+               "sort": None, "reverse": False, "top": None, "columns": _DEFAULT_COLUMNS}
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "--name":
+            options["name"] = re.compile(args.pop(0))
+        elif arg == "--user":
+            options["user"] = args.pop(0)
+        elif arg == "--state":
+            options["state"] = args.pop(0).lower()
+        elif arg == "--min-cpu":
+            options["min_cpu"] = float(args.pop(0))
+        elif arg == "--min-mem":
+            options["min_mem"] = float(args.pop(0))
+        elif arg == "--sort":
+            options["sort"] = args.pop(0)
+        elif arg == "-r":
+            options["reverse"] = True
+        elif arg in ("--top", "-n"):
+            options["top"] = int(args.pop(0))
+        elif arg == "-o":
+            options["columns"] = args.pop(0).split(",")
+        else:
+            raise ValueError(f"unknown option '{arg}'")
+    unknown = [c for c in options["columns"] + [options["sort"] or "pid"] if c not in _COLUMNS]
+    if unknown:
+        raise ValueError(f"unknown column '{unknown[0]}' (choose from {', '.join(_COLUMNS)})")
+    return options
+
+def _select_rows(rows, options):
+    """Applies the ps filters, then sorting and top-N (as a heap when N is given)."""
+    name, user, state = options["name"], options["user"], options["state"]
+    min_cpu, min_mem = options["min_cpu"], options["min_mem"]
+    if name or user or state or min_cpu is not None or min_mem is not None:
+        rows = [
+            r for r in rows
+            if (name is None or name.search(r["name"]))
+            and (user is None or r["user"] == user)
+            and (state is None or r["status"] == state)
+            and (min_cpu is None or r["cpu"] >= min_cpu)
+            and (min_mem is None or r["mem"] >= min_mem)
+        ]
+
+    key = options["sort"] or ("cpu" if options["top"] else "pid")
+    descending = (key in _DESCENDING_KEYS) != options["reverse"]
+    # Fields that couldn't be read are "?" and go last in either direction
+    if descending:
+        sort_key = lambda r: (r[key] != "?", r[key] if r[key] != "?" else 0)
+    else:
+        sort_key = lambda r: (r[key] == "?", r[key] if r[key] != "?" else 0)
+    if options["top"] is not None:
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        return pick(options["top"], rows, key=sort_key)
+    return sorted(rows, key=sort_key, reverse=descending)
+
+def handle_ps(args=None):
+    """
+    Lists running processes from a single pass over the process table.
+    Supports filters (--name, --user, --state, --min-cpu, --min-mem), --sort,
+    -r, --top N and a column list with -o (pid,ppid,user,status,cpu,mem,rss,threads,name,cmd).
+    """
+    try:
+        options = _parse_ps_args(args or [])
+    except (ValueError, IndexError, re.error) as e:
+        print(f"ps: {e}" if str(e) else "ps: missing value")
+        print(_PS_USAGE)
+        return 1
+
+    columns = options["columns"]
+    # Only read what the columns and filters actually need
+    wanted = set(columns)
+    if options["user"]:
+        wanted.add("user")
+    if options["state"]:
+        wanted.add("status")
+    if options["sort"]:
+        wanted.add(options["sort"])
+    fields = [f for f in _FIELD_READERS if f in wanted]
+    need_cpu = bool({"cpu"} & wanted) or options["min_cpu"] is not None or bool(options["top"])
+
+    rows = _select_rows(get_process_index().snapshot(fields, need_cpu), options)
+
+    specs = [_COLUMNS[c] for c in columns]
+    table = [[fmt(row[c]) for c, (_, _, fmt) in zip(columns, specs)] for row in rows]
+    widths = [max([len(header)] + [len(line[i]) for line in table]) for i, (header, _, _) in enumerate(specs)]
+    # The last column is left unpadded so long names/commands don't add trailing space
+    widths[-1] = 0
+    lines = [" ".join(f"{header:{align}{width}}" for (header, align, _), width in zip(specs, widths))]
+    lines.extend(" ".join(f"{value:{align}{width}}" for value, (_, align, _), width in zip(line, specs, widths)) for line in table)
+    print("\n".join(lines))
+
+def _parse_signal(name):
+    """Accepts 9, KILL or SIGKILL."""
+    if name.isdigit():
+        return signal.Signals(int(name))
+    name = name.upper()
+    return signal.Signals[name if name.startswith("SIG") else "SIG" + name]
+
+def _split_signal_args(args):
+    """Pulls a leading -SIGNAL / -s SIGNAL off the argument list."""
+    sig = signal.SIGTERM
+    args = list(args)
+    if args and args[0] == "-s":
+        args.pop(0)
+        sig = _parse_signal(args.pop(0))
+    elif args and args[0].startswith("-") and args[0] not in ("-f", "-n", "--dry-run", "--exact", "--user"):
+        sig = _parse_signal(args.pop(0)[1:])
+    return sig, args
 
 def handle_kill(args):
-    """Terminates a process by PID."""
-    if not args:
-        print("Usage: kill <pid>")
-        return
-    
+    """Sends a signal (SIGTERM by default) to one or more processes by PID."""
     try:
-        pid = int(args[0])
-        process = psutil.Process(pid)
-        process.terminate()
-        print(f"Process {pid} terminated.")
-    except (ValueError, psutil.NoSuchProcess):
-        print(f"Error: Invalid PID or process not found.")
-    except Exception as e:
-        print(f"Error: Could not terminate process - {e}")
\ No newline at end of file
+        sig, pids = _split_signal_args(args)
+    except (KeyError, ValueError, IndexError):
+        print("kill: invalid signal")
+        return 1
+    if not pids:
+        print("Usage: kill [-SIGNAL] <pid> [pid ...]")
+        return 1
+
+    index = get_process_index()
+    status = 0
+    for arg in pids:
+        try:
+            pid = int(arg)
+            index.process(pid).send_signal(sig)
+            if sig == signal.SIGTERM:
+                print(f"Process {pid} terminated.")
+            else:
+                print(f"Sent {sig.name} to process {pid}.")
+        except (ValueError, psutil.NoSuchProcess):
+            print(f"Error: Invalid PID or process not found: {arg}")
+            status = 1
+        except Exception as e:
+            print(f"Error: Could not signal process {arg} - {e}")
+            status = 1
+    return status or None
+
+def handle_pkill(args):
+    """
+    Signals every process whose name matches a regex, in one pass over the
+    shared process index. -f matches the full command line, --exact requires
+    the whole name to match, --user limits to one user and -n/--dry-run only
+    lists the matches.
+    """
+    try:
+        sig, args = _split_signal_args(args)
+        full, exact, dry_run, user = False, False, False, None
+        patterns = []
+        while args:
+            arg = args.pop(0)
+            if arg == "-f":
+                full = True
+            elif arg == "--exact":
+                exact = True
+            elif arg in ("-n", "--dry-run"):
+                dry_run = True
+            elif arg == "--user":
+                user = args.pop(0)
+            else:
+                patterns.append(arg)
+        if len(patterns) != 1:
+            raise ValueError
+        pattern = re.compile(patterns[0])
+    except (KeyError, ValueError, IndexError, re.error):
+        print("Usage: pkill [-SIGNAL] [-f] [--exact] [--user USER] [-n|--dry-run] <pattern>")
+        return 1
+
+    index = get_process_index()
+    fields = (["cmd"] if full else []) + (["user"] if user else [])
+    match = pattern.fullmatch if exact else pattern.search
+    # Never signal Nyra itself or the shell that started it
+    protected = {os.getpid(), os.getppid()}
+    targets = [
+        row for row in index.snapshot(fields)
+        if row["pid"] not in protected
+        and match(row["cmd"] if full else row["name"])
+        and (user is None or row["user"] == user)
+    ]
+    if not targets:
+        print(f"pkill: no process matches '{pattern.pattern}'")
+        return 1
+
+    signalled = 0
+    for row in targets:
+        if dry_run:
+            print(f"{row['pid']:>7} {row['name']}")
+            continue
+        try:
+            index.process(row["pid"]).send_signal(sig)
+            signalled += 1
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.AccessDenied:
+            print(f"pkill: permission denied: {row['pid']} ({row['name']})")
+    if not dry_run:
+        print(f"Sent {sig.name} to {signalled} of {len(targets)} matching processes.")
+    return None if dry_run or signalled else 1
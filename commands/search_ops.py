@@ -0,0 +1,437 @@
+import fnmatch
+import functools
+import math
+import mmap
+import os
+import re
+import stat
+import sys
+import time
+
+from utils.jobs import process_pool_context
+from utils.walk import walk
+
+# Files with a NUL byte in their first block are treated as binary and skipped
+_BINARY_SNIFF = 8192
+# Files handed to a worker process at a time
+_GREP_BATCH = 64
+# Worker processes are only started once this much has been scanned inline
+# and files remain, smaller searches don't pay for starting them
+_GREP_POOL_BYTES = 32 << 20
+
+def _print_error(command, path, e):
+    print(f"{command}: {path}: {e.strerror or e}", file=sys.stderr)
+
+class _RootEntry:
+    """Stands in for a DirEntry for a path given on the command line."""
+
+    __slots__ = ("path", "name", "_stat")
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path))
+        self._stat = os.lstat(path)
+
+    def is_dir(self, follow_symlinks=True):
+        return stat.S_ISDIR(self._stat.st_mode)
+
+    def is_file(self, follow_symlinks=True):
+        return stat.S_ISREG(self._stat.st_mode)
+
+    def is_symlink(self):
+        return stat.S_ISLNK(self._stat.st_mode)
+
+    def stat(self, follow_symlinks=True):
+        return self._stat
+
+# find
+
+_SIZE_UNITS = {"c": 1, "w": 2, "b": 512, "k": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+def _numeric_test(spec, measure):
+    sign = spec[0] if spec[:1] in "+-" else ""
+    target = int(spec[len(sign):])
+    if sign == "+":
+        return lambda entry: measure(entry) > target
+    if sign == "-":
+        return lambda entry: measure(entry) < target
+    return lambda entry: measure(entry) == target
+
+def _size_test(spec):
+    unit = spec[-1] if spec[-1] in _SIZE_UNITS else "b"
+    number = spec[:-1] if spec[-1] in _SIZE_UNITS else spec
+    size = _SIZE_UNITS[unit]
+    # Like find, sizes are rounded up to whole units
+    return _numeric_test(number, lambda entry: math.ceil(entry.stat(follow_symlinks=False).st_size / size))
+
+def _age_test(spec, seconds):
+    now = time.time()
+    return _numeric_test(spec, lambda entry: int((now - entry.stat(follow_symlinks=False).st_mtime) // seconds))
+
+_TYPE_TESTS = {
+    "f": lambda entry: entry.is_file(follow_symlinks=False),
+    "d": lambda entry: entry.is_dir(follow_symlinks=False),
+    "l": lambda entry: entry.is_symlink(),
+}
+
+_FIND_USAGE = ("Usage: find [path ...] [-name GLOB] [-iname GLOB] [-type f|d|l] [-size [+-]N[ckMG]]\n"
+               "            [-mtime [+-]DAYS] [-mmin [+-]MINUTES] [-maxdepth N] [-mindepth N] [--gitignore]")
+
+def _parse_find_args(args):
+    roots = []
+    args = list(args)
+    while args and not args[0].startswith("-"):
+        roots.append(args.pop(0))
+    options = {"roots": roots or ["."], "tests": [], "max_depth": None, "min_depth": 0, "gitignore": False}
+    tests = options["tests"]
+    while args:
+        arg = args.pop(0)
+        if arg == "-name":
+            pattern = args.pop(0)
+            tests.append(lambda entry, p=pattern: fnmatch.fnmatchcase(entry.name, p))
+        elif arg == "-iname":
+            pattern = args.pop(0).lower()
+            tests.append(lambda entry, p=pattern: fnmatch.fnmatchcase(entry.name.lower(), p))
+        elif arg == "-type":
+            kind = args.pop(0)
+            if kind not in _TYPE_TESTS:
+                raise ValueError(f"unknown type '{kind}'")
+            tests.append(_TYPE_TESTS[kind])
+        elif arg == "-size":
+            tests.append(_size_test(args.pop(0)))
+        elif arg == "-mtime":
+            tests.append(_age_test(args.pop(0), 86400))
+        elif arg == "-mmin":
+            tests.append(_age_test(args.pop(0), 60))
+        elif arg == "-maxdepth":
+            options["max_depth"] = int(args.pop(0))
+        elif arg == "-mindepth":
+            options["min_depth"] = int(args.pop(0))
+        elif arg == "--gitignore":
+            options["gitignore"] = True
+        elif arg == "-print":
+            continue
+        else:
+            raise ValueError(f"unknown predicate '{arg}'")
+    return options
+
+def handle_find(args):
+    """
+    Finds files below one or more paths (default '.'), printing each match as
+    soon as the parallel walker reaches it (in no fixed order). Tests are
+    and-ed: -name/-iname GLOB, -type f|d|l, -size, -mtime, -mmin, plus
+    -maxdepth/-mindepth. --gitignore prunes what .gitignore files exclude.
+    """
+    try:
+        options = _parse_find_args(args)
+    except (ValueError, IndexError) as e:
+        print(f"find: {e}" if str(e) else "find: missing argument")
+        print(_FIND_USAGE)
+        return 1
+
+    tests = options["tests"]
+    min_depth = options["min_depth"]
+    status = 0
+    out = sys.stdout
+    roots = []
+    for root in options["roots"]:
+        try:
+            entry = _RootEntry(root)
+        except OSError as e:
+            _print_error("find", root, e)
+            status = 1
+            continue
+        if min_depth == 0 and all(test(entry) for test in tests):
+            out.write(root + "\n")
+        if entry.is_dir():
+            roots.append(root)
+
+    errors = []
+    for entry, depth in walk(roots, options["max_depth"], options["gitignore"],
+                             on_error=lambda path, e: errors.append((path, e))):
+        if depth < min_depth:
+            continue
+        try:
+            if all(test(entry) for test in tests):
+                out.write(entry.path + "\n")
+        except OSError:
+            continue
+    for path, e in errors:
+        _print_error("find", path, e)
+    return 1 if status or errors else None
+
+# grep
+
+@functools.lru_cache(maxsize=16)
+def _compile(pattern, flags):
+    return re.compile(pattern, flags)
+
+def _grep_file(path, pattern, flags, mode, invert):
+    """
+    Scans one file through mmap with a bytes regex. Returns None for
+    unreadable, empty or binary files, otherwise a list of (line number,
+    line) for mode "lines", a match count for "count", or True/False for
+    "list". Line numbers are only counted in mode "lines".
+    """
+    regex = _compile(pattern, flags)
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm.find(b"\0", 0, _BINARY_SNIFF) != -1:
+                    return None
+                if invert:
+                    return _grep_inverted(mm, regex, mode)
+                return _grep_matches(mm, regex, mode)
+    except (OSError, ValueError):
+        return None
+
+def _grep_matches(mm, regex, mode):
+    size = len(mm)
+    lines = []
+    count = 0
+    pos = 0
+    line_number, counted_to = 1, 0
+    # After a final newline there is no further line, an empty match there doesn't count
+    last_start = size - 1 if mm[size - 1:size] == b"\n" else size
+    while pos <= size:
+        match = regex.search(mm, pos)
+        if match is None or match.start() > last_start:
+            break
+        if mode == "list":
+            return True
+        start = mm.rfind(b"\n", 0, match.start()) + 1
+        end = mm.find(b"\n", match.end())
+        if end == -1:
+            end = size
+        count += 1
+        if mode == "lines":
+            line_number += mm[counted_to:start].count(b"\n")
+            counted_to = start
+            lines.append((line_number, mm[start:end]))
+        pos = end + 1
+    if mode == "list":
+        return False
+    return count if mode == "count" else lines
+
+def _grep_inverted(mm, regex, mode):
+    lines = []
+    count = 0
+    for line_number, line in enumerate(iter(mm.readline, b""), 1):
+        line = line.rstrip(b"\n")
+        if regex.search(line) is None:
+            if mode == "list":
+                return True
+            count += 1
+            if mode == "lines":
+                lines.append((line_number, line))
+    if mode == "list":
+        return False
+    return count if mode == "count" else lines
+
+def _grep_batch(paths, cwd, pattern, flags, mode, invert):
+    """Worker: greps `paths`, relative to the caller's working directory `cwd`."""
+    return [(path, _grep_file(os.path.join(cwd, path), pattern, flags, mode, invert)) for path in paths]
+
+def _write_result(out, path, result, options):
+    """Prints one file's grep result. Returns True if it had a match."""
+    if result is None:
+        return False
+    mode = options["mode"]
+    if mode == "list":
+        if result:
+            out.write(path + "\n")
+        return result
+    if mode == "count":
+        out.write(f"{path}:{result}\n" if options["names"] else f"{result}\n")
+        return result > 0
+    prefix = path + ":" if options["names"] else ""
+    numbered = options["line_numbers"]
+    for line_number, line in result:
+        text = line.decode("utf-8", "replace")
+        out.write(f"{prefix}{line_number}:{text}\n" if numbered else f"{prefix}{text}\n")
+    return bool(result)
+
+_GREP_USAGE = ("Usage: grep [-r] [-i] [-l] [-c] [-n] [-v] [-w] [-F] [-h|-H] [--include GLOB]\n"
+               "            [--no-ignore] [-j N] PATTERN [path ...]")
+
+def _parse_grep_args(args):
+    options = {"recursive": False, "ignore_case": False, "mode": "lines", "line_numbers": False,
+               "invert": False, "words": False, "fixed": False, "names": None, "include": [],
+               "gitignore": True, "jobs": os.cpu_count() or 1}
+    rest = []
+    args = list(args)
+    flags = {"r": "recursive", "R": "recursive", "i": "ignore_case", "n": "line_numbers",
+             "v": "invert", "w": "words", "F": "fixed"}
+    while args:
+        arg = args.pop(0)
+        if arg == "--":
+            rest.extend(args)
+            break
+        if arg == "--include":
+            options["include"].append(args.pop(0))
+        elif arg == "--no-ignore":
+            options["gitignore"] = False
+        elif arg == "-j":
+            options["jobs"] = max(1, int(args.pop(0)))
+        elif arg.startswith("-") and len(arg) > 1 and not rest:
+            for char in arg[1:]:
+                if char in flags:
+                    options[flags[char]] = True
+                elif char == "l":
+                    options["mode"] = "list"
+                elif char == "c":
+                    options["mode"] = "count"
+                elif char in "hH":
+                    options["names"] = char == "H"
+                elif char != "E":
+                    raise ValueError(f"unknown option '-{char}'")
+        else:
+            rest.append(arg)
+    if not rest:
+        raise ValueError("")
+    options["pattern"], options["paths"] = rest[0], rest[1:]
+    return options
+
+def _grep_stdin(regex, options):
+    stream = getattr(sys.stdin, "buffer", None)
+    lines = stream if stream is not None else (line.encode() for line in sys.stdin)
+    invert, mode, numbered = options["invert"], options["mode"], options["line_numbers"]
+    out = sys.stdout
+    count = 0
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip(b"\r\n")
+        if (regex.search(line) is None) != invert:
+            continue
+        count += 1
+        if mode == "lines":
+            text = line.decode("utf-8", "replace")
+            out.write(f"{line_number}:{text}\n" if numbered else text + "\n")
+        elif mode == "list":
+            out.write("(standard input)\n")
+            break
+    if mode == "count":
+        out.write(f"{count}\n")
+    return count > 0
+
+def _grep_files(paths, options, pattern, flags):
+    """
+    Yields (path, result) for every file. Files are scanned inline until
+    _GREP_POOL_BYTES have been read, then the remaining ones go to worker
+    processes on multi-core machines, so regex matching isn't held to one
+    core by the GIL. Results come back as batches complete.
+    """
+    mode, invert = options["mode"], options["invert"]
+    paths = iter(paths)
+    scanned = 0
+    for path in paths:
+        yield path, _grep_file(path, pattern, flags, mode, invert)
+        if options["jobs"] == 1:
+            continue
+        try:
+            scanned += os.stat(path).st_size
+        except OSError:
+            continue
+        if scanned >= _GREP_POOL_BYTES:
+            break
+    # Only go on to a pool with files still to come
+    path = next(paths, None)
+    if path is None:
+        return
+
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    cwd = os.getcwd()
+    with ProcessPoolExecutor(max_workers=options["jobs"], mp_context=process_pool_context()) as executor:
+        pending = set()
+        batch = [path]
+        for path in paths:
+            batch.append(path)
+            if len(batch) < _GREP_BATCH:
+                continue
+            pending.add(executor.submit(_grep_batch, batch, cwd, pattern, flags, mode, invert))
+            batch = []
+            # Keep the pool busy without queueing the whole tree up front
+            if len(pending) >= options["jobs"] * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        if batch:
+            pending.add(executor.submit(_grep_batch, batch, cwd, pattern, flags, mode, invert))
+        for future in pending:
+            yield from future.result()
+
+def handle_grep(args):
+    """
+    Searches files (or stdin) for a regular expression. With -r, directories
+    are walked by the shared parallel walker, skipping what .gitignore
+    excludes (--no-ignore to search everything) and files are scanned via
+    mmap, in worker processes on multi-core machines once the search is big
+    enough (-j N, -j 1 keeps it in process). Binary files are
+    skipped. Options: -i, -l, -c, -n, -v, -w, -F, -h/-H, --include GLOB.
+    Returns 0 when something matched, 1 when nothing did and 2 on errors.
+    """
+    try:
+        options = _parse_grep_args(args)
+    except (ValueError, IndexError) as e:
+        if str(e):
+            print(f"grep: {e}")
+        print(_GREP_USAGE)
+        return 2
+
+    pattern = options["pattern"]
+    if options["fixed"]:
+        pattern = re.escape(pattern)
+    if options["words"]:
+        pattern = rf"\b(?:{pattern})\b"
+    flags = re.MULTILINE | (re.IGNORECASE if options["ignore_case"] else 0)
+    try:
+        regex = _compile(pattern.encode(), flags)
+    except re.error as e:
+        print(f"grep: invalid pattern: {e}")
+        return 2
+
+    if not options["paths"]:
+        if options["recursive"]:
+            options["paths"] = ["."]
+        else:
+            return 0 if _grep_stdin(regex, options) else 1
+
+    status = 0
+    files, roots = [], []
+    for path in options["paths"]:
+        if os.path.isdir(path):
+            if options["recursive"]:
+                roots.append(path)
+            else:
+                print(f"grep: {path}: Is a directory", file=sys.stderr)
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            print(f"grep: {path}: No such file or directory", file=sys.stderr)
+            status = 2
+    if options["names"] is None:
+        options["names"] = bool(roots) or len(files) > 1
+
+    include = options["include"]
+    def candidates():
+        yield from files
+        for entry, _ in walk(roots, gitignore=options["gitignore"],
+                             on_error=lambda path, e: _print_error("grep", path, e)):
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+            except OSError:
+                continue
+            if include and not any(fnmatch.fnmatchcase(entry.name, glob) for glob in include):
+                continue
+            yield entry.path
+
+    out = sys.stdout
+    matched = False
+    for path, result in _grep_files(candidates(), options, regex.pattern, flags):
+        matched = _write_result(out, path, result, options) or matched
+    if status:
+        return status
+    return None if matched else 1
@@ -0,0 +1,348 @@
+import sys
+
+# Descriptions shown by `help`, one entry per built-in command
+COMMAND_DESCRIPTIONS = {
+    'ls': 'Lists files and directories.',
+    'cd': 'Changes the current directory.',
+    'pwd': 'Prints the current working directory.',
+    'mkdir': 'Creates a new directory.',
+    'rm': 'Removes files and directory trees in parallel (-f, --dry-run).',
+    'cp': 'Copies files and trees (-r) in parallel with kernel copies (-p, -n, --progress).',
+    'mv': 'Moves or renames files, copying across filesystems (-n, --progress).',
+    'cat': 'Displays the content of a file.',
+    'tail': 'Prints the last lines of files, -f follows them through rotation.',
+    'touch': 'Creates a new empty file.',
+    'echo': 'Prints text to the terminal.',
+    'du': 'Shows disk usage per directory (-s, -h, --max-depth, --top N, --index).',
+    'find': 'Finds files by name, type, size or age (parallel walk).',
+    'grep': 'Searches files for a regex (-r, -i, -l, -c, -n, .gitignore-aware).',
+    'monitor': 'Displays, records (--record) or replays (--replay) system resource usage.',
+    'hostname': 'Displays the system hostname.',
+    'uptime': 'Shows how long the system has been running.',
+    'ps': 'Displays running processes (filters, --sort, --top, -o).',
+    'kill': 'Signals one or more processes by ID.',
+    'pkill': 'Signals all processes matching a pattern.',
+    'ping': 'Pings a host to check network connectivity.',
+    'curl': 'Fetches URLs with pooled connections (-j N, --url-file, -o/-O, --timing).',
+    'ifconfig': 'Shows network interface configuration.',
+    'ipconfig': 'Shows network interface configuration.',
+    'zip': 'Compresses files into a .zip archive.',
+    'unzip': 'Extracts files from a .zip archive.',
+    'help': 'Displays this help message.',
+    'history': 'Shows, searches (search TERM) or ranks (--top) the persistent history.',
+    'exit': 'Exits the terminal.',
+    'hash': 'Shows or resets the cache of resolved command paths (-r, -d NAME).',
+    'jobs': 'Lists background jobs (start one with `command &`).',
+    'fg': 'Shows a background job\'s output and waits for it (Ctrl+C interrupts it).',
+    'bg': 'Resumes a stopped background job.',
+    'wait': 'Waits for background jobs to finish.',
+    'parallel': 'Runs a command template over many inputs on -j workers (::: inputs, -k, --timeout, --retries).',
+    'time': 'Runs a command and reports wall, user and sys time and max RSS.',
+    'stats': 'Shows per-command latency statistics (--json [FILE] to export, -r to reset).',
+}
+
+def display_help(args=None):
+    """Displays a list of all available commands and their descriptions."""
+    print("Available Commands:")
+    from utils.dispatcher import BUILTIN_COMMANDS
+
+    for cmd in sorted(BUILTIN_COMMANDS):
+        print(f"  {cmd:<10} - {COMMAND_DESCRIPTIONS.get(cmd, 'Plugin command.')}")
+
+_HISTORY_USAGE = "Usage: history [-v] [-n N] [search TERM ...] [--top [N]]"
+
+def _format_history_row(row, verbose):
+    entry_id, command, cwd, status, started, duration = row
+    if not verbose:
+        return f"  {entry_id:<6} {command}"
+    import time
+
+    when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started)) if started else "-" * 19
+    status = "-" if status is None else status
+    duration = f"{duration:.3f}s" if duration is not None else "-"
+    return f"  {entry_id:<6} {when}  {status:>3}  {duration:>9}  {cwd or '-'}  {command}"
+
+def display_history(args=None):
+    """
+    Shows the command history from the persistent store: the last 25 entries
+    (-n N for more), `history search TERM ...` for the newest entries matching
+    every term, and `history --top [N]` for the most used commands. -v adds
+    time, exit status, duration and working directory.
+    """
+    from utils.history import get_history_store
+
+    args = list(args or [])
+    verbose = "-v" in args
+    args = [arg for arg in args if arg != "-v"]
+    limit = 25
+    try:
+        if "-n" in args:
+            i = args.index("-n")
+            limit = int(args[i + 1])
+            del args[i:i + 2]
+        top = None
+        if args and args[0] == "--top":
+            top = int(args[1]) if len(args) > 1 else 10
+    except (ValueError, IndexError):
+        print(_HISTORY_USAGE)
+        return 1
+
+    store = get_history_store()
+    if store is None:
+        # No database available, show what readline has in memory
+        import readline
+
+        for i in range(1, readline.get_current_history_length() + 1):
+            print(f"  {i:<4} {readline.get_history_item(i)}")
+        return
+
+    if top is not None:
+        for command, count in store.top(top):
+            print(f"  {count:>6}  {command}")
+    elif args and args[0] == "search":
+        if len(args) < 2:
+            print(_HISTORY_USAGE)
+            return 1
+        rows = store.search(args[1:], limit)
+        print("\n".join(_format_history_row(row, verbose) for row in rows) or "history: no matches")
+    elif not args:
+        for row in store.recent(limit):
+            print(_format_history_row(row, verbose))
+    else:
+        print(_HISTORY_USAGE)
+        return 1
+
+def handle_exit(args=None):
+    """Exits the terminal, optionally with a status code (`exit 2`)."""
+    print("Exiting terminal.")
+    try:
+        status = int(args[0]) if args else 0
+    except ValueError:
+        status = 1
+    sys.exit(status)
+
+
+def handle_hash(args=None):
+    """
+    Shows the resolved-command table (`hash`), resets it (`hash -r`), drops
+    entries (`hash -d NAME`) or looks names up ahead of time (`hash NAME ...`).
+    """
+    from utils.command_hash import COMMAND_HASH
+
+    args = args or []
+    if not args:
+        entries = COMMAND_HASH.entries()
+        if not entries:
+            print("hash: hash table empty")
+            return
+        print("hits\tcommand")
+        for name, path, hits in entries:
+            print(f"{hits:4}\t{path}")
+        return
+    if args[0] == "-r":
+        COMMAND_HASH.clear()
+        return
+    status = 0
+    if args[0] == "-d":
+        for name in args[1:]:
+            if not COMMAND_HASH.forget(name):
+                print(f"hash: {name}: not found")
+                status = 1
+        return status or None
+    for name in args:
+        if COMMAND_HASH.resolve(name) is None:
+            print(f"hash: {name}: not found")
+            status = 1
+    return status or None
+
+
+def _job_summary(job):
+    size = job.output_size()
+    output = f"{size} bytes of output" if size else "no output"
+    return f"[{job.id}]  {job.state:<9} {job.command}  ({output})"
+
+def handle_jobs(args=None):
+    """Lists background jobs. -l adds process IDs and the output file."""
+    from utils.jobs import JOBS
+
+    long_format = bool(args) and args[0] == "-l"
+    for job in JOBS.jobs():
+        print(_job_summary(job))
+        if long_format:
+            pids = " ".join(map(str, job.pids)) or "-"
+            print(f"      pids: {pids}  output: {job.log_path}")
+
+def _lookup_job(command, args):
+    from utils.jobs import JOBS
+
+    try:
+        return JOBS.get(args[0] if args else None)
+    except KeyError as e:
+        print(f"{command}: {e.args[0]}")
+        return None
+
+def handle_fg(args=None):
+    """
+    Brings a job (`fg %N`, default the newest) to the foreground: prints its
+    output captured so far, then follows it until the job ends. Ctrl+C
+    interrupts the job, not Nyra. A finished job is removed once shown.
+    """
+    import signal
+    from utils.jobs import JOBS
+
+    job = _lookup_job("fg", args)
+    if job is None:
+        return 1
+    print(job.command)
+    job.signal(signal.SIGCONT)
+    with open(job.log_path, "rb") as log:
+        log.seek(job.shown)
+        try:
+            while True:
+                finished = job.finished.is_set()
+                chunk = log.read()
+                if chunk:
+                    sys.stdout.write(chunk.decode("utf-8", "replace"))
+                    sys.stdout.flush()
+                elif finished:
+                    break
+                else:
+                    job.finished.wait(0.05)
+        except KeyboardInterrupt:
+            job.interrupt()
+            job.finished.wait(1.0)
+            print()
+            return 130
+        finally:
+            job.shown = log.tell()
+    JOBS.remove(job)
+    return job.status
+
+def handle_bg(args=None):
+    """Lets a stopped job (`bg %N`, default the newest) continue in the background."""
+    import signal
+
+    job = _lookup_job("bg", args)
+    if job is None:
+        return 1
+    if not job.stopped():
+        print(f"bg: job {job.id} already in background")
+        return 1
+    job.signal(signal.SIGCONT)
+    print(f"[{job.id}] {job.command} &")
+
+def handle_wait(args=None):
+    """Waits for the given jobs (`wait %1 %2`), or all of them, and returns the last status."""
+    from utils.jobs import JOBS
+
+    if not args:
+        return JOBS.wait()
+    jobs = []
+    for spec in args:
+        job = _lookup_job("wait", [spec])
+        if job is None:
+            return 127
+        jobs.append(job)
+    return JOBS.wait(jobs)
+
+def _format_seconds(seconds):
+    if seconds < 0.001:
+        return f"{seconds * 1e6:.0f}us"
+    if seconds < 1:
+        return f"{seconds * 1000:.1f}ms"
+    return f"{seconds:.2f}s"
+
+def time_command_line(command_line):
+    """
+    Runs a command line and reports its wall, user and sys time and max RSS
+    on stderr, like a shell's `time`. CPU times cover Nyra itself (builtins)
+    and the external commands it waited for. Max RSS is the peak of the
+    largest command started, or Nyra's own peak when none grew past it.
+    """
+    import os
+    import time
+    from utils.dispatcher import run_command_line
+
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        resource = None
+
+    if resource is not None:
+        children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    before = os.times()
+    start = time.perf_counter()
+    status = 1
+    try:
+        status = run_command_line(command_line) if command_line.strip() else 0
+    finally:
+        wall = time.perf_counter() - start
+        after = os.times()
+        user = (after.user - before.user) + (after.children_user - before.children_user)
+        system = (after.system - before.system) + (after.children_system - before.children_system)
+        report = [f"real {_format_seconds(wall)}", f"user {_format_seconds(user)}",
+                  f"sys {_format_seconds(system)}"]
+        if resource is not None:
+            rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            if rss <= children_rss:
+                rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS and KiB elsewhere
+            kib = rss // 1024 if sys.platform == "darwin" else rss
+            report.append(f"maxrss {kib / 1024:.1f}MB")
+        sys.stdout.flush()
+        print("  ".join(report), file=sys.stderr)
+    return status
+
+def handle_time(args=None):
+    """`time COMMAND ...` reached as a builtin (e.g. as a pipeline stage)."""
+    import shlex
+
+    return time_command_line(shlex.join(args or []))
+
+_STATS_USAGE = "Usage: stats [-r] [--json [FILE]] [COMMAND ...]"
+
+def handle_stats(args=None):
+    """
+    Shows the latency of every command run this session: count, mean,
+    p50/p90/p99 (from log2 histograms) and max, busiest first. COMMAND
+    arguments limit the table, --json [FILE] exports the histograms and
+    -r resets them.
+    """
+    from utils.stats import STATS
+
+    args = list(args or [])
+    if args == ["-r"]:
+        STATS.reset()
+        return
+    if args and args[0] == "--json":
+        import json
+
+        if len(args) > 2:
+            print(_STATS_USAGE)
+            return 1
+        data = json.dumps(STATS.as_dict(), indent=2)
+        if len(args) == 1:
+            print(data)
+            return
+        try:
+            with open(args[1], "w") as f:
+                f.write(data + "\n")
+        except OSError as e:
+            print(f"stats: {args[1]}: {e.strerror}")
+            return 1
+        return
+    if any(arg.startswith("-") for arg in args):
+        print(_STATS_USAGE)
+        return 1
+
+    rows = [(name, histogram) for name, histogram in STATS.histograms() if not args or name in args]
+    if not rows:
+        print("stats: no commands recorded")
+        return
+    width = max(12, *(len(name) for name, _ in rows))
+    print(f"{'command':<{width}} {'count':>6} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'total':>8}")
+    for name, histogram in rows:
+        columns = [histogram.total / histogram.count, histogram.percentile(0.5), histogram.percentile(0.9),
+                   histogram.percentile(0.99), histogram.max, histogram.total]
+        print(f"{name:<{width}} {histogram.count:>6} " + " ".join(f"{_format_seconds(c):>8}" for c in columns))
@@ -1,58 +1,312 @@
+import heapq
 import psutil
 import socket
-import os
+import sys
+import threading
 import time
+from array import array
+from operator import itemgetter
 
-def clear_screen():
-    """Clears the terminal screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+from commands.process_ops import ProcessTracker
 
-def handle_monitor():
+class RingBuffer:
+    """Fixed-size float history backed by an array, oldest values are overwritten."""
+
+    def __init__(self, capacity, typecode="d"):
+        self._data = array(typecode, bytes(array(typecode).itemsize * capacity))
+        self._capacity = capacity
+        self._next = 0
+        self._count = 0
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self._capacity
+        if self._count < self._capacity:
+            self._count += 1
+
+    def values(self):
+        """Returns the stored values, oldest first."""
+        if self._count < self._capacity:
+            return self._data[:self._count]
+        return self._data[self._next:] + self._data[:self._next]
+
+    def last(self, default=0.0):
+        return self._data[self._next - 1] if self._count else default
+
+    def __len__(self):
+        return self._count
+
+
+class MonitorSampler(threading.Thread):
+    """
+    Background thread that samples system and per-process usage without
+    blocking the display. System CPU/memory are read every `interval` seconds
+    with non-blocking cpu_percent(None). The process table is the expensive
+    part, so it is refreshed every `proc_interval` seconds and only the top N
+    rows are kept (a heap, no full sort).
+    """
+
+    def __init__(self, interval=1.0, proc_interval=2.0, top_n=10, history=120):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.proc_interval = max(interval, proc_interval)
+        self.top_n = top_n
+        self.timestamps = RingBuffer(history)
+        self.cpu_history = RingBuffer(history)
+        self.mem_history = RingBuffer(history)
+        self.memory = None
+        self.top = []
+        self.updated = threading.Event()
+        self._stopped = threading.Event()
+        self._tracker = ProcessTracker()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        # Prime the counters, the first real sample then covers one interval
+        psutil.cpu_percent(interval=None)
+        self._tracker.sample()
+        next_proc_sample = 0.0
+        while not self._stopped.wait(self.interval):
+            now = time.monotonic()
+            self.memory = psutil.virtual_memory()
+            if now >= next_proc_sample:
+                self.top = heapq.nlargest(self.top_n, self._tracker.sample(), key=itemgetter("cpu"))
+                next_proc_sample = now + self.proc_interval
+            self.timestamps.append(time.time())
+            self.cpu_history.append(psutil.cpu_percent(interval=None))
+            self.mem_history.append(self.memory.percent)
+            self.updated.set()
+
+
+def _sparkline(values, width):
+    """Renders the last `width` percentages as a row of block characters."""
+    blocks = " ▁▂▃▄▅▆▇█"
+    return "".join(blocks[min(8, int(v / 100 * 8 + 0.5))] for v in values[-width:])
+
+def _render_monitor(sampler):
+    from rich.console import Group
+    from rich.table import Table
+    from rich.text import Text
+
+    mem = sampler.memory
+    cpu_line = Text(f"  CPU: {sampler.cpu_history.last():>5.1f}%  ")
+    cpu_line.append(_sparkline(sampler.cpu_history.values(), 60), style="cyan")
+    mem_line = Text(f"  Memory: {mem.percent:>5.1f}% | {mem.used/1024/1024:.0f} MB / {mem.total/1024/1024:.0f} MB  ")
+    mem_line.append(_sparkline(sampler.mem_history.values(), 40), style="magenta")
+
+    table = Table(box=None, header_style="bold")
+    table.add_column("PID", justify="right")
+    table.add_column("CPU%", justify="right")
+    table.add_column("MEM%", justify="right")
+    table.add_column("NAME")
+    for row in sampler.top:
+        table.add_row(str(row["pid"]), f"{row['cpu']:.1f}", f"{row['mem']:.1f}", row["name"])
+
+    header = Text(f"System Monitor (refresh {sampler.interval:g}s, Press Ctrl+C to exit)\n", style="bold")
+    return Group(header, cpu_line, mem_line, Text(""), table)
+
+def _parse_time(spec, now):
+    """
+    A point in time as epoch seconds: an ISO date/time, HH:MM (today),
+    an offset from now like -30m, -2h or -7d, or epoch seconds.
+    """
+    from datetime import datetime
+
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    if spec == "now":
+        return now
+    if spec.startswith("-") and spec[-1:] in units:
+        return now - float(spec[1:-1]) * units[spec[-1]]
+    try:
+        return float(spec)
+    except ValueError:
+        pass
+    if len(spec) <= 8 and ":" in spec:
+        clock = datetime.strptime(spec, "%H:%M:%S" if spec.count(":") == 2 else "%H:%M")
+        return datetime.fromtimestamp(now).replace(hour=clock.hour, minute=clock.minute,
+                                                   second=clock.second, microsecond=0).timestamp()
+    return datetime.fromisoformat(spec).timestamp()
+
+def _parse_monitor_args(args):
+    options = {"interval": 1.0, "proc_interval": 2.0, "top_n": 10}
+    replay = {"record": None, "replay": None, "from": None, "to": None, "list": False}
+    now = time.time()
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg in ("-n", "--interval"):
+            options["interval"] = max(0.1, float(args.pop(0)))
+        elif arg == "--proc-interval":
+            options["proc_interval"] = float(args.pop(0))
+        elif arg == "--top":
+            options["top_n"] = int(args.pop(0))
+        elif arg in ("--record", "--replay"):
+            replay[arg[2:]] = args.pop(0)
+        elif arg in ("--from", "--to"):
+            replay[arg[2:]] = _parse_time(args.pop(0), now)
+        elif arg == "--list":
+            replay["list"] = True
+        else:
+            raise ValueError(arg)
+    if replay["record"] and replay["replay"]:
+        raise ValueError("--record and --replay")
+    return options, replay
+
+def _record(path, options):
+    """Samples headless and appends to the recording until Ctrl+C."""
+    from utils.timeseries import TOP_PROCESSES, SeriesWriter
+
+    try:
+        writer = SeriesWriter(path)
+    except (OSError, ValueError) as e:
+        print(f"monitor: {path}: {getattr(e, 'strerror', None) or e}")
+        return 1
+    options["top_n"] = TOP_PROCESSES
+    sampler = MonitorSampler(**options)
+    sampler.start()
+    print(f"monitor: recording to {path} every {sampler.interval:g}s (Ctrl+C stops)")
+    recorded = 0
+    try:
+        while True:
+            sampler.updated.wait()
+            sampler.updated.clear()
+            top = [(row["pid"], row["cpu"], row["mem"], row["name"]) for row in sampler.top]
+            writer.append(sampler.timestamps.last(), sampler.cpu_history.last(), sampler.memory.percent, top)
+            recorded += 1
+    except KeyboardInterrupt:
+        print(f"\nmonitor: {recorded} samples recorded.")
+    except OSError as e:
+        print(f"monitor: {path}: {e.strerror or e}")
+        return 1
+    finally:
+        sampler.stop()
+        writer.close()
+
+def _format_time(t):
+    from datetime import datetime
+
+    return datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S")
+
+def _columns(values, width):
+    """Shrinks `values` to at most `width` column means, for a sparkline."""
+    if len(values) <= width:
+        return values
+    columns = []
+    for i in range(width):
+        chunk = values[i * len(values) // width:(i + 1) * len(values) // width]
+        columns.append(sum(chunk) / len(chunk))
+    return columns
+
+# Replay reads the finest level with at most this many records in the window
+_REPLAY_RECORDS = 20000
+
+def _replay(path, replay, top_n):
+    """Summarizes (or with --list prints) the recorded samples between --from and --to."""
+    from utils.timeseries import RECORD, open_levels, unpack
+
+    try:
+        levels = open_levels(path)
+    except (OSError, ValueError) as e:
+        print(f"monitor: {path}: {getattr(e, 'strerror', None) or e}")
+        return 1
+    try:
+        for seconds, reader in levels:
+            # A rollup record covers [t, t + seconds), so take the ones overlapping --from
+            start = None if replay["from"] is None else replay["from"] - seconds
+            first, stop = reader.span(start, replay["to"])
+            if stop - first <= _REPLAY_RECORDS:
+                break
+        if first == stop:
+            print("monitor: no samples in that window")
+            return 1
+
+        out = sys.stdout
+        resolution = f"{seconds // 60}m" if 0 < seconds < 3600 else f"{seconds // 3600}h" if seconds else "raw"
+        if replay["list"]:
+            out.write(f"{'TIME':<19}  {'CPU%':>6} {'MAX':>6}  {'MEM%':>6} {'MAX':>6}  TOP\n")
+            for fields in reader.records(first, stop):
+                t, cpu, cpu_max, mem, mem_max, top = unpack(fields)
+                busiest = f"{top[0][3]} ({top[0][0]}) {top[0][1]:.1f}%" if top else ""
+                out.write(f"{_format_time(t):<19}  {cpu:6.1f} {cpu_max:6.1f}  {mem:6.1f} {mem_max:6.1f}  {busiest}\n")
+            out.flush()
+            return None
+
+        cpu_values, mem_values = array("d"), array("d")
+        cpu_peak = mem_peak = (-1.0, 0.0)
+        peaks = {}
+        for fields in reader.records(first, stop):
+            t, cpu, cpu_max, mem, mem_max, top = unpack(fields)
+            cpu_values.append(cpu)
+            mem_values.append(mem)
+            cpu_peak = max(cpu_peak, (cpu_max, t))
+            mem_peak = max(mem_peak, (mem_max, t))
+            for pid, proc_cpu, proc_mem, name in top:
+                if proc_cpu > peaks.get((pid, name), (-1.0,))[0]:
+                    peaks[(pid, name)] = (proc_cpu, proc_mem, t)
+        begin = reader.time(first)
+        end = min(reader.time(stop - 1) + seconds, replay["to"] or time.time())
+        out.write(f"{path}: {_format_time(begin)} to {_format_time(end)}, "
+                  f"{stop - first} {resolution} records\n")
+        out.write(f"  CPU:    mean {sum(cpu_values) / len(cpu_values):5.1f}%  max {cpu_peak[0]:5.1f}% "
+                  f"at {_format_time(cpu_peak[1])}  {_sparkline(_columns(cpu_values, 60), 60)}\n")
+        out.write(f"  Memory: mean {sum(mem_values) / len(mem_values):5.1f}%  max {mem_peak[0]:5.1f}% "
+                  f"at {_format_time(mem_peak[1])}  {_sparkline(_columns(mem_values, 60), 60)}\n")
+        if peaks:
+            out.write(f"\n  {'PID':>7} {'CPU%':>6} {'MEM%':>6}  {'AT':<19}  NAME\n")
+            busiest = sorted(peaks.items(), key=lambda item: item[1][0], reverse=True)[:top_n]
+            for (pid, name), (proc_cpu, proc_mem, t) in busiest:
+                out.write(f"  {pid:>7} {proc_cpu:6.1f} {proc_mem:6.1f}  {_format_time(t):<19}  {name}\n")
+        out.flush()
+    finally:
+        for _, reader in levels:
+            reader.close()
+
+def handle_monitor(args=None):
     """
     Displays real-time CPU, memory, and a list of top processes.
     This mimics the functionality of `top` or `htop`.
+    Sampling runs on a background thread, and the screen is redrawn in place
+    with rich Live instead of being cleared.
+    Options: -n/--interval SECONDS (down to 0.1), --proc-interval SECONDS, --top N.
+    --record FILE appends the samples to FILE instead of showing them (see
+    utils/timeseries.py), --replay FILE summarizes a recording, limited to
+    --from/--to (ISO date/time, HH:MM, -2h style offsets or epoch seconds),
+    and --list prints its records one per line.
     """
     try:
-        while True:
-            clear_screen()
-            
-            # Get system information
-            cpu_percent = psutil.cpu_percent(interval=1)
-            mem = psutil.virtual_memory()
-            
-            # Display system stats
-            print(f"System Monitor (Press Ctrl+C to exit)\n")
-            print(f"  CPU: {cpu_percent:>5.1f}%")
-            print(f"  Memory: {mem.percent:>5.1f}% | {mem.used/1024/1024:.0f} MB / {mem.total/1024/1024:.0f} MB\n")
-            
-            # Get a list of top processes
-            processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_info']):
-                try:
-                    processes.append(proc.info)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-            
-            # Sort processes by CPU usage
-            processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
-            
-            # Display the top processes
-            print(f"{'PID':<8} {'CPU%':<8} {'MEM%':<8} {'NAME'}")
-            print("-" * 40)
-            for proc in processes[:10]: # Show top 10 processes
-                mem_percent = proc['memory_info'].rss / mem.total * 100
-                print(f"{proc['pid']:<8} {proc['cpu_percent']:<8.1f} {mem_percent:<8.1f} {proc['name']}")
-            
-            time.sleep(5) # Refresh every second
-            
+        options, replay = _parse_monitor_args(args or [])
+    except (ValueError, IndexError):
+        print("Usage: monitor [-n SECONDS] [--proc-interval SECONDS] [--top N] [--record FILE]\n"
+              "       monitor --replay FILE [--from TIME] [--to TIME] [--list] [--top N]")
+        return 1
+    if replay["record"]:
+        return _record(replay["record"], options)
+    if replay["replay"]:
+        return _replay(replay["replay"], replay, options["top_n"])
+
+    from rich.live import Live
+
+    sampler = MonitorSampler(**options)
+    sampler.start()
+    try:
+        sampler.updated.wait()
+        with Live(_render_monitor(sampler), auto_refresh=False) as live:
+            while True:
+                sampler.updated.wait()
+                sampler.updated.clear()
+                live.update(_render_monitor(sampler), refresh=True)
     except KeyboardInterrupt:
         print("\nExiting monitor.")
+    finally:
+        sampler.stop()
 
-def handle_hostname():
+def handle_hostname(args=None):
     """Prints the system hostname."""
     print(socket.gethostname())
 
-def handle_uptime():
+def handle_uptime(args=None):
     """Shows how long the system has been running."""
     uptime_seconds = time.time() - psutil.boot_time()
     print(f"Uptime: {int(uptime_seconds // 3600)}h {int((uptime_seconds % 3600) // 60)}m {int(uptime_seconds % 60)}s")
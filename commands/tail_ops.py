@@ -0,0 +1,431 @@
+import os
+import select
+import stat
+import struct
+import sys
+import time
+from collections import deque
+
+from commands.file_ops import _copy_span, _sendfile_target
+
+# Bytes read per step when searching backwards from EOF for line starts
+_TAIL_BLOCK = 64 * 1024
+
+# inotify(7) event bits. A watch on a directory reports these for every file
+# inside it, so one watch per directory covers all the files followed there.
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_DIR_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+             | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_EVENT = struct.Struct("iIII")
+# Busy files are read at most this often: the events of a burst of writes
+# are collected and handled together instead of one wakeup per write
+_COALESCE = 0.05
+
+def _last_lines_offset(fd, size, count):
+    """
+    Offset where the last `count` lines start, found by reading backwards
+    from EOF a block at a time. A final newline ends the last line rather
+    than starting an empty one.
+    """
+    if count <= 0:
+        return size
+    newlines = 0
+    pos = size
+    while pos > 0:
+        start = max(0, pos - _TAIL_BLOCK)
+        os.lseek(fd, start, os.SEEK_SET)
+        block = os.read(fd, pos - start)
+        end = len(block)
+        if pos == size and block.endswith(b"\n"):
+            end -= 1
+        while True:
+            end = block.rfind(b"\n", 0, end)
+            if end < 0:
+                break
+            newlines += 1
+            if newlines == count:
+                return start + end + 1
+        pos = start
+    return 0
+
+def _first_lines_offset(fd, size, count):
+    """Offset of line `count` (1-based), for `tail -n +N`."""
+    if count <= 1:
+        return 0
+    os.lseek(fd, 0, os.SEEK_SET)
+    pos = skipped = 0
+    while pos < size:
+        block = os.read(fd, _TAIL_BLOCK)
+        if not block:
+            break
+        index = -1
+        while True:
+            index = block.find(b"\n", index + 1)
+            if index < 0:
+                break
+            skipped += 1
+            if skipped == count - 1:
+                return pos + index + 1
+        pos += len(block)
+    return size
+
+def _start_offset(fd, size, opts):
+    count, from_start = opts["count"], opts["from_start"]
+    if opts["bytes"]:
+        return min(size, max(0, count - 1)) if from_start else max(0, size - count)
+    if from_start:
+        return _first_lines_offset(fd, size, count)
+    return _last_lines_offset(fd, size, count)
+
+def _tail_stream(stream, opts, out):
+    """tail of a pipe or other unseekable input, which can only be read front to back."""
+    count, from_start = opts["count"], opts["from_start"]
+    if opts["bytes"]:
+        data = stream.read()
+        out.write(data[max(count - 1, 0):] if from_start else data[len(data) - count:] if count else b"")
+        return
+    if from_start:
+        for number, line in enumerate(stream, 1):
+            if number >= count:
+                out.write(line)
+        return
+    out.writelines(deque(stream, maxlen=count) if count else ())
+
+class _Inotify:
+    """The inotify(7) calls from libc through ctypes, for `tail -f` on Linux."""
+
+    def __init__(self):
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._get_errno = ctypes.get_errno
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(self._get_errno(), "inotify_init1 failed")
+
+    def watch(self, path, mask):
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = self._get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def read(self):
+        """Pending events as (wd, mask, name) tuples."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+    def close(self):
+        os.close(self.fd)
+
+class _Followed:
+    """
+    One file under `tail -f`, followed by name: truncation rewinds it, and a
+    new file under the same name (log rotation) is followed from its start
+    once the old one has been read to the end.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.identity = None
+        self.pos = 0
+        self.missing = False
+
+    def open(self, start_at_end):
+        self.file = open(self.path, "rb", buffering=0)
+        st = os.fstat(self.file.fileno())
+        self.identity = (st.st_dev, st.st_ino)
+        self.pos = st.st_size if start_at_end else 0
+        self.missing = False
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class _Follower:
+    """
+    Follows files from a single thread. On Linux it sleeps on one inotify
+    descriptor watching the files' directories; elsewhere (or when inotify
+    is unavailable) it stats every file once per interval. With inotify too,
+    every file is rechecked once per interval, which catches changes it
+    can't see (network filesystems, directories that were replaced).
+    """
+
+    def __init__(self, files, out, out_fd, headers, interval, pid):
+        self.files = files
+        self.out = out
+        self.out_fd = out_fd
+        self.headers = headers
+        self.interval = interval
+        self.pid = pid
+        self.last_shown = None
+        self.next_sweep = time.monotonic() + interval
+        self.inotify = None
+        # watch descriptor -> {file name: [_Followed, ...]}
+        self.watches = {}
+        if sys.platform.startswith("linux"):
+            try:
+                self.inotify = _Inotify()
+            except (OSError, AttributeError):
+                self.inotify = None
+        if self.inotify is not None:
+            for followed in files:
+                directory, name = os.path.split(os.path.abspath(followed.path))
+                try:
+                    wd = self.inotify.watch(directory, _DIR_MASK)
+                except OSError:
+                    continue
+                self.watches.setdefault(wd, {}).setdefault(name, []).append(followed)
+
+    def show(self, followed, start, end):
+        """Copies [start, end) of the file to stdout, after a header when the file changed."""
+        if self.headers and self.last_shown is not followed:
+            separator = b"" if self.last_shown is None else b"\n"
+            self.out.write(separator + b"==> " + os.fsencode(followed.path) + b" <==\n")
+            self.out.flush()
+        self.last_shown = followed
+        _copy_span(followed.file, start, end, self.out, self.out_fd)
+
+    def drain(self, followed):
+        """Shows whatever was appended since the last check."""
+        size = os.fstat(followed.file.fileno()).st_size
+        if size < followed.pos:
+            print(f"tail: {followed.path}: file truncated", file=sys.stderr)
+            followed.pos = 0
+        if size > followed.pos:
+            self.show(followed, followed.pos, size)
+            followed.pos = size
+
+    def check(self, followed):
+        try:
+            st = os.stat(followed.path)
+        except OSError:
+            st = None
+        if followed.file is not None:
+            self.drain(followed)
+            if st is not None and (st.st_dev, st.st_ino) == followed.identity:
+                return
+            if st is None:
+                if not followed.missing:
+                    print(f"tail: '{followed.path}' has become inaccessible", file=sys.stderr)
+                    followed.missing = True
+                # Kept open, a writer may still be finishing the rotated file
+                return
+            followed.close()
+            print(f"tail: '{followed.path}' has been replaced; following new file", file=sys.stderr)
+        elif st is None:
+            return
+        else:
+            print(f"tail: '{followed.path}' has appeared; following new file", file=sys.stderr)
+        try:
+            followed.open(start_at_end=False)
+        except OSError:
+            followed.missing = True
+            return
+        self.drain(followed)
+
+    def _wait(self):
+        """
+        Sleeps until inotify reports a change or the next sweep is due.
+        Returns the files to check: the changed ones, or all of them once
+        per interval.
+        """
+        timeout = max(0.0, self.next_sweep - time.monotonic())
+        changed = []
+        if self.inotify is None:
+            time.sleep(timeout)
+        elif select.select([self.inotify.fd], [], [], timeout)[0]:
+            time.sleep(_COALESCE)
+            for wd, mask, name in self.inotify.read():
+                if mask & (_IN_Q_OVERFLOW | _IN_DELETE_SELF | _IN_MOVE_SELF) or wd not in self.watches:
+                    # Events were lost or a directory went away, look at everything
+                    self.next_sweep = 0.0
+                    continue
+                for followed in self.watches[wd].get(name, ()):
+                    if followed not in changed:
+                        changed.append(followed)
+        now = time.monotonic()
+        if now >= self.next_sweep:
+            self.next_sweep = now + self.interval
+            return self.files
+        return changed
+
+    def _alive(self):
+        if self.pid is None:
+            return True
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def run(self):
+        try:
+            while self._alive():
+                for followed in self._wait():
+                    self.check(followed)
+            # One last look, for what the process wrote before it exited
+            for followed in self.files:
+                self.check(followed)
+        finally:
+            if self.inotify is not None:
+                self.inotify.close()
+            for followed in self.files:
+                followed.close()
+
+def _parse_count(value):
+    """N or +N (from the start) for -n/-c."""
+    from_start = value.startswith("+")
+    count = int(value.lstrip("+-"))
+    if count < 0:
+        raise ValueError(value)
+    return count, from_start
+
+def _parse_tail_args(args):
+    opts = {"count": 10, "from_start": False, "bytes": False, "follow": False, "headers": None,
+            "interval": 1.0, "pid": None}
+    files = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg in ("-n", "-c", "--lines", "--bytes"):
+            opts["count"], opts["from_start"] = _parse_count(args.pop(0))
+            opts["bytes"] = arg in ("-c", "--bytes")
+        elif arg.startswith(("--lines=", "--bytes=")):
+            opts["count"], opts["from_start"] = _parse_count(arg.partition("=")[2])
+            opts["bytes"] = arg.startswith("--bytes")
+        elif arg.startswith(("-n", "-c")) and len(arg) > 2:
+            opts["count"], opts["from_start"] = _parse_count(arg[2:])
+            opts["bytes"] = arg.startswith("-c")
+        elif arg[:1] == "-" and arg[1:].isdigit():
+            opts["count"], opts["from_start"] = int(arg[1:]), False
+        elif arg in ("-f", "-F", "--follow"):
+            opts["follow"] = True
+        elif arg == "-q":
+            opts["headers"] = False
+        elif arg == "-v":
+            opts["headers"] = True
+        elif arg in ("-s", "--sleep-interval"):
+            opts["interval"] = max(0.01, float(args.pop(0)))
+        elif arg == "--pid":
+            opts["pid"] = int(args.pop(0))
+        elif arg.startswith("-") and arg != "-":
+            raise ValueError(arg)
+        else:
+            files.append(arg)
+    return opts, files or ["-"]
+
+def handle_tail(args):
+    """
+    Prints the end of files: the last 10 lines, -n N lines (+N from line N
+    on) or -c N bytes. The start is found by reading backwards from EOF, so
+    the cost doesn't depend on file size. -f follows the files by name from
+    a single thread (inotify on Linux, polling every -s seconds elsewhere),
+    through truncation and log rotation, with a header whenever output
+    switches file. --pid PID stops following once PID exits.
+    """
+    try:
+        opts, files = _parse_tail_args(args)
+    except (ValueError, IndexError):
+        print("Usage: tail [-n N | -c N] [-f] [-q | -v] [-s SECONDS] [--pid PID] [file ...]")
+        return 1
+
+    out = sys.stdout
+    out.flush()
+    buffer = out.buffer
+    out_fd = _sendfile_target(out)
+    headers = opts["headers"] if opts["headers"] is not None else len(files) > 1
+    status = 0
+    followed = []
+    # The last file whose header was written, for the blank line before the next one
+    last_shown = None
+
+    def header(name, shown):
+        nonlocal last_shown
+        if headers:
+            separator = b"" if last_shown is None else b"\n"
+            buffer.write(separator + b"==> " + os.fsencode(name) + b" <==\n")
+        last_shown = shown
+
+    for path in files:
+        if path == "-":
+            header("standard input", path)
+            _tail_stream(sys.stdin.buffer, opts, buffer)
+            buffer.flush()
+            continue
+        entry = _Followed(path)
+        try:
+            entry.open(start_at_end=True)
+            header(path, entry)
+            fd = entry.file.fileno()
+            st = os.fstat(fd)
+            if stat.S_ISREG(st.st_mode) and st.st_size > 0:
+                start = _start_offset(fd, entry.pos, opts)
+                buffer.flush()
+                _copy_span(entry.file, start, entry.pos, buffer, out_fd)
+            else:
+                # Pipes, and files whose size says nothing (procfs, sysfs), are read to EOF
+                with open(fd, "rb", closefd=False) as stream:
+                    _tail_stream(stream, opts, buffer)
+                buffer.flush()
+                if not stat.S_ISREG(st.st_mode):
+                    entry.close()
+                    continue
+                # An empty file is followed from what was read, a procfs one from its size of 0
+                entry.pos = min(os.lseek(fd, 0, os.SEEK_CUR), os.fstat(fd).st_size)
+        except BrokenPipeError:
+            entry.close()
+            return 1
+        except FileNotFoundError:
+            print(f"tail: cannot open '{path}' for reading: No such file or directory")
+            status = 1
+            entry.missing = True
+        except IsADirectoryError:
+            print(f"tail: error reading '{path}': Is a directory")
+            status = 1
+            continue
+        except OSError as e:
+            entry.close()
+            print(f"tail: cannot open '{path}' for reading: {e.strerror}")
+            status = 1
+            continue
+        if opts["follow"]:
+            followed.append(entry)
+        else:
+            entry.close()
+    buffer.flush()
+
+    if not followed:
+        return status or None
+    follower = _Follower(followed, buffer, out_fd, headers, opts["interval"], opts["pid"])
+    follower.last_shown = last_shown
+    try:
+        follower.run()
+    except BrokenPipeError:
+        return 1
+    return status or None
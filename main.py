@@ -1,132 +1,95 @@
+import time
+
+# Taken before any other import so --startup-timing covers them
+_STARTED = time.perf_counter()
+
 import os
-import shlex
-import subprocess
 import sys
-import readline
 import atexit
 
-# Import all functions from our command modules
-from commands.file_ops import handle_ls, handle_mkdir, handle_rm, handle_pwd, handle_cd, handle_cat, handle_touch, handle_echo
-from commands.sys_monitor import handle_monitor, handle_hostname, handle_uptime
-from commands.process_ops import handle_ps, handle_kill
-from commands.network_ops import handle_ping, handle_curl, handle_ip_address
-from commands.archive_ops import handle_zip, handle_unzip
-from commands.command_map import get_platform_command
-from utils.nyra import run_nyra_terminal
+from utils.dispatcher import BUILTIN_COMMANDS, run_command_line
+from utils.jobs import JOBS
+
+# (phase, perf_counter) marks reported by --startup-timing
+STARTUP_MARKS = [("start", _STARTED), ("imports", time.perf_counter())]
 
 # Global variables for command history
 HISTORY_FILE = os.path.join(os.path.expanduser("~"), ".Nyra_history")
+# readline keeps only the recent commands (arrow keys and Ctrl+R), everything
+# else lives in the SQLite history store
+READLINE_HISTORY_LENGTH = 1000
 
-# List of all built-in commands for autocompletion and help
-ALL_BUILT_IN_COMMANDS = [
-    'ls', 'cd', 'pwd', 'mkdir', 'rm', 'cat', 'touch', 'echo',
-    'monitor', 'hostname', 'uptime', 'ps', 'kill',
-    'ping', 'curl', 'ifconfig', 'ipconfig', 'zip', 'unzip',
-    'help', 'history', 'exit'
-]
+def save_history():
+    """Saves the command history to a file."""
+    import readline
 
-def handle_external_command(command_input, args):
+    readline.write_history_file(HISTORY_FILE)
+
+def load_history(readline):
     """
-    Executes commands that are not explicitly mapped (built-in) but might have
-    a platform-specific name.
+    Opens the persistent history store and feeds its recent commands to
+    readline. An old plain-text history file is imported once into an empty
+    store. Falls back to that file (saved at exit) when the store can't be
+    opened, and returns the store or None.
     """
-    native_command = get_platform_command(command_input)
-    
-    if native_command:
-        # If a mapping exists in command_map.py, use it.
-        try:
-            full_command = native_command + args
-            subprocess.run(full_command, check=True)
-        except subprocess.CalledProcessError as e:
-            print(e.stderr, end='')
-        except FileNotFoundError:
-            print(f"Error: Command '{native_command[0]}' not found on this system. Please install it.")
-        return
-
-    # Fallback to a generic subprocess call if no mapping exists for this command.
-    try:
-        subprocess.run([command_input] + args, check=True)
-    except FileNotFoundError:
-        print(f"Nyra: {command_input}: command not found")
-    except subprocess.CalledProcessError as e:
-        print(e.stderr, end='')
-
-def display_help():
-    """Displays a list of all available commands and their descriptions."""
-    print("Available Commands:")
-    command_descriptions = {
-        'ls': 'Lists files and directories.',
-        'cd': 'Changes the current directory.',
-        'pwd': 'Prints the current working directory.',
-        'mkdir': 'Creates a new directory.',
-        'rm': 'Removes a file or directory.',
-        'cat': 'Displays the content of a file.',
-        'touch': 'Creates a new empty file.',
-        'echo': 'Prints text to the terminal.',
-        'monitor': 'Displays system resource usage.',
-        'hostname': 'Displays the system hostname.',
-        'uptime': 'Shows how long the system has been running.',
-        'ps': 'Displays running processes.',
-        'kill': 'Terminates a process by its ID.',
-        'ping': 'Pings a host to check network connectivity.',
-        'curl': 'Makes a web request.',
-        'zip': 'Compresses files into a .zip archive.',
-        'unzip': 'Extracts files from a .zip archive.',
-        'help': 'Displays this help message.',
-        'history': 'Shows the command history.',
-        'exit': 'Exits the terminal.'
-    }
-    for cmd in sorted(ALL_BUILT_IN_COMMANDS):
-        print(f"  {cmd:<10} - {command_descriptions.get(cmd, '')}")
-
-def display_history():
-    """Displays the command history."""
-    history_length = readline.get_current_history_length()
-    for i in range(1, history_length + 1):
-        print(f"  {i:<4} {readline.get_history_item(i)}")
-
-def completer(text, state):
+    from utils.history import get_history_store
+
+    store = get_history_store()
+    if store is None:
+        if os.path.exists(HISTORY_FILE):
+            readline.read_history_file(HISTORY_FILE)
+        atexit.register(save_history)
+        return None
+
+    if store.is_empty() and os.path.exists(HISTORY_FILE):
+        with open(HISTORY_FILE, errors="replace") as f:
+            store.import_commands(line.rstrip("\n") for line in f if line.strip())
+    for row in store.recent(READLINE_HISTORY_LENGTH):
+        readline.add_history(row[1])
+    return store
+
+def report_finished_jobs():
     """
-    This function suggests commands and file/directory names for readline.
+    Prints the background jobs that ended since the last prompt. Jobs with
+    output stay in the table for `fg`, the others are dropped right away.
     """
-    # Try to complete a command name
-    options = [c for c in ALL_BUILT_IN_COMMANDS if c.startswith(text)]
-    if options:
-        return options[state]
-    
-    # Then, try to complete a file or directory name
-    try:
-        items = os.listdir('.')
-        matches = [i for i in items if i.startswith(text)]
-        if matches:
-            return matches[state]
-    except FileNotFoundError:
-        pass
-    
-    return None
+    for job in JOBS.newly_finished():
+        has_output = job.output_size() > 0
+        note = f"output: fg %{job.id}" if has_output else "no output"
+        print(f"[{job.id}]+ {job.state:<9} {job.command}  ({note})")
+        if not has_output:
+            JOBS.remove(job)
 
-def save_history():
-    """Saves the command history to a file."""
-    readline.write_history_file(HISTORY_FILE)
+def report_startup_timing():
+    """Prints the time spent in each startup phase to stderr."""
+    phases = [
+        f"{name} {(t - prev) * 1000:.1f}ms"
+        for (_, prev), (name, t) in zip(STARTUP_MARKS, STARTUP_MARKS[1:])
+    ]
+    total = (STARTUP_MARKS[-1][1] - STARTUP_MARKS[0][1]) * 1000
+    print(f"startup: {', '.join(phases)} | first prompt after {total:.1f}ms", file=sys.stderr)
 
-def main():
+def main(startup_timing=False, runner=run_command_line):
     """
-    Main loop for the Python-based command terminal.
+    Main loop for the Python-based command terminal. Each command line goes
+    through `runner` (run_command_line, or its profiled wrapper).
     """
+    import readline
+
     # Setup readline for history and autocompletion - RUN ONCE
     if 'libedit' in readline.__doc__:
         readline.parse_and_bind("bind ^I rl_complete")
     else:
         readline.parse_and_bind("tab: complete")
     
+    from utils.completion import COMPLETER_DELIMS, Completer
+
+    completer = Completer(BUILTIN_COMMANDS)
     readline.set_completer(completer)
-    readline.set_history_length(100) # Optional: limit history size
-    
-    # Load command history from file
-    if os.path.exists(HISTORY_FILE):
-        readline.read_history_file(HISTORY_FILE)
-    
-    atexit.register(save_history)
+    readline.set_completer_delims(COMPLETER_DELIMS)
+    readline.set_history_length(READLINE_HISTORY_LENGTH)
+    history = load_history(readline)
+    completer.warm()
     
     print("=" * 40)
     print("\nWelcome to your custom terminal!")
@@ -135,9 +98,16 @@ def main():
     print("  - Use arrow keys to navigate command history.")
     print("  - Press 'Tab' for autocompletion.")
     print("  - Press 'Ctrl+R' to search history.")
+    print("  - End a command with '&' to run it in the background.")
     print("\n" + "-" * 40 + "\n")
+
+    STARTUP_MARKS.append(("readline", time.perf_counter()))
+    if startup_timing:
+        report_startup_timing()
     
     while True:
+        report_finished_jobs()
+        current_directory = None
         try:
             current_directory = os.getcwd()
             prompt = f"[{os.getlogin()}@Nyra {os.path.basename(current_directory)}]$ "
@@ -150,49 +120,109 @@ def main():
             if not command_input.strip():
                 continue
             
-            command_parts = shlex.split(command_input)
-            command = command_parts[0]
-            args = command_parts[1:]
-            
-            command_map = {
-                'ls': lambda: handle_ls(args),
-                'cd': lambda: handle_cd(args),
-                'pwd': lambda: handle_pwd(),
-                'mkdir': lambda: handle_mkdir(args),
-                'rm': lambda: handle_rm(args),
-                'cat': lambda: handle_cat(args),
-                'touch': lambda: handle_touch(args),
-                'echo': lambda: handle_echo(args),
-                'monitor': lambda: handle_monitor(),
-                'hostname': lambda: handle_hostname(),
-                'uptime': lambda: handle_uptime(),
-                'ps': lambda: handle_ps(),
-                'kill': lambda: handle_kill(args),
-                'ping': lambda: handle_ping(args),
-                'curl': lambda: handle_curl(args),
-                'ifconfig': lambda: handle_ip_address(args),
-                'ipconfig': lambda: handle_ip_address(args), 
-                'zip': lambda: handle_zip(args),
-                'unzip': lambda: handle_unzip(args),
-                'history': lambda: display_history(),
-                'help': lambda: display_help(),
-                'exit': lambda: print("Exiting terminal.") or sys.exit(0),
-            }
-
-            if command in command_map:
-                command_map[command]()
-            else:
-                handle_external_command(command_input, args)
-
-        except (ValueError, IndexError):
-            print("Error: Invalid command or arguments.")
+            started, status = time.time(), None
+            start_clock = time.perf_counter()
+            try:
+                status = runner(command_input)
+            finally:
+                # Written per command, before anything else can go wrong
+                if history is not None:
+                    history.record(command_input, current_directory, status, started,
+                                   time.perf_counter() - start_clock)
+
+        except (ValueError, IndexError) as e:
+            # Same report as run_batch, the generic one only when there's no message
+            print(f"Nyra: {e}" if str(e) else "Error: Invalid command or arguments.")
         except KeyboardInterrupt:
-            print("\nExiting terminal.")
-            break
+            # Ctrl+C stops the foreground command (or clears the line), not Nyra
+            print()
         except EOFError:
             print("\nExiting terminal.")
             break
 
+def run_batch(lines, runner=run_command_line):
+    """
+    Runs commands non-interactively (for -c, script files and piped stdin).
+    No banner and no readline. Blank lines and # comments are skipped.
+    Returns the exit status of the last command.
+    """
+    status = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] == "#":
+            continue
+        try:
+            status = runner(line)
+        except ValueError as e:
+            print(f"Nyra: {e}")
+            status = 2
+    # Background jobs would die with the interpreter, let them finish and
+    # show what they printed
+    for job in JOBS.jobs():
+        JOBS.wait([job])
+        with open(job.log_path, errors="replace") as log:
+            sys.stdout.write(log.read())
+    return status
+
+def parse_args(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="nyra", description="Nyra: the cross-platform developer's shell.")
+    parser.add_argument("-c", dest="command", metavar="COMMAND", help="run COMMAND and exit")
+    parser.add_argument("--startup-timing", action="store_true", help="report time spent before the first prompt")
+    parser.add_argument("--profile", nargs="?", const="nyra-profile", metavar="DIR",
+                        help="profile every command with cProfile into DIR/NNNN-command.prof (default ./nyra-profile)")
+    parser.add_argument("--server", action="store_true",
+                        help="serve commands on a Unix socket for utils/client.py (foreground)")
+    parser.add_argument("--socket", metavar="PATH", help="socket for --server (default $XDG_RUNTIME_DIR/nyra.sock)")
+    parser.add_argument("--workers", type=int, metavar="N", help="threads running --server requests (default 16)")
+    parser.add_argument("script", nargs="?", help="run commands from a script file ('-' reads stdin)")
+    return parser.parse_args(argv)
+
+def make_runner(options):
+    """run_command_line, wrapped in cProfile when --profile is given."""
+    if options.profile is None:
+        return run_command_line
+    from utils.stats import profiled
+
+    return profiled(run_command_line, options.profile)
+
+def run_noninteractive(options, runner=run_command_line):
+    """
+    Handles -c, script and stdin batch modes.
+    Returns an exit status, or None when Nyra should start interactively.
+    """
+    if options.command is not None:
+        return run_batch(options.command.splitlines(), runner)
+    if options.script == "-" or (options.script is None and not sys.stdin.isatty()):
+        return run_batch(sys.stdin, runner)
+    if options.script is None:
+        return None
+    try:
+        script = open(options.script)
+    except OSError as e:
+        print(f"Nyra: {options.script}: {e.strerror}")
+        return 1
+    with script:
+        return run_batch(script, runner)
+
 if __name__ == "__main__":
+    atexit.register(JOBS.cleanup)
+    options = parse_args(sys.argv[1:])
+    if options.server:
+        from utils.server import run_server
+
+        sys.exit(run_server(options.socket, options.workers))
+    runner = make_runner(options)
+    try:
+        status = run_noninteractive(options, runner)
+    except KeyboardInterrupt:
+        status = 130
+    if status is not None:
+        sys.exit(status)
+
+    from utils.nyra import run_nyra_terminal
+
     run_nyra_terminal()
-    main()
+    STARTUP_MARKS.append(("banner", time.perf_counter()))
+    main(options.startup_timing, runner)
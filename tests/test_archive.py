@@ -0,0 +1,68 @@
+import os
+import zipfile
+
+import pytest
+
+from commands import archive_ops
+
+
+def _make_tree(root):
+    files = {
+        "src/text.txt": b"compressible line\n" * 2000,
+        "src/random.bin": os.urandom(50000),
+        "src/empty": b"",
+        "src/deeper/small.txt": b"x",
+    }
+    for name, data in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return files
+
+
+def _check_archive(archive, files):
+    with zipfile.ZipFile(archive) as zf:
+        assert zf.testzip() is None
+        for name, data in files.items():
+            assert zf.read(name) == data
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_zip_round_trip(tmp_path, monkeypatch, jobs):
+    monkeypatch.chdir(tmp_path)
+    # Small enough for the tree to go through the process pool too
+    monkeypatch.setattr(archive_ops, "_PARALLEL_MIN_BYTES", 0)
+    files = _make_tree(tmp_path)
+    assert archive_ops.handle_zip(["-r", "-q", "-j", jobs, "out.zip", "src"]) is None
+    _check_archive("out.zip", files)
+
+    assert archive_ops.handle_unzip(["-q", "-j", jobs, "out.zip", "-d", "extracted"]) is None
+    for name, data in files.items():
+        assert (tmp_path / "extracted" / name).read_bytes() == data
+
+
+def test_zip_append_keeps_existing_entries(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    files = _make_tree(tmp_path)
+    (tmp_path / "later.txt").write_bytes(b"added later\n" * 100)
+    assert archive_ops.handle_zip(["-r", "-q", "out.zip", "src"]) is None
+    assert archive_ops.handle_zip(["-q", "out.zip", "later.txt"]) is None
+    _check_archive("out.zip", dict(files, **{"later.txt": b"added later\n" * 100}))
+
+
+def test_zip_without_precompressed_writes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(archive_ops, "_PRECOMPRESSED_VERSIONS", ((2, 0), (2, 0)))
+    files = _make_tree(tmp_path)
+    assert archive_ops.handle_zip(["-r", "-q", "out.zip", "src"]) is None
+    _check_archive("out.zip", files)
+
+
+def test_unzip_drops_setuid_bits(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with zipfile.ZipFile("modes.zip", "w") as zf:
+        info = zipfile.ZipInfo("tool")
+        info.external_attr = 0o104755 << 16
+        zf.writestr(info, b"#!/bin/sh\n")
+    assert archive_ops.handle_unzip(["-q", "modes.zip"]) is None
+    assert os.stat("tool").st_mode & 0o7777 == 0o755
@@ -0,0 +1,60 @@
+import os
+import threading
+
+from utils.command_hash import CommandHash
+from utils.completion import CompletionIndex
+from utils.jobs import job_context
+
+
+def _bin_dir(root, name, tool):
+    directory = root / name
+    directory.mkdir()
+    path = directory / tool
+    path.write_text("#!/bin/sh\n")
+    path.chmod(0o755)
+    return str(directory)
+
+
+def test_each_path_resolves_from_its_own_directories(tmp_path):
+    first = _bin_dir(tmp_path, "a", "tool")
+    second = _bin_dir(tmp_path, "b", "tool")
+    table = CommandHash()
+    wrong = []
+
+    def resolve_many(path):
+        with job_context(None, dict(os.environ, PATH=path)):
+            for _ in range(2000):
+                found = table.resolve("tool")
+                if os.path.dirname(found) != path:
+                    wrong.append(found)
+
+    threads = [threading.Thread(target=resolve_many, args=(path,)) for path in (first, second) * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert wrong == []
+    with job_context(None, dict(os.environ, PATH=first)):
+        assert [entry[:2] for entry in table.entries()] == [("tool", os.path.join(first, "tool"))]
+
+
+def test_forget_only_touches_the_current_path(tmp_path):
+    first = _bin_dir(tmp_path, "a", "tool")
+    second = _bin_dir(tmp_path, "b", "tool")
+    table = CommandHash()
+    for path in (first, second):
+        with job_context(None, dict(os.environ, PATH=path)):
+            table.resolve("tool")
+    with job_context(None, dict(os.environ, PATH=first)):
+        assert table.forget("tool")
+        assert table.entries() == []
+    with job_context(None, dict(os.environ, PATH=second)):
+        assert len(table.entries()) == 1
+
+
+def test_completion_uses_the_given_path(tmp_path):
+    first = _bin_dir(tmp_path, "a", "only-in-a")
+    second = _bin_dir(tmp_path, "b", "only-in-b")
+    index = CompletionIndex(["ls"])
+    assert index.complete("only", 0, "only", first) == ["only-in-a"]
+    assert index.complete("only", 0, "only", second) == ["only-in-b"]
@@ -0,0 +1,35 @@
+from commands.search_ops import handle_grep
+
+
+def test_empty_pattern_counts_no_line_after_final_newline(tmp_path, capsys):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"one\ntwo\nthree\n")
+    assert handle_grep(["-n", "", str(path)]) is None
+    assert capsys.readouterr().out == "1:one\n2:two\n3:three\n"
+
+
+def test_count_empty_lines(tmp_path, capsys):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"one\n\nthree\n")
+    assert handle_grep(["-c", "^$", str(path)]) is None
+    assert capsys.readouterr().out == "1\n"
+
+
+def test_match_at_end_without_final_newline(tmp_path, capsys):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"one\ntwo")
+    assert handle_grep(["-n", "o$", str(path)]) is None
+    assert capsys.readouterr().out == "2:two\n"
+
+
+def test_worker_pool_resolves_relative_paths(tmp_path, monkeypatch, capsys):
+    from commands import search_ops
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(search_ops, "_GREP_POOL_BYTES", 0)
+    for i in range(5):
+        (tmp_path / "src" / str(i)).mkdir(parents=True)
+        (tmp_path / "src" / str(i) / "f.txt").write_bytes(b"needle %d\n" % i)
+    assert handle_grep(["-r", "-j", "2", "needle", "src"]) is None
+    out = sorted(capsys.readouterr().out.splitlines())
+    assert out == [f"src/{i}/f.txt:needle {i}" for i in range(5)]
@@ -0,0 +1,36 @@
+import os
+
+from commands import file_ops
+
+
+def _age(path, seconds=100):
+    old = os.stat(path).st_mtime - seconds
+    os.utime(path, (old, old))
+
+
+def test_long_listing_sees_file_growth_in_cached_directory(tmp_path, capsys):
+    (tmp_path / "log").write_bytes(b"x")
+    _age(tmp_path)
+    file_ops.handle_ls(["-l", str(tmp_path)])
+    assert " 1 " in capsys.readouterr().out
+    # Appending doesn't change the directory's mtime, the cached listing is reused
+    (tmp_path / "log").write_bytes(b"x" * 12345)
+    file_ops.handle_ls(["-l", str(tmp_path)])
+    assert " 12345 " in capsys.readouterr().out
+
+
+def test_replaced_directory_with_same_mtime_is_listed_again(tmp_path, capsys):
+    target, other = tmp_path / "dir", tmp_path / "other"
+    target.mkdir()
+    other.mkdir()
+    (target / "old_name").touch()
+    (other / "new_name").touch()
+    _age(target)
+    stamp = os.stat(target).st_mtime_ns
+    os.utime(other, ns=(stamp, stamp))
+    file_ops.handle_ls(["-1", str(target)])
+    assert capsys.readouterr().out == "old_name\n"
+    os.rename(target, tmp_path / "moved")
+    os.rename(other, target)
+    file_ops.handle_ls(["-1", str(target)])
+    assert capsys.readouterr().out == "new_name\n"
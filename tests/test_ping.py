@@ -0,0 +1,30 @@
+import sys
+
+import pytest
+
+from commands import network_ops
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(network_ops.subprocess, "run", lambda command, **kwargs: calls.append(command))
+    monkeypatch.setattr(network_ops, "_ping_sweep", lambda args: calls.append(("sweep", args)))
+    return calls
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="Linux ping options")
+def test_single_host_options_keep_system_ping(calls):
+    network_ops.handle_ping(["-c", "2", "-t", "0.5", "example.com"])
+    assert calls == [["ping", "-W", "1", "-c", "2", "example.com"]]
+
+
+@pytest.mark.parametrize("args", [
+    ["a.example", "b.example"],
+    ["10.0.0.0/30"],
+    ["-p", "22", "example.com"],
+    ["--icmp", "-c", "2", "example.com"],
+])
+def test_sweep_needs_several_targets_or_a_sweep_option(calls, args):
+    network_ops.handle_ping(args)
+    assert calls == [("sweep", args)]
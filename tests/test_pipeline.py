@@ -0,0 +1,71 @@
+import shutil
+import threading
+
+import pytest
+
+from utils.dispatcher import run_command_line
+from utils.pipeline import parse_pipeline, split_background
+
+
+@pytest.mark.parametrize("line, argv", [
+    ("echo '>' hi", ["echo", ">", "hi"]),
+    ("grep '|' a.txt", ["grep", "|", "a.txt"]),
+    ("history search '|'", ["history", "search", "|"]),
+    ("echo \\> x", ["echo", ">", "x"]),
+])
+def test_quoted_operators_are_arguments(line, argv):
+    stages = parse_pipeline(line)
+    assert [stage.argv for stage in stages] == [argv]
+    assert stages[0].stdout_path is None and stages[0].stdin_path is None
+
+
+def test_unquoted_operators_still_split():
+    first, second = parse_pipeline("grep x 'a b' | sort >> 'out file'")
+    assert first.argv == ["grep", "x", "a b"]
+    assert second.argv == ["sort"]
+    assert second.stdout_path == "out file" and second.append
+
+
+def test_echo_quoted_redirect_creates_no_file(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    assert run_command_line("echo '>' hi") == 0
+    assert capsys.readouterr().out == "> hi\n"
+    assert not (tmp_path / "hi").exists()
+
+
+def test_grep_quoted_pipe(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.txt").write_text("a | b\nplain\n")
+    assert run_command_line("grep 'a | b' a.txt") == 0
+    assert capsys.readouterr().out == "a | b\n"
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("sleep 1 &", ("sleep 1", True)),
+    ("sleep 1&  ", ("sleep 1", True)),
+    ("echo foo\\&", ("echo foo\\&", False)),
+    ('echo "a &"', ('echo "a &"', False)),
+    ("echo 'a' '&'", ("echo 'a' '&'", False)),
+    ("make && make install", ("make && make install", False)),
+    ("ls | sort &", ("ls | sort", True)),
+])
+def test_split_background(line, expected):
+    assert split_background(line) == expected
+
+
+def test_escaped_ampersand_runs_in_foreground(capsys):
+    assert run_command_line('echo foo\\& "a &"') == 0
+    assert capsys.readouterr().out == "foo& a &\n"
+
+
+@pytest.mark.skipif(shutil.which("head") is None, reason="needs head(1)")
+def test_builtin_stops_when_downstream_exits_early(tmp_path, monkeypatch, capfd):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "big.txt").write_bytes(b"first\n" + b"filler line\n" * 2_000_000)
+    outcome = []
+    thread = threading.Thread(target=lambda: outcome.append(run_command_line("cat big.txt | head -n 1")),
+                              daemon=True)
+    thread.start()
+    thread.join(30)
+    assert not thread.is_alive(), "the pipeline kept running after head exited"
+    assert capfd.readouterr().out == "first\n"
@@ -0,0 +1,23 @@
+from commands.process_ops import _parse_ps_args, _select_rows
+
+
+def _rows():
+    return [
+        {"pid": 1, "user": "root", "threads": "?"},
+        {"pid": 2, "user": "?", "threads": 4},
+        {"pid": 3, "user": "alice", "threads": 9},
+    ]
+
+
+def test_unreadable_fields_sort_last():
+    rows = _select_rows(_rows(), _parse_ps_args(["--sort", "user"]))
+    assert [r["pid"] for r in rows] == [3, 1, 2]
+    rows = _select_rows(_rows(), _parse_ps_args(["--sort", "threads"]))
+    assert [r["pid"] for r in rows] == [3, 2, 1]
+    rows = _select_rows(_rows(), _parse_ps_args(["--sort", "threads", "-r"]))
+    assert [r["pid"] for r in rows] == [2, 3, 1]
+
+
+def test_top_with_unreadable_fields():
+    rows = _select_rows(_rows(), _parse_ps_args(["--sort", "threads", "--top", "2"]))
+    assert [r["pid"] for r in rows] == [3, 2]
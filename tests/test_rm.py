@@ -0,0 +1,39 @@
+import threading
+
+from commands import file_ops
+
+
+def _tree(root):
+    for i in range(3):
+        (root / "tree" / f"d{i}").mkdir(parents=True)
+        (root / "tree" / f"d{i}" / "f").write_bytes(b"x" * 10)
+    return root / "tree"
+
+
+def test_rm_removes_tree(tmp_path, capsys):
+    tree = _tree(tmp_path)
+    assert file_ops.handle_rm(["-r", str(tree)]) is None
+    assert not tree.exists()
+    assert "removed 3 files, 4 directories" in capsys.readouterr().out
+
+
+def test_unexpected_worker_error_reaches_the_caller(tmp_path, monkeypatch):
+    tree = _tree(tmp_path)
+
+    def broken_unlink(path):
+        raise RuntimeError("unlink failed")
+
+    monkeypatch.setattr(file_ops, "_unlink", broken_unlink)
+    outcome = []
+
+    def run():
+        try:
+            file_ops.handle_rm(["-r", str(tree)])
+        except RuntimeError as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), "rm hung waiting for the tree"
+    assert [str(e) for e in outcome] == ["unlink failed"]
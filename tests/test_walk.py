@@ -0,0 +1,29 @@
+import os
+import threading
+import time
+
+from utils import walk as walk_module
+
+
+def test_stopped_walk_does_not_read_queued_directories(tmp_path, monkeypatch):
+    for i in range(50):
+        (tmp_path / f"d{i}").mkdir()
+    scanned = []
+    real_scandir = os.scandir
+
+    def scandir(path):
+        scanned.append(path)
+        time.sleep(0.01)
+        return real_scandir(path)
+
+    monkeypatch.setattr(walk_module.os, "scandir", scandir)
+    before = threading.active_count()
+    walker = walk_module.walk([str(tmp_path)], workers=1)
+    next(walker)
+    walker.close()
+    deadline = time.monotonic() + 5
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert threading.active_count() == before
+    # The root and at most the directory that was being read when the walk stopped
+    assert len(scanned) <= 2
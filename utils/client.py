@@ -0,0 +1,148 @@
+"""
+Thin client for a warm `python main.py --server`:
+
+    python utils/client.py                 # interactive session
+    python utils/client.py -c "ls -l"      # one command line
+    python utils/client.py --ping | --stop
+
+Commands run in the server with this process's working directory,
+environment, stdin, stdout and stderr. The session follows `cd`. Nothing
+beyond utils.protocol (builtin modules only) is imported before the first
+command, so the client starts about as fast as the bare interpreter.
+"""
+import os
+import sys
+
+if not __package__:
+    # Run as a script from anywhere, not only as -m from the repository
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import protocol
+
+_USAGE = "Usage: client.py [--socket PATH] [-c COMMAND | --ping | --stop]"
+
+class Client:
+    def __init__(self, path):
+        self.sock = protocol.connect(path)
+        self.reader = protocol.FrameReader(self.sock)
+        self._matches = []
+
+    def _reply(self):
+        reply = self.reader.read()
+        if reply is None:
+            raise ConnectionError("the server closed the connection")
+        return reply
+
+    def request(self, message):
+        protocol.send(self.sock, message)
+        return self._reply()
+
+    def run(self, command, record=False):
+        """
+        Runs a command line in the server. Returns (status, exited). Ctrl+C
+        is passed on to the server as an interrupt of the command.
+        """
+        sys.stdout.flush()
+        message = {"op": "run", "command": command, "cwd": os.getcwd(), "env": dict(os.environ),
+                   "record": record}
+        protocol.send(self.sock, message, fds=(0, 1, 2))
+        while True:
+            try:
+                reply = self._reply()
+                break
+            except KeyboardInterrupt:
+                protocol.send(self.sock, {"op": "interrupt"})
+        try:
+            # The session follows the command's `cd`
+            os.chdir(reply["cwd"])
+        except (OSError, TypeError, KeyError):
+            pass
+        return reply.get("status", 1), reply.get("exit", False)
+
+    def completer(self, text, state):
+        """readline completer backed by the server's completion index."""
+        if state == 0:
+            import readline
+
+            try:
+                reply = self.request({"op": "complete", "line": readline.get_line_buffer(),
+                                      "begidx": readline.get_begidx(), "text": text, "cwd": os.getcwd(),
+                                      "path": os.environ.get("PATH", "")})
+                self._matches = reply.get("matches", [])
+            except (OSError, ValueError):
+                self._matches = []
+        return self._matches[state] if state < len(self._matches) else None
+
+    def interactive(self):
+        import readline
+
+        readline.parse_and_bind("bind ^I rl_complete" if "libedit" in (readline.__doc__ or "") else "tab: complete")
+        # Same delimiters as Nyra's own completer
+        readline.set_completer_delims(" \t\n\"'|<>;&")
+        readline.set_completer(self.completer)
+        status = 0
+        while True:
+            try:
+                user = os.getlogin()
+            except OSError:
+                user = "nyra"
+            try:
+                line = input(f"[{user}@Nyra {os.path.basename(os.getcwd())}]$ ")
+            except KeyboardInterrupt:
+                print()
+                continue
+            except EOFError:
+                print()
+                return status
+            if not line.strip():
+                continue
+            status, exited = self.run(line, record=True)
+            if exited:
+                return status
+
+def main(argv):
+    path, command, op = None, None, None
+    argv = list(argv)
+    try:
+        while argv:
+            arg = argv.pop(0)
+            if arg == "--socket":
+                path = argv.pop(0)
+            elif arg == "-c":
+                command = argv.pop(0)
+            elif arg in ("--ping", "--stop"):
+                op = arg
+            else:
+                raise IndexError(arg)
+    except IndexError:
+        print(_USAGE, file=sys.stderr)
+        return 2
+    path = path or protocol.default_socket_path()
+    try:
+        client = Client(path)
+    except OSError as e:
+        print(f"nyra client: no server at {path} ({e.strerror or e}); start one with `python main.py --server`",
+              file=sys.stderr)
+        return 1
+    try:
+        if op == "--ping":
+            print(f"nyra server pid {client.request({'op': 'ping'})['pid']} on {path}")
+            return 0
+        if op == "--stop":
+            client.request({"op": "shutdown"})
+            return 0
+        if command is not None:
+            status = 0
+            for line in command.splitlines():
+                if line.strip() and not line.lstrip().startswith("#"):
+                    status, exited = client.run(line)
+                    if exited:
+                        break
+            return status
+        return client.interactive()
+    except (OSError, ValueError) as e:
+        print(f"nyra client: {e}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
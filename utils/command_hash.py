@@ -0,0 +1,122 @@
+import os
+import signal
+import sys
+import threading
+
+# Python ignores these, children get the default back (subprocess's restore_signals)
+_RESTORED_SIGNALS = tuple(getattr(signal, name) for name in ("SIGPIPE", "SIGXFSZ") if hasattr(signal, name))
+
+# PATH values with a table of their own, beyond this the oldest is dropped
+_MAX_TABLES = 16
+
+class CommandHash:
+    """
+    Remembers where external commands were found on $PATH, like the `hash`
+    table of POSIX shells. There is one table per $PATH value, so server
+    clients with different PATHs neither share nor reset each other's
+    entries, and a single entry is dropped as soon as its file is no longer
+    executable, so a hit costs one access() call instead of a scan of every
+    PATH directory. Safe to use from several threads.
+    """
+
+    def __init__(self):
+        # PATH -> {name: [absolute path, hits]}
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _current(self):
+        """(PATH of the calling thread, its table). Call with the lock held."""
+        from utils.jobs import current_environ
+
+        path = current_environ().get("PATH", "")
+        table = self._tables.get(path)
+        if table is None:
+            if len(self._tables) >= _MAX_TABLES:
+                del self._tables[next(iter(self._tables))]
+            table = self._tables[path] = {}
+        return path, table
+
+    def resolve(self, name):
+        """Returns the absolute path of `name`, or None if it is not found."""
+        if os.sep in name or (os.altsep and os.altsep in name):
+            return name if os.access(name, os.X_OK) and not os.path.isdir(name) else None
+        with self._lock:
+            path, table = self._current()
+            entry = table.get(name)
+            found = entry[0] if entry is not None else None
+        if found is not None:
+            if os.access(found, os.X_OK):
+                with self._lock:
+                    entry[1] += 1
+                return found
+            with self._lock:
+                if table.get(name) is entry:
+                    del table[name]
+        import shutil
+
+        # The PATH read above, even if another thread's PATH is current by now
+        found = shutil.which(name, path=path)
+        if found is None:
+            return None
+        found = os.path.abspath(found)
+        with self._lock:
+            table[name] = [found, 1]
+        return found
+
+    def forget(self, name):
+        with self._lock:
+            return self._current()[1].pop(name, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._current()[1].clear()
+
+    def entries(self):
+        """(name, path, hits) for every command remembered for the current $PATH, by name."""
+        with self._lock:
+            table = self._current()[1]
+            return [(name, path, hits) for name, (path, hits) in sorted(table.items())]
+
+    def run(self, argv):
+        """
+        Runs argv in the foreground and returns its exit status. The resolved
+        path goes straight to posix_spawn where the platform has it. Raises
+        FileNotFoundError when the command is not on $PATH.
+        """
+        path = self.resolve(argv[0])
+        if path is None:
+            raise FileNotFoundError(argv[0])
+        from utils.jobs import current_environ, current_job, redirected_fds
+
+        sys.stdout.flush()
+        # Redirected streams of a pipeline stage or background job, and in a
+        # job a session of its own so terminal signals don't reach it
+        fds = redirected_fds()
+        job = current_job()
+        if hasattr(os, "posix_spawn"):
+            actions = [(os.POSIX_SPAWN_DUP2, fd, target) for target, fd in fds.items()]
+            pid = os.posix_spawn(path, argv, current_environ(), file_actions=actions or None,
+                                 setsid=job is not None, setsigdef=_RESTORED_SIGNALS)
+            if job is not None:
+                job.add_process(pid)
+            try:
+                _, status = os.waitpid(pid, 0)
+            except KeyboardInterrupt:
+                # The child got the same SIGINT, reap it before giving up
+                # (a job interrupted from `fg` may see this after it was reaped)
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+                raise
+            code = os.waitstatus_to_exitcode(status)
+        else:
+            import subprocess
+
+            code = subprocess.run(argv, executable=path, stdin=fds.get(0), stdout=fds.get(1), stderr=fds.get(2),
+                                  env=current_environ(), start_new_session=job is not None).returncode
+        # Killed by a signal: report 128+N like a shell
+        return 128 - code if code < 0 else code
+
+# The table shared by the dispatcher, pipelines and the `hash` builtin
+COMMAND_HASH = CommandHash()
@@ -0,0 +1,187 @@
+import bisect
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Characters that end a word for completion. '/' and '-' are deliberately not
+# in here (readline's default has both) so paths and options complete whole.
+COMPLETER_DELIMS = " \t\n\"'|<>;&"
+
+# Directory listings kept between completions
+_MAX_CACHED_DIRS = 64
+# Command tries kept, one per $PATH value
+_MAX_CACHED_PATHS = 8
+
+class PrefixTrie:
+    """A character trie of words, each node is a dict and "" marks a word end."""
+
+    def __init__(self, words=()):
+        self._root = {}
+        for word in words:
+            self.insert(word)
+
+    def insert(self, word):
+        node = self._root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def with_prefix(self, prefix):
+        """Returns every word starting with `prefix`, sorted."""
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        words = []
+        stack = [(node, prefix)]
+        while stack:
+            node, word = stack.pop()
+            for char, child in node.items():
+                if char == "":
+                    words.append(word)
+                else:
+                    stack.append((child, word + char))
+        words.sort()
+        return words
+
+def _is_executable(entry):
+    try:
+        if not entry.is_file():
+            return False
+    except OSError:
+        return False
+    if sys.platform == "win32":
+        extensions = os.environ.get("PATHEXT", ".EXE;.BAT;.CMD").lower().split(";")
+        return os.path.splitext(entry.name)[1].lower() in extensions
+    return os.access(entry.path, os.X_OK)
+
+class CompletionIndex:
+    """
+    Completion data that survives between Tab presses.
+
+    Command names (builtins plus the executables on $PATH) live in a prefix
+    trie that is rebuilt only when $PATH or the mtime of one of its directories
+    changes, one trie per $PATH value (server clients bring their own).
+    Directory listings are cached as sorted name lists keyed by the
+    directory's mtime, so a completion in a known directory costs one stat()
+    and a binary search, however many entries it has. The caches are shared
+    by the server's worker threads, a lock guards them.
+    """
+
+    def __init__(self, builtins):
+        self._builtins = builtins
+        # PATH -> (directory mtimes key, trie)
+        self._commands = OrderedDict()
+        # abspath -> (mtime_ns, sorted names, directories carry a trailing "/")
+        self._listings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path_dirs(self, path):
+        key = []
+        for directory in path.split(os.pathsep):
+            try:
+                key.append((directory, os.stat(directory).st_mtime_ns))
+            except OSError:
+                continue
+        return tuple(key)
+
+    def commands(self, path=None):
+        """The command trie for `path` (default $PATH), rebuilt when one of its directories changed."""
+        if path is None:
+            path = os.environ.get("PATH", "")
+        path_key = self._path_dirs(path)
+        with self._lock:
+            cached = self._commands.get(path)
+            if cached is not None and cached[0] == path_key:
+                self._commands.move_to_end(path)
+                return cached[1]
+        # Built without the lock, a concurrent build of the same trie is harmless
+        names = set(self._builtins)
+        for directory, _ in path_key:
+            try:
+                with os.scandir(directory) as entries:
+                    names.update(entry.name for entry in entries if _is_executable(entry))
+            except OSError:
+                continue
+        trie = PrefixTrie(names)
+        with self._lock:
+            self._commands[path] = (path_key, trie)
+            self._commands.move_to_end(path)
+            if len(self._commands) > _MAX_CACHED_PATHS:
+                self._commands.popitem(last=False)
+        return trie
+
+    def listing(self, directory):
+        """Sorted entry names of `directory`, directories suffixed with '/'."""
+        path = os.path.abspath(directory)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._listings.get(path)
+            if cached is not None and cached[0] == mtime:
+                self._listings.move_to_end(path)
+                return cached[1]
+        names = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                names.append(entry.name + "/" if is_dir else entry.name)
+        names.sort()
+        with self._lock:
+            self._listings[path] = (mtime, names)
+            self._listings.move_to_end(path)
+            if len(self._listings) > _MAX_CACHED_DIRS:
+                self._listings.popitem(last=False)
+        return names
+
+    def paths(self, text):
+        """Completes `text` as a (possibly nested, possibly ~) path."""
+        head, prefix = os.path.split(text)
+        directory = os.path.expanduser(head) if head else "."
+        try:
+            names = self.listing(directory)
+        except OSError:
+            return []
+        start = bisect.bisect_left(names, prefix)
+        end = bisect.bisect_left(names, prefix + "\U0010ffff", start)
+        matches = names[start:end]
+        if not prefix.startswith("."):
+            matches = [name for name in matches if name[0] != "."]
+        return [os.path.join(head, name) for name in matches] if head else matches
+
+    def complete(self, line, begidx, text, path=None):
+        """All completions for `text`, a word starting at `begidx` of `line`, commands from `path` (default $PATH)."""
+        before = line[:begidx].rstrip()
+        command_position = not before or before[-1] in "|;&"
+        if command_position and "/" not in text:
+            return self.commands(path).with_prefix(text)
+        return self.paths(text)
+
+class Completer:
+    """
+    readline completer over a CompletionIndex. Matches are computed once when
+    readline asks for state 0 and then served by index.
+    """
+
+    def __init__(self, builtins):
+        self.index = CompletionIndex(builtins)
+        self._matches = []
+
+    def warm(self):
+        """Builds the command trie in the background, before the first Tab."""
+        threading.Thread(target=self.index.commands, daemon=True).start()
+
+    def __call__(self, text, state):
+        if state == 0:
+            import readline
+
+            try:
+                self._matches = self.index.complete(readline.get_line_buffer(), readline.get_begidx(), text)
+            except Exception:
+                # An exception escaping here would be swallowed by readline anyway
+                self._matches = []
+        return self._matches[state] if state < len(self._matches) else None
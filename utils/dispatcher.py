@@ -0,0 +1,143 @@
+import time
+
+from commands.command_map import get_platform_command
+from utils.command_hash import COMMAND_HASH
+from utils.jobs import JOBS
+from utils.registry import CommandRegistry
+from utils.stats import STATS
+
+# Registry of built-in commands, built once at import. Handlers are named as
+# "module:function" and only imported the first time the command runs, so
+# startup doesn't pay for psutil or rich. Every handler takes the argument
+# list, so the same table drives the REPL, batch mode and pipeline stages.
+BUILTIN_COMMANDS = CommandRegistry({
+    'ls': 'commands.file_ops:handle_ls',
+    'cd': 'commands.file_ops:handle_cd',
+    'pwd': 'commands.file_ops:handle_pwd',
+    'mkdir': 'commands.file_ops:handle_mkdir',
+    'rm': 'commands.file_ops:handle_rm',
+    'cp': 'commands.copy_ops:handle_cp',
+    'mv': 'commands.copy_ops:handle_mv',
+    'cat': 'commands.file_ops:handle_cat',
+    'tail': 'commands.tail_ops:handle_tail',
+    'touch': 'commands.file_ops:handle_touch',
+    'echo': 'commands.file_ops:handle_echo',
+    'du': 'commands.disk_ops:handle_du',
+    'find': 'commands.search_ops:handle_find',
+    'grep': 'commands.search_ops:handle_grep',
+    'monitor': 'commands.sys_monitor:handle_monitor',
+    'hostname': 'commands.sys_monitor:handle_hostname',
+    'uptime': 'commands.sys_monitor:handle_uptime',
+    'ps': 'commands.process_ops:handle_ps',
+    'kill': 'commands.process_ops:handle_kill',
+    'pkill': 'commands.process_ops:handle_pkill',
+    'ping': 'commands.network_ops:handle_ping',
+    'curl': 'commands.http_ops:handle_curl',
+    'ifconfig': 'commands.network_ops:handle_ip_address',
+    'ipconfig': 'commands.network_ops:handle_ip_address',
+    'zip': 'commands.archive_ops:handle_zip',
+    'unzip': 'commands.archive_ops:handle_unzip',
+    'history': 'commands.shell_ops:display_history',
+    'help': 'commands.shell_ops:display_help',
+    'exit': 'commands.shell_ops:handle_exit',
+    'hash': 'commands.shell_ops:handle_hash',
+    'jobs': 'commands.shell_ops:handle_jobs',
+    'fg': 'commands.shell_ops:handle_fg',
+    'bg': 'commands.shell_ops:handle_bg',
+    'wait': 'commands.shell_ops:handle_wait',
+    'parallel': 'commands.parallel_ops:handle_parallel',
+    'time': 'commands.shell_ops:handle_time',
+    'stats': 'commands.shell_ops:handle_stats',
+})
+
+# Lines without these characters can skip shlex and the pipeline parser, which
+# (along with subprocess) are only imported once a line needs them.
+_SPECIAL_CHARS = frozenset("'\"\\|<>")
+_PIPELINE_CHARS = frozenset("|<>")
+
+def handle_external_command(command, args):
+    """
+    Executes commands that are not explicitly mapped (built-in) but might have
+    a platform-specific name. The executable is looked up through the shared
+    hash table, so repeated runs skip the $PATH search. Returns the command's
+    exit status.
+    """
+    native_command = get_platform_command(command)
+    argv = (native_command or [command]) + args
+    try:
+        return COMMAND_HASH.run(argv)
+    except FileNotFoundError:
+        if native_command:
+            # If a mapping exists in command_map.py but its tool is missing
+            print(f"Error: Command '{native_command[0]}' not found on this system. Please install it.")
+        else:
+            print(f"Nyra: {command}: command not found")
+        return 127
+    except OSError as e:
+        print(f"Nyra: {command}: {e.strerror}")
+        return 126
+
+def split_command(command_line):
+    """Tokenizes a command line, only paying for shlex when quoting is involved."""
+    if _SPECIAL_CHARS.isdisjoint(command_line):
+        return command_line.split()
+    import shlex
+
+    return shlex.split(command_line)
+
+def _stats_name(command_line):
+    """Key for the latency stats: the command name, or the stage names of a pipeline."""
+    if _PIPELINE_CHARS.isdisjoint(command_line):
+        return command_line.split(None, 1)[0]
+    stages = (stage.split(None, 1) for stage in command_line.split("|"))
+    return " | ".join(stage[0] for stage in stages if stage)
+
+def run_command_line(command_line):
+    """
+    Runs one line of input through the builtin table, the pipeline runner or
+    an external command, and returns its exit status.
+    Raises ValueError for lines that cannot be parsed.
+    A trailing unquoted '&' starts the line as a background job instead, and
+    a leading `time` times the whole line, pipelines included. Every
+    command's latency goes to the `stats` recorder.
+    """
+    if "&" in command_line:
+        from utils.pipeline import split_background
+
+        line, background = split_background(command_line)
+        if background:
+            if not line:
+                raise ValueError("syntax error near '&'")
+            job = JOBS.start(line, run_command_line)
+            print(f"[{job.id}] {line}")
+            return 0
+
+    stripped = command_line.lstrip()
+    if not stripped:
+        return 0
+    if stripped.startswith("time") and stripped[4:5] in ("", " ", "\t"):
+        from commands.shell_ops import time_command_line
+
+        return time_command_line(stripped[5:])
+
+    start = time.perf_counter()
+    try:
+        return _dispatch(command_line)
+    finally:
+        STATS.record(_stats_name(stripped), time.perf_counter() - start)
+
+def _dispatch(command_line):
+    if not _PIPELINE_CHARS.isdisjoint(command_line):
+        from utils.pipeline import parse_pipeline, run_pipeline
+
+        return run_pipeline(parse_pipeline(command_line), BUILTIN_COMMANDS)
+
+    command_parts = split_command(command_line)
+    if not command_parts:
+        return 0
+
+    handler = BUILTIN_COMMANDS.get(command_parts[0])
+    if handler is None:
+        return handle_external_command(command_parts[0], command_parts[1:])
+    status = handler(command_parts[1:])
+    return 0 if status is None else status
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+import time
+
+HISTORY_DB = os.path.join(os.path.expanduser("~"), ".Nyra_history.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    command TEXT NOT NULL,
+    cwd TEXT,
+    status INTEGER,
+    started REAL,
+    duration REAL
+);
+-- Usage count per distinct command, kept up to date on every insert so
+-- `history --top` reads an index instead of grouping the whole table
+CREATE TABLE IF NOT EXISTS command_counts (
+    command TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    last_used REAL
+);
+CREATE INDEX IF NOT EXISTS command_counts_by_count ON command_counts(count);
+"""
+
+# Full-text index over the commands, an external-content table so the text
+# isn't stored twice
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(command, content='history', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts(rowid, command) VALUES (new.id, new.command);
+END;
+"""
+
+# Stored in PRAGMA user_version, which also records whether the FTS index exists
+_SCHEMA_VERSION = 1
+_SCHEMA_VERSION_NO_FTS = 2
+
+_COLUMNS = "id, command, cwd, status, started, duration"
+
+def _match_query(terms, prefix):
+    """Every term must match, each as a quoted phrase, optionally as a prefix."""
+    suffix = "*" if prefix else ""
+    return " AND ".join('"%s"%s' % (term.replace('"', '""'), suffix) for term in terms)
+
+class HistoryStore:
+    """
+    Append-only command history in SQLite. Every command is committed on its
+    own as soon as it finishes, so a crashed session loses nothing, and
+    searches go through an FTS5 index (or LIKE where FTS5 is not compiled in).
+    Rows are (id, command, cwd, status, started, duration).
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        # One connection shared by every thread (server sessions), so
+        # transactions must not interleave
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0:
+            # New database, the schema script only runs once
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            try:
+                self._db.executescript(_FTS_SCHEMA)
+                version = _SCHEMA_VERSION
+            except sqlite3.OperationalError:
+                version = _SCHEMA_VERSION_NO_FTS
+            self._db.execute(f"PRAGMA user_version = {version}")
+        self.fts = version == _SCHEMA_VERSION
+
+    def record(self, command, cwd=None, status=None, started=None, duration=None):
+        """Appends one command in its own transaction. Returns False if the write failed."""
+        started = time.time() if started is None else started
+        try:
+            with self._lock, self._db:
+                self._db.execute("BEGIN")
+                self._db.execute(
+                    "INSERT INTO history (command, cwd, status, started, duration) VALUES (?, ?, ?, ?, ?)",
+                    (command, cwd, status, started, duration),
+                )
+                self._db.execute(
+                    "INSERT INTO command_counts (command, count, last_used) VALUES (?, 1, ?) "
+                    "ON CONFLICT(command) DO UPDATE SET count = count + 1, last_used = excluded.last_used",
+                    (command, started),
+                )
+        except sqlite3.Error:
+            return False
+        return True
+
+    def import_commands(self, commands):
+        """Bulk-loads plain command lines (e.g. an old readline history file)."""
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            for command in commands:
+                self._db.execute("INSERT INTO history (command) VALUES (?)", (command,))
+                self._db.execute(
+                    "INSERT INTO command_counts (command, count) VALUES (?, 1) "
+                    "ON CONFLICT(command) DO UPDATE SET count = count + 1",
+                    (command,),
+                )
+
+    def is_empty(self):
+        return self._db.execute("SELECT 1 FROM history LIMIT 1").fetchone() is None
+
+    def recent(self, limit):
+        """The last `limit` entries, oldest first."""
+        rows = self._db.execute(
+            f"SELECT {_COLUMNS} FROM history ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+    def search(self, terms, limit):
+        """The newest `limit` entries matching every term, oldest first."""
+        if self.fts:
+            # Whole-word matches only read each term's doclist. Prefix matches
+            # merge the doclists of every word they expand to, so they are
+            # only tried when the exact query comes up short.
+            for prefix in (False, True):
+                rows = self._db.execute(
+                    f"SELECT {_COLUMNS} FROM history WHERE id IN "
+                    "(SELECT rowid FROM history_fts WHERE history_fts MATCH ? ORDER BY rowid DESC LIMIT ?) "
+                    "ORDER BY id",
+                    (_match_query(terms, prefix), limit),
+                ).fetchall()
+                if len(rows) >= limit:
+                    break
+            return rows
+        where = " AND ".join("command LIKE ?" for _ in terms)
+        rows = self._db.execute(
+            f"SELECT {_COLUMNS} FROM history WHERE {where} ORDER BY id DESC LIMIT ?",
+            [f"%{term}%" for term in terms] + [limit],
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+    def top(self, limit):
+        """(command, count) for the most used commands."""
+        return self._db.execute(
+            "SELECT command, count FROM command_counts ORDER BY count DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+_STORE = None
+
+def get_history_store():
+    """The shared store, or None when the database can't be opened."""
+    global _STORE
+    if _STORE is None:
+        try:
+            _STORE = HistoryStore()
+        except sqlite3.Error:
+            return None
+    return _STORE
@@ -0,0 +1,274 @@
+import os
+import signal
+import sys
+import threading
+import time
+
+# Set on the thread that runs a background job
+_current = threading.local()
+# CLONE_FS for unshare(2): the calling thread gets its own working directory
+_CLONE_FS = 0x200
+
+def current_job():
+    """The job the calling thread is running, or None in the foreground."""
+    return getattr(_current, "job", None)
+
+def current_environ():
+    """The environment for external commands: the one bound to this thread, or os.environ."""
+    return getattr(_current, "environ", None) or os.environ
+
+class job_context:
+    """
+    `with job_context(job, environ):` runs the block as `job` (anything with
+    add_process(pid)): external commands started from this thread get a
+    session of their own and are reported to the job, and get `environ`
+    instead of os.environ if given. (A class, contextlib costs startup time.)
+    """
+
+    def __init__(self, job, environ=None):
+        self.job = job
+        self.environ = environ
+
+    def __enter__(self):
+        _current.job = self.job
+        _current.environ = self.environ
+        return self.job
+
+    def __exit__(self, *exc_info):
+        _current.job = None
+        _current.environ = None
+
+def interrupt_thread(thread, exception=KeyboardInterrupt):
+    """Raises `exception` in another thread at its next bytecode (None clears a pending one)."""
+    import ctypes
+
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread.ident), ctypes.py_object(exception) if exception is not None else None
+    )
+
+def isolate_working_directory():
+    """
+    Unshares the calling thread's filesystem context (Linux), so os.chdir()
+    there only moves that thread and the threads it starts, and a chdir()
+    elsewhere doesn't move it. Returns False where that isn't possible.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    import ctypes
+
+    try:
+        return ctypes.CDLL(None, use_errno=True).unshare(_CLONE_FS) == 0
+    except (OSError, AttributeError):
+        return False
+
+def process_pool_context():
+    """
+    multiprocessing context for the worker pools (grep, zip, unzip):
+    forkserver, or spawn where that doesn't exist. A fork() while other
+    threads run could copy a lock one of them holds. Workers take the working
+    directory of the thread that started them, so they are given absolute paths.
+    """
+    import multiprocessing
+
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def redirected_fds():
+    """
+    {target fd: fd} for the standard streams this thread has redirected
+    through the thread-local proxies, so external commands started from a
+    pipeline stage or a background job write where the builtin would.
+    """
+    fds = {}
+    for target, stream in ((0, sys.stdin), (1, sys.stdout), (2, sys.stderr)):
+        fileno = getattr(stream, "redirected_fileno", None)
+        fd = fileno() if fileno is not None else None
+        if fd is not None and fd != target:
+            fds[target] = fd
+    return fds
+
+class Job:
+    """
+    One `command &`. The command line runs on its own thread with stdin from
+    /dev/null and stdout/stderr going to a log file. External processes it
+    starts get their own session and are recorded in `pids`, so they can be
+    signalled without touching Nyra. The thread has a working directory
+    of its own, the one the job was started in, so a later `cd` in the
+    shell doesn't change what the job works on.
+    """
+
+    def __init__(self, job_id, command):
+        import tempfile
+
+        self.id = job_id
+        self.command = command
+        self.cwd = os.getcwd()
+        self.isolated = False
+        fd, self.log_path = tempfile.mkstemp(prefix=f"nyra-job{job_id}-", suffix=".log")
+        os.close(fd)
+        self.pids = []
+        self.status = None
+        self.started = time.time()
+        self.finished = threading.Event()
+        self.reported = False
+        # How much of the log `fg` has already shown
+        self.shown = 0
+        self.thread = None
+
+    @property
+    def state(self):
+        if self.finished.is_set():
+            return "Done" if self.status == 0 else f"Exit {self.status}"
+        return "Stopped" if self.stopped() else "Running"
+
+    def stopped(self):
+        for pid in self.pids:
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    if f.read().rpartition(")")[2].split()[0] == "T":
+                        return True
+            except (OSError, IndexError):
+                continue
+        return False
+
+    def add_process(self, pid):
+        self.pids.append(pid)
+
+    def signal(self, sig):
+        """Sends `sig` to the process group of every process the job started."""
+        for pid in self.pids:
+            try:
+                os.killpg(pid, sig)
+            except (ProcessLookupError, PermissionError):
+                continue
+
+    def interrupt(self):
+        """Ctrl+C for a job: SIGINT to its processes, KeyboardInterrupt to its thread."""
+        self.signal(signal.SIGINT)
+        if self.thread is not None and self.thread.is_alive():
+            interrupt_thread(self.thread)
+
+    def output_size(self):
+        try:
+            return os.path.getsize(self.log_path)
+        except OSError:
+            return 0
+
+    def _run(self, runner, ready):
+        from utils.pipeline import install_stream_proxies
+
+        try:
+            self.isolated = isolate_working_directory()
+            if self.isolated:
+                os.chdir(self.cwd)
+        except OSError:
+            self.isolated = False
+        finally:
+            ready.set()
+        if not self.isolated:
+            self.status = 1
+            self.finished.set()
+            return
+        stdout, stdin, stderr = install_stream_proxies()
+        log = open(self.log_path, "a", buffering=1)
+        devnull = open(os.devnull)
+        stdout.set(log)
+        stderr.set(log)
+        stdin.set(devnull)
+        status = 1
+        try:
+            with job_context(self):
+                status = runner(self.command)
+        except KeyboardInterrupt:
+            status = 130
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 0
+        except Exception as e:
+            log.write(f"Nyra: {e}\n")
+        finally:
+            stdout.set(None)
+            stderr.set(None)
+            stdin.set(None)
+            log.close()
+            devnull.close()
+            self.status = status
+            self.finished.set()
+
+class JobTable:
+    """Background jobs by number, like a shell's job table."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, command, runner):
+        """
+        Runs runner(command) as a new background job and returns it.
+        Raises ValueError where the job can't get a working directory of
+        its own, as it would follow every `cd` of the shell.
+        """
+        with self._lock:
+            job_id = 1
+            while job_id in self._jobs:
+                job_id += 1
+            job = Job(job_id, command)
+            self._jobs[job_id] = job
+        ready = threading.Event()
+        job.thread = threading.Thread(target=job._run, args=(runner, ready), name=f"job-{job_id}", daemon=True)
+        job.thread.start()
+        ready.wait()
+        if not job.isolated:
+            self.remove(job)
+            raise ValueError("background jobs need a per-thread working directory (Linux only)")
+        return job
+
+    def jobs(self):
+        with self._lock:
+            return [self._jobs[job_id] for job_id in sorted(self._jobs)]
+
+    def get(self, spec=None):
+        """
+        Looks up a job by `%N`/`N`, or the newest job without a spec.
+        Raises KeyError if there is no such job.
+        """
+        with self._lock:
+            if not self._jobs:
+                raise KeyError("no current job")
+            if spec is None:
+                return self._jobs[max(self._jobs)]
+            try:
+                return self._jobs[int(spec.lstrip("%"))]
+            except (ValueError, KeyError):
+                raise KeyError(f"{spec}: no such job") from None
+
+    def remove(self, job):
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        try:
+            os.unlink(job.log_path)
+        except OSError:
+            pass
+
+    def newly_finished(self):
+        """Finished jobs not reported yet, marked as reported."""
+        finished = [job for job in self.jobs() if job.finished.is_set() and not job.reported]
+        for job in finished:
+            job.reported = True
+        return finished
+
+    def wait(self, jobs=None):
+        """Blocks until the given (default all) jobs finish. Returns the last status."""
+        status = 0
+        for job in jobs if jobs is not None else self.jobs():
+            # Short timeouts keep Ctrl+C responsive while waiting
+            while not job.finished.wait(0.1):
+                pass
+            status = job.status
+        return status
+
+    def cleanup(self):
+        """Removes the log files of every job (at exit)."""
+        for job in self.jobs():
+            self.remove(job)
+
+JOBS = JobTable()
@@ -1,18 +1,7 @@
-import pyfiglet
-from rich.console import Console
-from rich.text import Text
+import os
 import sys
 
-def clear_screen():
-    """Clears the terminal screen."""
-    print("\033c", end="")
-
-def run_nyra_terminal():
-    console = Console()
-    clear_screen()
-    # ascii_art = pyfiglet.figlet_format("NYRA", font="rectangles")
-    
-    ascii_art = r"""
+ASCII_ART = r"""
 __   ___   _______  ___  
 | \ | \ \ / / ___ \/ _ \ 
 |  \| |\ V /| |_/ / /_\ \
@@ -22,35 +11,68 @@ __   ___   _______  ___
                          
                          
      """
-    start_color = (0, 102, 255)  # Blue
-    mid_color = (153, 51, 255)   # Purple
-    end_color = (255, 102, 178)  # Pink
 
-    lines = ascii_art.splitlines()
-    gradient_text = Text()
+START_COLOR = (0, 102, 255)  # Blue
+MID_COLOR = (153, 51, 255)   # Purple
+END_COLOR = (255, 102, 178)  # Pink
+
+HINT = "Type 'help' for a list of commands."
+
+def clear_screen():
+    """Clears the terminal screen."""
+    print("\033c", end="")
+
+def _gradient_color(pos):
+    """Blue -> purple -> pink gradient for a position in [0, 1)."""
+    if pos < 0.5:
+        start, end, t = START_COLOR, MID_COLOR, pos / 0.5
+    else:
+        start, end, t = MID_COLOR, END_COLOR, (pos - 0.5) / 0.5
+    return tuple(int(a + (b - a) * t) for a, b in zip(start, end))
 
+def _color_code(rgb, truecolor):
+    if truecolor:
+        return "38;2;%d;%d;%d" % rgb
+    # Nearest entry of the 6x6x6 cube of the 256-color palette
+    r, g, b = (round(c / 255 * 5) for c in rgb)
+    return "38;5;%d" % (16 + 36 * r + 6 * g + b)
+
+def render_banner(width, color, truecolor):
+    """
+    Builds the complete banner as one string of ANSI escapes, centered for a
+    terminal `width`, and written with a single write(), without rich or
+    pyfiglet. It is rendered once per start, which takes well under a
+    millisecond, so it isn't cached.
+    """
+    lines = ASCII_ART.splitlines()
     total_length = sum(len(line) for line in lines)
-    current_pos = 0
+    pad = " " * max(0, (width - max(len(line) for line in lines)) // 2)
 
+    out = []
+    current_pos = 0
     for line in lines:
-        for char in line:
-            pos = current_pos / total_length
-            current_pos += 1
-
-            if pos < 0.5:
-                r = int(start_color[0] + (mid_color[0] - start_color[0]) * (pos / 0.5))
-                g = int(start_color[1] + (mid_color[1] - start_color[1]) * (pos / 0.5))
-                b = int(start_color[2] + (mid_color[2] - start_color[2]) * (pos / 0.5))
-            else:
-                r = int(mid_color[0] + (end_color[0] - mid_color[0]) * ((pos - 0.5) / 0.5))
-                g = int(mid_color[1] + (end_color[1] - mid_color[1]) * ((pos - 0.5) / 0.5))
-                b = int(mid_color[2] + (end_color[2] - mid_color[2]) * ((pos - 0.5) / 0.5))
-
+        if color and line:
             # Color everything, including spaces
-            gradient_text.append(char if char != "" else " ", style=f"rgb({r},{g},{b})")
-        gradient_text.append("\n")
+            cells = []
+            for char in line:
+                code = _color_code(_gradient_color(current_pos / total_length), truecolor)
+                cells.append(f"\033[{code}m{char}")
+                current_pos += 1
+            out.append(pad + "".join(cells) + "\033[0m")
+        else:
+            current_pos += len(line)
+            out.append(pad + line)
 
-    # Print solid gradient-painted banner
-    console.print(gradient_text, justify="center")
+    out.append(f"\033[1;94m{HINT}\033[0m\n" if color else HINT + "\n")
+    return "\n".join(out) + "\n"
 
-    console.print("[bold bright_blue]Type 'help' for a list of commands.[/bold bright_blue]\n")
+def run_nyra_terminal():
+    clear_screen()
+    color = sys.stdout.isatty() and "NO_COLOR" not in os.environ
+    truecolor = os.environ.get("COLORTERM", "") in ("truecolor", "24bit")
+    try:
+        width = os.get_terminal_size(sys.stdout.fileno()).columns
+    except (OSError, ValueError):
+        width = 80
+    sys.stdout.write(render_banner(width, color, truecolor))
+    sys.stdout.flush()
@@ -0,0 +1,322 @@
+import os
+import subprocess
+import sys
+import threading
+
+from commands.command_map import get_platform_command
+from utils.command_hash import COMMAND_HASH
+from utils.jobs import current_environ, current_job, redirected_fds
+
+# Operators understood by the pipeline parser
+PIPE = "|"
+REDIRECTS = ("<", ">", ">>")
+_OPERATOR_CHARS = "|<>"
+
+
+class ThreadLocalStream:
+    """
+    File-like proxy installed as sys.stdout/sys.stdin. Each thread can point it
+    at its own stream, every other thread keeps writing to the original one.
+    This lets builtins run as pipeline stages without changing their print() calls.
+    """
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def set(self, stream):
+        self._local.stream = stream
+
+    def override(self):
+        """This thread's own stream, or None when it uses the default."""
+        return getattr(self._local, "stream", None)
+
+    def target(self):
+        return getattr(self._local, "stream", None) or self._default
+
+    def redirected_fileno(self):
+        """The fd behind this thread's own stream, None without one (or without an fd)."""
+        stream = self.override()
+        if stream is None:
+            return None
+        try:
+            return stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def write(self, data):
+        return self.target().write(data)
+
+    def flush(self):
+        return self.target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.target(), name)
+
+
+def install_stream_proxies():
+    """Replaces sys.stdout/sys.stdin/sys.stderr with thread-local proxies (once)."""
+    if not isinstance(sys.stdout, ThreadLocalStream):
+        sys.stdout = ThreadLocalStream(sys.stdout)
+    if not isinstance(sys.stdin, ThreadLocalStream):
+        sys.stdin = ThreadLocalStream(sys.stdin)
+    if not isinstance(sys.stderr, ThreadLocalStream):
+        sys.stderr = ThreadLocalStream(sys.stderr)
+    return sys.stdout, sys.stdin, sys.stderr
+
+
+class Stage:
+    """One command of a pipeline with its optional file redirections."""
+
+    __slots__ = ("argv", "stdin_path", "stdout_path", "append")
+
+    def __init__(self):
+        self.argv = []
+        self.stdin_path = None
+        self.stdout_path = None
+        self.append = False
+
+
+def _tokenize(command_line, operator_chars=_OPERATOR_CHARS):
+    """
+    Splits a line like shlex in POSIX mode, and yields (token, is_operator).
+    Runs of '|', '<' and '>' (or `operator_chars`) are operators only outside
+    quotes and escapes, so `echo '>'` passes the character on instead of
+    redirecting.
+    """
+    word = []
+    in_word = False
+    chars = iter(command_line)
+    for char in chars:
+        if char in operator_chars or char.isspace():
+            if in_word:
+                yield "".join(word), False
+                word, in_word = [], False
+            if char.isspace():
+                continue
+            operator = char
+            for char in chars:
+                if char not in operator_chars:
+                    break
+                operator += char
+            else:
+                char = None
+            yield operator, True
+            if char is None or char.isspace():
+                continue
+        in_word = True
+        if char == "\\":
+            escaped = next(chars, None)
+            if escaped is None:
+                raise ValueError("No escaped character")
+            word.append(escaped)
+        elif char == "'":
+            for char in chars:
+                if char == "'":
+                    break
+                word.append(char)
+            else:
+                raise ValueError("No closing quotation")
+        elif char == '"':
+            for char in chars:
+                if char == '"':
+                    break
+                if char == "\\":
+                    escaped = next(chars, None)
+                    if escaped is None:
+                        raise ValueError("No closing quotation")
+                    word.append(escaped if escaped in '"\\' else char + escaped)
+                else:
+                    word.append(char)
+            else:
+                raise ValueError("No closing quotation")
+        else:
+            word.append(char)
+    if in_word:
+        yield "".join(word), False
+
+
+def split_background(command_line):
+    """
+    Returns (command line, True) without the '&' for a line that ends in an
+    unquoted, unescaped '&', and (command line, False) for any other line.
+    Raises ValueError on unbalanced quotes.
+    """
+    last = None
+    for last in _tokenize(command_line, _OPERATOR_CHARS + "&"):
+        pass
+    if last != ("&", True):
+        return command_line, False
+    return command_line.rstrip()[:-1].rstrip(), True
+
+
+def parse_pipeline(command_line):
+    """
+    Splits a command line into stages on '|' and collects '<', '>' and '>>'
+    redirections. Quoted or escaped operator characters are plain text.
+    Raises ValueError on a malformed line.
+    """
+    stages = [Stage()]
+    tokens = _tokenize(command_line)
+    for token, is_operator in tokens:
+        if is_operator and token == PIPE:
+            if not stages[-1].argv:
+                raise ValueError("empty pipeline stage")
+            stages.append(Stage())
+        elif is_operator and token in REDIRECTS:
+            target, target_is_operator = next(tokens, (None, False))
+            if target is None or target_is_operator:
+                raise ValueError(f"missing file after '{token}'")
+            if token == "<":
+                stages[-1].stdin_path = target
+            else:
+                stages[-1].stdout_path = target
+                stages[-1].append = token == ">>"
+        else:
+            stages[-1].argv.append(token)
+    if not stages[-1].argv:
+        raise ValueError("empty pipeline stage")
+    return stages
+
+
+def exit_status(result):
+    """Builtins return None on success or an int status."""
+    return 0 if result is None else int(result)
+
+
+def run_builtin(handler, args, stdin_fd=None, stdout_fd=None):
+    """
+    Runs a builtin handler with this thread's stdin/stdout pointed at the given
+    fds. The fds are owned by this call and closed when the handler returns,
+    which is what delivers EOF to the next stage.
+    """
+    stdout_proxy, stdin_proxy, _ = install_stream_proxies()
+    # A background job's thread has its own streams, put back afterwards
+    saved_stdin, saved_stdout = stdin_proxy.override(), stdout_proxy.override()
+    stdin = os.fdopen(stdin_fd, "r") if stdin_fd is not None else None
+    stdout = os.fdopen(stdout_fd, "w") if stdout_fd is not None else None
+    stdin_proxy.set(stdin or saved_stdin)
+    stdout_proxy.set(stdout or saved_stdout)
+    try:
+        return exit_status(handler(args))
+    except BrokenPipeError:
+        # The downstream stage exited early (e.g. `ps | head`)
+        return 1
+    finally:
+        stdin_proxy.set(saved_stdin)
+        stdout_proxy.set(saved_stdout)
+        for stream in (stdout, stdin):
+            if stream is not None:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+
+
+def _native_argv(argv):
+    native_command = get_platform_command(argv[0])
+    if native_command:
+        return native_command + argv[1:]
+    return argv
+
+
+def _open_output(stage):
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if stage.append else os.O_TRUNC)
+    return os.open(stage.stdout_path, flags, 0o666)
+
+
+def _close(fd):
+    if fd is not None:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+def run_pipeline(stages, builtins):
+    """
+    Runs the stages concurrently and returns the exit status of the last one.
+    External stages are connected with OS pipes, so data between them never
+    passes through Python. Builtin stages run in threads writing into the same
+    kind of pipe, and a builtin last stage runs in the calling thread so Ctrl+C
+    still interrupts it.
+    """
+    sys.stdout.flush()
+    procs = []
+    threads = []
+    results = {}
+    tail = None
+    prev_read = None
+    status = 0
+    # Inside a background job the pipeline reads and writes the job's streams
+    inherited = redirected_fds()
+    job = current_job()
+
+    try:
+        for i, stage in enumerate(stages):
+            last = i == len(stages) - 1
+            stdin_fd, prev_read = prev_read, None
+            stdout_fd = None
+            if i == 0 and 0 in inherited:
+                stdin_fd = os.dup(inherited[0])
+            try:
+                if stage.stdin_path is not None:
+                    _close(stdin_fd)
+                    stdin_fd = None
+                    stdin_fd = os.open(stage.stdin_path, os.O_RDONLY)
+                if not last:
+                    prev_read, stdout_fd = os.pipe()
+                elif 1 in inherited:
+                    stdout_fd = os.dup(inherited[1])
+                if stage.stdout_path is not None:
+                    # An explicit redirect wins over the pipe, downstream sees EOF
+                    _close(stdout_fd)
+                    stdout_fd = None
+                    stdout_fd = _open_output(stage)
+            except OSError as e:
+                print(f"Nyra: {e.filename}: {e.strerror}")
+                _close(stdin_fd)
+                _close(stdout_fd)
+                status = 1
+                continue
+
+            handler = builtins.get(stage.argv[0])
+            if handler is None:
+                argv = _native_argv(stage.argv)
+                try:
+                    executable = COMMAND_HASH.resolve(argv[0])
+                    if executable is None:
+                        raise FileNotFoundError(argv[0])
+                    proc = subprocess.Popen(argv, executable=executable, stdin=stdin_fd, stdout=stdout_fd,
+                                            stderr=inherited.get(2), env=current_environ(),
+                                            start_new_session=job is not None)
+                    procs.append((i, proc))
+                    if job is not None:
+                        job.add_process(proc.pid)
+                except FileNotFoundError:
+                    print(f"Nyra: {stage.argv[0]}: command not found")
+                    results[i] = 127
+                finally:
+                    _close(stdin_fd)
+                    _close(stdout_fd)
+            elif last:
+                tail = (handler, stage.argv[1:], stdin_fd, stdout_fd)
+            else:
+                thread = threading.Thread(
+                    target=lambda i=i, h=handler, a=stage.argv[1:], r=stdin_fd, w=stdout_fd:
+                        results.__setitem__(i, run_builtin(h, a, r, w)),
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        if tail is not None:
+            results[len(stages) - 1] = run_builtin(*tail)
+    finally:
+        _close(prev_read)
+        for i, proc in procs:
+            results[i] = proc.wait()
+        for thread in threads:
+            thread.join()
+
+    return results.get(len(stages) - 1, status)
@@ -0,0 +1,98 @@
+import _socket
+import marshal
+import os
+import sys
+
+# Wire format between `nyra --server` and utils/client.py: every message is
+# a marshal-encoded dict preceded by its length as a 4-byte big-endian
+# integer. A "run" request carries the client's stdin, stdout and stderr as
+# SCM_RIGHTS file descriptors, so command output never passes through the
+# socket. Only builtin modules are used (the _socket extension instead of
+# socket, marshal instead of json), which keeps the client's startup close
+# to the interpreter's own. Both ends come from the same tree, and only the
+# server's own user can connect.
+MAX_FRAME = 16 * 1024 * 1024
+_FD_SIZE = 4
+_MAX_FDS = 8
+# Passed descriptors are opened close-on-exec, or commands run by other
+# sessions would inherit this client's terminal
+_RECV_FLAGS = getattr(_socket, "MSG_CMSG_CLOEXEC", 0)
+
+def default_socket_path():
+    """$XDG_RUNTIME_DIR/nyra.sock, or a per-user socket in /tmp."""
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, "nyra.sock")
+    return f"/tmp/nyra-{os.getuid()}.sock"
+
+def connect(path):
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def encode(message):
+    data = marshal.dumps(message)
+    return len(data).to_bytes(4, "big") + data
+
+def send(sock, message, fds=()):
+    if fds:
+        data = b"".join(fd.to_bytes(_FD_SIZE, sys.byteorder, signed=True) for fd in fds)
+        sock.sendmsg([encode(message)], [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS, data)])
+    else:
+        sock.sendall(encode(message))
+
+class FrameReader:
+    """
+    Reads messages from a stream socket. File descriptors passed along the
+    way are collected in `fds` for the caller to take.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.fds = []
+        self._buffer = bytearray()
+
+    def _receive(self):
+        data, ancillary, _, _ = self.sock.recvmsg(65536, _socket.CMSG_SPACE(_MAX_FDS * _FD_SIZE), _RECV_FLAGS)
+        for level, kind, payload in ancillary:
+            if level == _socket.SOL_SOCKET and kind == _socket.SCM_RIGHTS:
+                usable = len(payload) - len(payload) % _FD_SIZE
+                for i in range(0, usable, _FD_SIZE):
+                    fd = int.from_bytes(payload[i:i + _FD_SIZE], sys.byteorder, signed=True)
+                    if not _RECV_FLAGS:
+                        os.set_inheritable(fd, False)
+                    self.fds.append(fd)
+        return data
+
+    def read(self):
+        """The next message, or None once the peer has closed the connection."""
+        while True:
+            if len(self._buffer) >= 4:
+                length = int.from_bytes(self._buffer[:4], "big")
+                if length > MAX_FRAME:
+                    raise ValueError(f"frame of {length} bytes")
+                if len(self._buffer) >= 4 + length:
+                    try:
+                        message = marshal.loads(self._buffer[4:4 + length])
+                    except (EOFError, TypeError):
+                        message = None
+                    del self._buffer[:4 + length]
+                    if not isinstance(message, dict):
+                        raise ValueError("malformed message")
+                    return message
+            data = self._receive()
+            if not data:
+                return None
+            self._buffer += data
+
+    def take_fds(self, count):
+        taken, self.fds = self.fds[:count], self.fds[count:]
+        return taken
+
+    def close_fds(self):
+        for fd in self.take_fds(len(self.fds)):
+            os.close(fd)
@@ -0,0 +1,117 @@
+import importlib
+import os
+import sys
+
+# Entry point group third-party packages use to add commands to Nyra:
+#   [project.entry-points."nyra.commands"]
+#   mycmd = "mypackage.commands:handle_mycmd"
+PLUGIN_GROUP = "nyra.commands"
+
+# Reading entry point metadata means walking every installed distribution,
+# so the result is cached on disk until a sys.path directory changes.
+PLUGIN_CACHE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "nyra",
+    "plugins.json",
+)
+
+
+class CommandRegistry:
+    """
+    Maps command names to handlers without importing them up front.
+    Each command is registered as a "module:function" spec (or a callable),
+    and its module is only imported the first time the command runs.
+    Plugin commands are read from entry point metadata, and their modules are
+    loaded the same way on first use.
+    """
+
+    def __init__(self, specs):
+        self._specs = dict(specs)
+        self._handlers = {}
+        self._plugins_scanned = False
+
+    def register(self, name, spec):
+        self._specs[name] = spec
+        self._handlers.pop(name, None)
+
+    def get(self, name, default=None):
+        handler = self._handlers.get(name)
+        if handler is not None:
+            return handler
+        spec = self._specs.get(name)
+        if spec is None:
+            if self._plugins_scanned or not self._scan_plugins():
+                return default
+            spec = self._specs.get(name)
+            if spec is None:
+                return default
+        handler = self._resolve(spec)
+        self._handlers[name] = handler
+        return handler
+
+    def __contains__(self, name):
+        return name in self._specs or (self._scan_plugins() and name in self._specs)
+
+    def __iter__(self):
+        self._scan_plugins()
+        return iter(list(self._specs))
+
+    def _resolve(self, spec):
+        if callable(spec):
+            return spec
+        module_name, _, attr = spec.partition(":")
+        handler = importlib.import_module(module_name.strip())
+        for part in attr.split("[")[0].strip().split("."):
+            handler = getattr(handler, part)
+        return handler
+
+    def _scan_plugins(self):
+        """
+        Registers plugin commands from entry point metadata (once). Only the
+        metadata (or its cached copy) is read, plugin modules stay unimported.
+        Built-in names always win over plugins. Returns True on the first scan.
+        """
+        if self._plugins_scanned:
+            return False
+        self._plugins_scanned = True
+        for name, spec in _discover_plugins().items():
+            self._specs.setdefault(name, spec)
+        return True
+
+
+def _sys_path_key():
+    key = []
+    for path in sys.path:
+        try:
+            key.append([path, os.stat(path or ".").st_mtime_ns])
+        except OSError:
+            continue
+    return key
+
+
+def _discover_plugins():
+    """Returns {command: "module:function"} for all installed plugin commands."""
+    import json
+
+    key = _sys_path_key()
+    try:
+        with open(PLUGIN_CACHE) as f:
+            cached = json.load(f)
+        if cached["key"] == key:
+            return cached["plugins"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    try:
+        from importlib.metadata import entry_points
+
+        plugins = {ep.name: ep.value for ep in entry_points(group=PLUGIN_GROUP)}
+    except Exception:
+        return {}
+    try:
+        os.makedirs(os.path.dirname(PLUGIN_CACHE), exist_ok=True)
+        with open(PLUGIN_CACHE, "w") as f:
+            json.dump({"key": key, "plugins": plugins}, f)
+    except OSError:
+        pass
+    return plugins
@@ -0,0 +1,304 @@
+import contextlib
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import protocol
+from utils.dispatcher import BUILTIN_COMMANDS, run_command_line
+from utils.jobs import interrupt_thread, isolate_working_directory, job_context
+from utils.pipeline import install_stream_proxies, split_background
+
+_worker = threading.local()
+
+def _isolate_working_directory():
+    """
+    Pool worker initializer. On Linux every worker unshares its filesystem
+    context, so os.chdir() there only moves that thread (and the threads it
+    starts), and requests with different working directories run side by
+    side. Elsewhere requests take turns on the process-wide directory.
+    """
+    _worker.isolated = isolate_working_directory()
+
+class _Request:
+    """
+    One command running for a client. It is the job of its worker thread,
+    so external commands get their own session and can be interrupted
+    without Nyra's terminal signals involved.
+    """
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.pids = []
+        self.running = True
+        self.lock = threading.Lock()
+
+    def add_process(self, pid):
+        self.pids.append(pid)
+
+    def interrupt(self):
+        """Ctrl+C from the client: SIGINT to its processes, KeyboardInterrupt to the worker."""
+        with self.lock:
+            if not self.running:
+                return
+            for pid in self.pids:
+                try:
+                    os.killpg(pid, signal.SIGINT)
+                except (ProcessLookupError, PermissionError):
+                    continue
+            interrupt_thread(self.thread)
+
+    def finish(self):
+        """Marks the request done and drops an interrupt that arrived too late to matter."""
+        with self.lock:
+            self.running = False
+            interrupt_thread(self.thread, None)
+
+class _Session(threading.Thread):
+    """
+    One client connection. This thread only reads messages: requests are
+    handed to the server's pool, interrupts go to the running request.
+    """
+
+    def __init__(self, server, conn):
+        super().__init__(name="nyra-session", daemon=True)
+        self.server = server
+        self.conn = conn
+        self.reader = protocol.FrameReader(conn)
+        self.request = None
+        self._write_lock = threading.Lock()
+
+    def reply(self, message):
+        with self._write_lock:
+            try:
+                protocol.send(self.conn, message)
+            except OSError:
+                pass
+
+    def run(self):
+        try:
+            while True:
+                message = self.reader.read()
+                if message is None:
+                    break
+                op = message.get("op")
+                if op == "run":
+                    fds = self.reader.take_fds(3)
+                    self.server.pool.submit(self.server.execute, self, message, fds)
+                elif op == "interrupt":
+                    if self.request is not None:
+                        self.request.interrupt()
+                elif op == "complete":
+                    self.server.pool.submit(self.server.complete, self, message)
+                elif op == "ping":
+                    self.reply({"ok": True, "pid": os.getpid()})
+                elif op == "shutdown":
+                    self.reply({"ok": True})
+                    self.server.shutdown()
+                else:
+                    self.reply({"error": f"unknown op {op!r}"})
+        except (OSError, ValueError):
+            pass
+        finally:
+            # A client that went away takes its command with it
+            if self.request is not None:
+                self.request.interrupt()
+            self.reader.close_fds()
+            self.conn.close()
+
+class NyraServer:
+    """
+    Keeps one warm Nyra (imports, command hash, completion index, process
+    index, history store, latency stats) listening on a Unix socket. Each
+    request carries the client's working directory and environment and is
+    run on a thread pool, with output written straight to the client's own
+    stdout and stderr.
+    """
+
+    def __init__(self, path=None, workers=None):
+        self.path = path or protocol.default_socket_path()
+        self.pool = ThreadPoolExecutor(max_workers=workers or 16, thread_name_prefix="nyra-worker",
+                                       initializer=_isolate_working_directory)
+        # Serializes requests on platforms without per-thread directories
+        self._cwd_lock = threading.Lock()
+        self._listener = None
+        self._stopped = threading.Event()
+        from utils.completion import CompletionIndex
+
+        self.completion = CompletionIndex(BUILTIN_COMMANDS)
+
+    def _bind(self):
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                # Left over from a server that died
+                os.unlink(self.path)
+            else:
+                raise OSError(f"a server is already listening on {self.path}")
+            finally:
+                probe.close()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Commands run with our privileges, only our own user may connect
+        old_umask = os.umask(0o077)
+        try:
+            listener.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        listener.listen(64)
+        return listener
+
+    def _same_user(self, conn):
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        import struct
+
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    def serve_forever(self):
+        install_stream_proxies()
+        self._listener = self._bind()
+        # Warm the caches a first command or Tab would otherwise pay for
+        threading.Thread(target=self.completion.commands, daemon=True).start()
+        print(f"nyra server: listening on {self.path} (pid {os.getpid()})", file=sys.stderr)
+        try:
+            while not self._stopped.is_set():
+                try:
+                    conn, _ = self._listener.accept()
+                except OSError:
+                    if self._stopped.is_set():
+                        break
+                    raise
+                if not self._same_user(conn):
+                    conn.close()
+                    continue
+                _Session(self, conn).start()
+        finally:
+            self.close()
+
+    def shutdown(self):
+        self._stopped.set()
+        if self._listener is not None:
+            # Wakes the accept() in serve_forever
+            self._listener.shutdown(socket.SHUT_RDWR)
+
+    def close(self):
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            with contextlib.suppress(OSError):
+                os.unlink(self.path)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _working_directory(self):
+        """What to hold while a request uses the working directory."""
+        return contextlib.nullcontext() if getattr(_worker, "isolated", False) else self._cwd_lock
+
+    def execute(self, session, message, fds):
+        """Runs a "run" request on a pool worker and replies with its status and final directory."""
+        command = message.get("command", "")
+        request = _Request()
+        session.request = request
+        status, exited, cwd = 1, False, None
+        started, clock = time.time(), time.perf_counter()
+        try:
+            with self._working_directory():
+                try:
+                    status, exited = self._run(request, command, message, fds)
+                except KeyboardInterrupt:
+                    status = 130
+                finally:
+                    request.finish()
+                    cwd = os.getcwd()
+        except KeyboardInterrupt:
+            # Arrived between the command and finish()
+            status = 130
+        finally:
+            session.request = None
+        if message.get("record"):
+            from utils.history import get_history_store
+
+            store = get_history_store()
+            if store is not None:
+                store.record(command, cwd, status, started, time.perf_counter() - clock)
+        session.reply({"status": status, "cwd": cwd, "exit": exited})
+
+    def _run(self, request, command, message, fds):
+        """Runs the command with the client's streams, directory and environment. Returns (status, exited)."""
+        fds = (fds + [None] * 3)[:3]
+        streams = []
+        for fd, mode in zip(fds, ("r", "w", "w")):
+            if fd is None:
+                streams.append(open(os.devnull, mode))
+            else:
+                # Line buffered only where a person is watching
+                buffering = 1 if mode == "w" and os.isatty(fd) else -1
+                streams.append(open(fd, mode, buffering=buffering, errors="replace"))
+        stdin, stdout, stderr = streams
+        proxy_stdout, proxy_stdin, proxy_stderr = install_stream_proxies()
+        proxy_stdout.set(stdout)
+        proxy_stderr.set(stderr)
+        proxy_stdin.set(stdin)
+        try:
+            try:
+                os.chdir(message.get("cwd") or os.path.expanduser("~"))
+            except OSError as e:
+                print(f"nyra server: cannot enter {message.get('cwd')}: {e.strerror}", file=stderr)
+                return 1, False
+            with job_context(request, message.get("env")):
+                try:
+                    if split_background(command)[1]:
+                        print("Nyra: background jobs need an interactive Nyra, not the server", file=stderr)
+                        return 2, False
+                    return run_command_line(command), False
+                except ValueError as e:
+                    print(f"Nyra: {e}")
+                    return 2, False
+                except SystemExit as e:
+                    # `exit` ends the client's session, not the server
+                    return (e.code if isinstance(e.code, int) else 0), True
+                except BrokenPipeError:
+                    return 141, False
+        finally:
+            proxy_stdout.set(None)
+            proxy_stderr.set(None)
+            proxy_stdin.set(None)
+            for stream in streams:
+                with contextlib.suppress(OSError):
+                    stream.close()
+
+    def complete(self, session, message):
+        """Tab completion for a client, from the shared completion index."""
+        matches = []
+        with self._working_directory():
+            try:
+                os.chdir(message.get("cwd") or ".")
+                matches = self.completion.complete(message.get("line", ""), message.get("begidx", 0),
+                                                   message.get("text", ""), message.get("path"))
+            except (OSError, ValueError):
+                pass
+        session.reply({"matches": matches})
+
+def run_server(path=None, workers=None):
+    """Runs a server in the foreground until Ctrl+C or a client's --stop. Returns an exit status."""
+    server = NyraServer(path, workers)
+    # `kill` shuts down cleanly too, removing the socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Started with `&` from a script, SIGINT is ignored, and commands would
+    # inherit that and ignore a client's Ctrl+C
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
+    except OSError as e:
+        print(f"nyra server: {e}", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import time
+
+# Histogram bucket i counts latencies in [2**i, 2**(i+1)) microseconds,
+# which covers 1us to over an hour in 32 buckets
+_BUCKETS = 32
+
+class LatencyHistogram:
+    """Count, total, min, max and log2 buckets of one command's latencies."""
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * _BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        index = int(seconds * 1e6).bit_length() - 1
+        self.buckets[min(max(index, 0), _BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples (capped at max)."""
+        wanted = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return min(2 ** (index + 1) / 1e6, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_s": self.total / self.count if self.count else 0.0,
+            "min_s": self.min if self.count else 0.0,
+            "max_s": self.max,
+            "p50_s": self.percentile(0.5),
+            "p90_s": self.percentile(0.9),
+            "p99_s": self.percentile(0.99),
+            # [lower bound in microseconds, count] for each non-empty bucket
+            "buckets_us": [[2 ** i, n] for i, n in enumerate(self.buckets) if n],
+        }
+
+class LatencyRecorder:
+    """
+    Always-on per-command latency histograms. Recording is a dict lookup and
+    a few additions under a lock, cheap enough to run for every command.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.since = time.time()
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.add(seconds)
+
+    def histograms(self):
+        """(name, histogram) pairs, slowest total first."""
+        with self._lock:
+            return sorted(self._histograms.items(), key=lambda item: item[1].total, reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self.since = time.time()
+
+    def as_dict(self):
+        return {
+            "since": self.since,
+            "commands": {name: histogram.as_dict() for name, histogram in self.histograms()},
+        }
+
+STATS = LatencyRecorder()
+
+def profiled(runner, directory):
+    """
+    Wraps a command runner so every call runs under cProfile and leaves a
+    NNNN-command.prof file in `directory` (for pstats or snakeviz).
+    """
+    import cProfile
+
+    os.makedirs(directory, exist_ok=True)
+    counter = [0]
+
+    def run(command_line):
+        counter[0] += 1
+        name = "".join(c if c.isalnum() else "_" for c in (command_line.split() or ["empty"])[0])
+        path = os.path.join(directory, f"{counter[0]:04d}-{name}.prof")
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(runner, command_line)
+        finally:
+            profile.dump_stats(path)
+            print(f"profile: {path}", file=sys.stderr)
+
+    return run
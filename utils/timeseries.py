@@ -0,0 +1,236 @@
+import bisect
+import mmap
+import os
+import struct
+
+# On-disk format of `monitor --record`. FILE holds one fixed-width record
+# per sample, FILE.1m and FILE.1h the same records rolled up per minute and
+# per hour, so a long window is read from a few thousand records instead of
+# millions. Every file is a 32-byte header followed by records in time order,
+# which makes record i an offset computation and a time range a binary
+# search over an mmap.
+#
+# Record: time (float seconds since the epoch), CPU mean and max, memory
+# mean and max (percent * 100), then the top processes by CPU as pid,
+# CPU (percent * 10, as one process can use several cores), memory
+# (percent * 100) and the first 12 bytes of the name. In a raw sample mean
+# and max are the same, in a rollup the processes are the window's peaks.
+MAGIC = b"NYRAMON\0"
+VERSION = 1
+TOP_PROCESSES = 3
+_HEADER = struct.Struct("<8sHHI16x")
+RECORD = struct.Struct("<dHHHH" + "IHH12s" * TOP_PROCESSES)
+# (seconds per record, file suffix) of the rollup levels
+ROLLUPS = ((60, ".1m"), (3600, ".1h"))
+
+def _percent(value, scale=100):
+    return max(0, min(65535, int(round(value * scale))))
+
+def pack(t, cpu, cpu_max, mem, mem_max, top):
+    """A record from percentages and up to TOP_PROCESSES (pid, cpu, mem, name) tuples."""
+    fields = [t, _percent(cpu), _percent(cpu_max), _percent(mem), _percent(mem_max)]
+    for i in range(TOP_PROCESSES):
+        if i < len(top):
+            pid, proc_cpu, proc_mem, name = top[i]
+            fields += [pid, _percent(proc_cpu, 10), _percent(proc_mem), name.encode("utf-8", "replace")[:12]]
+        else:
+            fields += [0, 0, 0, b""]
+    return RECORD.pack(*fields)
+
+def unpack(fields):
+    """(t, cpu, cpu_max, mem, mem_max, top) from the fields of RECORD.unpack."""
+    top = []
+    for i in range(5, len(fields), 4):
+        pid, proc_cpu, proc_mem, name = fields[i:i + 4]
+        if pid:
+            top.append((pid, proc_cpu / 10, proc_mem / 100, name.rstrip(b"\0").decode("utf-8", "ignore")))
+    return fields[0], fields[1] / 100, fields[2] / 100, fields[3] / 100, fields[4] / 100, top
+
+def _open_for_append(path, seconds):
+    """Opens (or creates) a series file for appending, dropping a torn last record."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+    size = os.fstat(fd).st_size
+    if size < _HEADER.size:
+        os.ftruncate(fd, 0)
+        os.write(fd, _HEADER.pack(MAGIC, VERSION, RECORD.size, seconds))
+    else:
+        header = _HEADER.unpack(os.pread(fd, _HEADER.size, 0))
+        if header[:3] != (MAGIC, VERSION, RECORD.size):
+            os.close(fd)
+            raise ValueError(f"{path} is not a monitor recording (or from another version)")
+        whole = _HEADER.size + (size - _HEADER.size) // RECORD.size * RECORD.size
+        if whole != size:
+            os.ftruncate(fd, whole)
+    return fd
+
+class _Rollup:
+    """Folds samples into one record per `seconds`-long bucket, written once the bucket is over."""
+
+    def __init__(self, fd, seconds):
+        self.fd = fd
+        self.seconds = seconds
+        self.bucket = None
+
+    def add(self, t, cpu, cpu_max, mem, mem_max, top):
+        bucket = t - t % self.seconds
+        if bucket != self.bucket:
+            self.flush()
+            self.bucket = bucket
+            self.count = 0
+            self.cpu_sum = self.mem_sum = 0.0
+            self.cpu_max = self.mem_max = 0.0
+            # pid -> (peak cpu, mem, name)
+            self.processes = {}
+        self.count += 1
+        self.cpu_sum += cpu
+        self.mem_sum += mem
+        self.cpu_max = max(self.cpu_max, cpu_max)
+        self.mem_max = max(self.mem_max, mem_max)
+        for pid, proc_cpu, proc_mem, name in top:
+            peak = self.processes.get(pid)
+            if peak is None or proc_cpu > peak[0]:
+                self.processes[pid] = (proc_cpu, proc_mem, name)
+
+    def flush(self):
+        if self.bucket is None or not self.count:
+            return
+        peaks = sorted(self.processes.items(), key=lambda item: item[1][0], reverse=True)[:TOP_PROCESSES]
+        top = [(pid, cpu, mem, name) for pid, (cpu, mem, name) in peaks]
+        os.write(self.fd, pack(self.bucket, self.cpu_sum / self.count, self.cpu_max,
+                               self.mem_sum / self.count, self.mem_max, top))
+        self.count = 0
+
+class SeriesWriter:
+    """
+    Appends samples to FILE and keeps its rollup files up to date. One
+    write() per sample and per finished bucket, nothing is read back. A
+    bucket still open when recording stops is written by close(), and the
+    next writer takes it back and continues it from the raw samples.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = _open_for_append(path, 0)
+        self.last_time = 0.0
+        self.rollups = []
+        try:
+            for seconds, suffix in ROLLUPS:
+                self.rollups.append(_Rollup(_open_for_append(path + suffix, seconds), seconds))
+            self._resume()
+        except (OSError, ValueError):
+            self.close()
+            raise
+
+    def _resume(self):
+        raw = SeriesReader(self.path)
+        try:
+            if not len(raw):
+                return
+            self.last_time = raw.time(len(raw) - 1)
+            for rollup in self.rollups:
+                size = os.fstat(rollup.fd).st_size
+                if size > _HEADER.size:
+                    # The last bucket may have been cut short, rebuild it
+                    last = RECORD.unpack(os.pread(rollup.fd, RECORD.size, size - RECORD.size))
+                    os.ftruncate(rollup.fd, size - RECORD.size)
+                    start = raw.index(last[0])
+                else:
+                    start = 0
+                for fields in raw.records(start, len(raw)):
+                    rollup.add(*unpack(fields))
+        finally:
+            raw.close()
+
+    def append(self, t, cpu, mem, top):
+        """Records one sample. `top` is a list of (pid, cpu, mem, name), highest CPU first."""
+        # Kept in order for the binary searches, even if the clock steps back
+        t = max(t, self.last_time)
+        self.last_time = t
+        top = top[:TOP_PROCESSES]
+        os.write(self.fd, pack(t, cpu, cpu, mem, mem, top))
+        for rollup in self.rollups:
+            rollup.add(t, cpu, cpu, mem, mem, top)
+
+    def close(self):
+        for rollup in self.rollups:
+            try:
+                rollup.flush()
+            finally:
+                os.close(rollup.fd)
+        self.rollups = []
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+class _Times:
+    """Record timestamps as a read-only sequence, for bisect."""
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __len__(self):
+        return len(self.reader)
+
+    def __getitem__(self, index):
+        return self.reader.time(index)
+
+class SeriesReader:
+    """
+    Read access to one series file through mmap. Lookups by time are binary
+    searches, so their cost doesn't grow with the length of the recording.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mmap = None
+        self._count = 0
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            magic, version, record_size, self.seconds = _HEADER.unpack(header)
+            if (magic, version, record_size) != (MAGIC, VERSION, RECORD.size):
+                raise ValueError(f"{path} is not a monitor recording (or from another version)")
+            size = os.fstat(f.fileno()).st_size
+            self._count = (size - _HEADER.size) // RECORD.size
+            if self._count:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self._count
+
+    def time(self, index):
+        return struct.unpack_from("<d", self._mmap, _HEADER.size + index * RECORD.size)[0]
+
+    def index(self, t):
+        """Index of the first record at or after time t."""
+        return bisect.bisect_left(_Times(self), t)
+
+    def span(self, start=None, end=None):
+        """(first, stop) indices of the records with start <= time < end."""
+        first = 0 if start is None else self.index(start)
+        stop = self._count if end is None else self.index(end)
+        return first, max(first, stop)
+
+    def records(self, first, stop):
+        """Raw RECORD field tuples of records [first, stop)."""
+        if first >= stop:
+            return iter(())
+        begin = _HEADER.size + first * RECORD.size
+        return RECORD.iter_unpack(self._mmap[begin:_HEADER.size + stop * RECORD.size])
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+def open_levels(path):
+    """
+    Readers for FILE and whichever rollup files exist, finest first, as
+    (seconds per record, reader) pairs. Raw samples count as 0 seconds.
+    """
+    levels = [(0, SeriesReader(path))]
+    for seconds, suffix in ROLLUPS:
+        if os.path.exists(path + suffix):
+            levels.append((seconds, SeriesReader(path + suffix)))
+    return levels
@@ -0,0 +1,217 @@
+import os
+import queue
+import re
+import threading
+
+# Directory names never descended into when .gitignore rules are in use
+ALWAYS_PRUNED = frozenset({".git"})
+
+def _gitignore_regex(pattern):
+    """Translates one gitignore glob (already stripped of '!' and a trailing '/')."""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                out.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(char))
+        i += 1
+    # Unanchored patterns match a name at any depth
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(prefix + "".join(out) + "(?:/.*)?$", re.DOTALL)
+
+def _read_gitignore(directory):
+    """Rules of directory/.gitignore as (base, lead, regex, negate, dir_only) tuples."""
+    try:
+        with open(os.path.join(directory, ".gitignore"), encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return ()
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        try:
+            rules.append((directory, "", _gitignore_regex(line), negate, dir_only))
+        except re.error:
+            continue
+    return tuple(rules)
+
+class IgnoreRules:
+    """
+    The .gitignore rules in effect for one directory: its ancestors' rules
+    followed by its own. The last matching rule decides, as in git. A rule
+    matches the path relative to `base` (the directory its file is in, as
+    walked), prefixed with `lead` for rules read above the walk's root.
+    """
+
+    __slots__ = ("rules",)
+
+    def __init__(self, rules=()):
+        self.rules = rules
+
+    def child(self, directory):
+        own = _read_gitignore(directory)
+        return IgnoreRules(self.rules + own) if own else self
+
+    def ignored(self, path, is_dir):
+        ignored = False
+        for base, lead, regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            relative = lead + path[len(base):].lstrip(os.sep)
+            if os.sep != "/":
+                relative = relative.replace(os.sep, "/")
+            if regex.match(relative):
+                ignored = not negate
+        return ignored
+
+    @classmethod
+    def for_root(cls, root):
+        """
+        Rules for a search root: the .gitignore files from the enclosing
+        repository's top level down to (not including) the root itself.
+        """
+        absolute = os.path.abspath(root)
+        ancestors = []
+        directory = absolute
+        while not os.path.isdir(os.path.join(directory, ".git")):
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                # Not inside a repository, outer .gitignore files don't apply
+                return cls()
+            directory = parent
+            ancestors.append(directory)
+        rules = []
+        for directory in reversed(ancestors):
+            lead = os.path.relpath(absolute, directory).replace(os.sep, "/") + "/"
+            rules.extend((root, lead, regex, negate, dir_only)
+                         for _, _, regex, negate, dir_only in _read_gitignore(directory))
+        return cls(tuple(rules))
+
+def walk(roots, max_depth=None, gitignore=False, workers=None, on_error=None):
+    """
+    Walks directory trees on a pool of threads and yields (DirEntry, depth)
+    for everything below the roots (depth 1 = a root's children), in no
+    particular order, as directories are read. With `gitignore`, ignored
+    entries and .git directories are pruned. Symlinked directories are
+    listed but not followed. on_error(path, OSError) is called from the
+    worker threads for unreadable directories.
+    """
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    tasks = queue.SimpleQueue()
+    # Bounded, so a slow consumer (`find | head`) holds the walk back
+    results = queue.Queue(maxsize=256)
+    stop = threading.Event()
+    lock = threading.Lock()
+    pending = [0]
+
+    def submit(path, depth, rules):
+        with lock:
+            pending[0] += 1
+        tasks.put((path, depth, rules))
+
+    def deliver(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def scan(path, depth, rules):
+        batch = []
+        try:
+            if rules is not None:
+                rules = rules.child(path)
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_dir = False
+                    if rules is not None and (
+                        (is_dir and entry.name in ALWAYS_PRUNED) or rules.ignored(entry.path, is_dir)
+                    ):
+                        continue
+                    batch.append((entry, depth + 1))
+                    if is_dir and (max_depth is None or depth + 1 < max_depth):
+                        submit(entry.path, depth + 1, rules)
+        except OSError as e:
+            if on_error is not None:
+                on_error(path, e)
+        if batch:
+            deliver(batch)
+
+    def worker():
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            # Once the consumer has stopped, the queued directories are
+            # dropped without being read
+            if not stop.is_set():
+                scan(*task)
+            with lock:
+                pending[0] -= 1
+                finished = pending[0] == 0
+            if finished:
+                deliver(None)
+
+    roots = list(roots)
+    if not roots or max_depth == 0:
+        return
+    for root in roots:
+        rules = None
+        if gitignore:
+            rules = IgnoreRules.for_root(root)
+        submit(root, 0, rules)
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            batch = results.get()
+            if batch is None:
+                break
+            yield from batch
+    finally:
+        stop.set()
+        for _ in threads:
+            tasks.put(None)